@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import time
+
+from benchmarks.runner import benchmark
+from ebi.ols.api.hal import make_uri
+from ebi.ols.api.helpers import Term
+
+
+@benchmark('ontology_iteration', unit='terms')
+def ontology_iteration(context):
+    terms = context.new_client().ontology('ont0').terms()
+    return sum(1 for _ in terms)
+
+
+@benchmark('random_getitem', unit='calls')
+def random_getitem(context):
+    terms = context.new_client().ontology('ont0').terms()
+    calls = 50
+    for _ in range(calls):
+        index = context.random.randrange(len(terms))
+        with context.measure():
+            terms[index]
+    return calls
+
+
+@benchmark('search_pagination', unit='results')
+def search_pagination(context):
+    results = context.new_client().search(query='membrane')
+    return sum(1 for _ in results)
+
+
+@benchmark('detail_lookup', unit='calls')
+def detail_lookup(context):
+    client = context.new_client()
+    iris = list(context.server.dataset.items['terms']['ont1'].keys())
+    calls = 50
+    for _ in range(calls):
+        with context.measure():
+            client.term(context.random.choice(iris))
+    return calls
+
+
+@benchmark('helper_construction', unit='terms')
+def helper_construction(context):
+    terms = context.new_client().ontology('ont0').terms()
+    data = terms.data
+    rounds = 20
+    for _ in range(rounds):
+        for item in data:
+            Term(**item)
+    return rounds * len(data)
+
+
+@benchmark('slice_sampling', unit='terms')
+def slice_sampling(context):
+    terms = context.new_client().ontology('ont0').terms()
+    sampled = terms[::25] + terms[-context.options.page_size * 3:]
+    context.extra['pages'] = terms.pages
+    return len(sampled)
+
+
+def payload(context, func):
+    context.server.reset()
+    count = func()
+    context.extra['payload_bytes'] = context.server.sent
+    return count
+
+
+@benchmark('ontology_iteration_full', unit='terms')
+def ontology_iteration_full(context):
+    terms = context.new_client().ontology('ont0').terms()
+    return payload(context, lambda: sum(1 for _ in terms))
+
+
+@benchmark('ontology_iteration_projected', unit='terms')
+def ontology_iteration_projected(context):
+    terms = context.new_client().ontology('ont0').terms(fields=['iri', 'obo_id', 'label'])
+    return payload(context, lambda: sum(1 for _ in terms))
+
+
+@benchmark('search_full', unit='results')
+def search_full(context):
+    client = context.new_client()
+    return payload(context, lambda: sum(1 for _ in client.search(query='cell')))
+
+
+@benchmark('search_projected', unit='results')
+def search_projected(context):
+    client = context.new_client()
+    return payload(context, lambda: sum(1 for _ in client.search(query='cell', fields=['iri', 'obo_id', 'label'])))
+
+
+def curies(context, count=200):
+    """ Spreadsheet like column: repeated identifiers, mixed spellings """
+    obo_ids = [term['obo_id'] for term in context.server.dataset.items['terms']['ont1'].values()]
+    return [context.random.choice(obo_ids).replace(':', context.random.choice(':_')) for _ in range(count)]
+
+
+@benchmark('curie_resolution_serial', unit='identifiers')
+def curie_resolution_serial(context):
+    client = context.new_client()
+    identifiers = curies(context)
+    for identifier in identifiers:
+        filters = {'short_form' if '_' in identifier else 'obo_id': identifier}
+        next(iter(client.terms(filters=filters)))
+    return len(identifiers)
+
+
+@benchmark('curie_resolution_batch', unit='identifiers')
+def curie_resolution_batch(context):
+    from ebi.ols.api.resolver import CurieResolver
+    identifiers = curies(context)
+    return sum(1 for _ in CurieResolver(context.new_client(), workers=8).resolve(identifiers))
+
+
+@benchmark('ontology_lookup_detail', unit='calls')
+def ontology_lookup_detail(context):
+    client = context.new_client()
+    ontologies = list(context.server.dataset.ontologies)
+    calls = 200
+    for _ in range(calls):
+        client.ontology(context.random.choice(ontologies))
+    return calls
+
+
+@benchmark('ontology_lookup_catalogue', unit='calls')
+def ontology_lookup_catalogue(context):
+    client = context.new_client(catalogue=True)
+    ontologies = list(context.server.dataset.ontologies)
+    calls = 200
+    for _ in range(calls):
+        client.ontology(context.random.choice(ontologies))
+    return calls
+
+
+def keystrokes(context, count=10):
+    """ Autocomplete queries: every prefix of a few random labels """
+    labels = [context.server.dataset.label(context.random.randrange(context.options.terms)) for _ in range(count)]
+    return [label[:end] for label in labels for end in range(3, len(label) + 1)]
+
+
+@benchmark('autocomplete_remote', unit='queries')
+def autocomplete_remote(context):
+    client = context.new_client()
+    queries = keystrokes(context, 3)
+    for query in queries:
+        with context.measure():
+            list(zip(range(10), client.search(query=query, ontology='ont0')))
+    return len(queries)
+
+
+@benchmark('autocomplete_local', unit='queries')
+def autocomplete_local(context):
+    from ebi.ols.api.search_index import SearchIndex
+    index = SearchIndex.from_ontology(context.new_client().ontology('ont0'))
+    queries = keystrokes(context)
+    for query in queries:
+        with context.measure():
+            index.search(query, rows=10)
+    return len(queries)
+
+
+@benchmark('detail_lookup_imported', unit='calls')
+def detail_lookup_imported(context):
+    """ Repeated lookups of a term imported in every ontology (several elements returned) """
+    client = context.new_client()
+    iri = next(iter(context.server.dataset.items['terms']['ont0']))
+    calls = 50
+    context.server.reset()
+    for _ in range(calls):
+        with context.measure():
+            client.term(iri)
+    context.extra['requests'] = context.server.count()
+    return calls
+
+
+def tail_lookups(context, **kwargs):
+    """ Detail lookups, one in 20 answered 100ms late """
+    client = context.new_client(**kwargs)
+    iris = list(context.server.dataset.items['terms']['ont1'].keys())
+    calls = 200
+    for call in range(calls):
+        iri = context.random.choice(iris)
+        if call % 20 == 19:
+            context.server.slow(make_uri(iri), 0.1)
+        with context.measure():
+            client.term(iri)
+    return calls
+
+
+@benchmark('detail_lookup_tail', unit='calls')
+def detail_lookup_tail(context):
+    return tail_lookups(context)
+
+
+@benchmark('detail_lookup_hedged', unit='calls')
+def detail_lookup_hedged(context):
+    from ebi.ols.api.transports import HedgingTransport
+    transport = HedgingTransport(percentile=0.9, budget=0.1)
+    count = tail_lookups(context, transport=transport)
+    context.extra.update(transport.stats()._asdict())
+    return count
+
+
+def subsumption_pairs(context, count):
+    iris = list(context.server.dataset.items['terms']['ont0'].keys())
+    return [(context.random.choice(iris), context.random.choice(iris[:31])) for _ in range(count)]
+
+
+@benchmark('subsumption_remote', unit='pairs')
+def subsumption_remote(context):
+    """ is_a through term ancestors relation calls """
+    client = context.new_client()
+    pairs = subsumption_pairs(context, 20)
+    for iri, ancestor in pairs:
+        with context.measure():
+            term = client.term(iri)
+            ancestor in [parent.iri for parent in term.load_relation('ancestors')] if not term.is_root else False
+    return len(pairs)
+
+
+@benchmark('subsumption_closure', unit='pairs')
+def subsumption_closure(context):
+    """ is_a in bulk over a precomputed closure (built from stand-in hierarchy, not measured) """
+    from ebi.ols.api.closure import Closure, numpy
+    dataset = context.server.dataset
+    closure = Closure.build((iri, dataset.parents[iri]) for iri in dataset.items['terms']['ont0'])
+    pairs = subsumption_pairs(context, 100000)
+    terms, ancestors = closure.ids(iri for iri, _ in pairs), closure.ids(ancestor for _, ancestor in pairs)
+    with context.measure():
+        closure.is_a(terms, ancestors)
+    context.extra['numpy'] = numpy() is not None
+    context.extra['closure_pairs'] = len(closure.keys)
+    return len(pairs)
+
+
+@benchmark('lca_closure', unit='pairs')
+def lca_closure(context):
+    """ Lowest common ancestors in bulk over a precomputed closure (built from stand-in hierarchy, not measured) """
+    from ebi.ols.api.closure import Closure, numpy
+    dataset = context.server.dataset
+    closure = Closure.build((iri, dataset.parents[iri]) for iri in dataset.items['terms']['ont0'])
+    iris = list(dataset.items['terms']['ont0'].keys())
+    first = closure.ids(context.random.choice(iris) for _ in range(100000))
+    second = closure.ids(context.random.choice(iris) for _ in range(100000))
+    with context.measure():
+        closure.lca(first, second)
+    context.extra['numpy'] = numpy() is not None
+    return len(first)
+
+
+@benchmark('ontology_diff', unit='terms', repeat=1)
+def ontology_diff(context):
+    """ Fingerprint ontology terms against a previous version snapshot (every term changed) """
+    import tempfile
+    from ebi.ols.api.diff import Snapshot
+    client = context.new_client()
+    terms = client.ontology('ont0').terms()
+    previous = Snapshot.from_terms(client.ontology('ont1').terms())
+    changes = sum(1 for _ in previous.diff(terms))
+    with tempfile.TemporaryDirectory() as directory:
+        previous.save(directory + '/snapshot.json.gz')
+        context.extra['snapshot_bytes'] = os.path.getsize(directory + '/snapshot.json.gz')
+    context.extra['changes'] = changes
+    return len(terms)
+
+
+def free_text(context, count=300):
+    """ Labels with duplicates and case / spacing variants """
+    labels = [context.server.dataset.label(context.random.randrange(1000)) for _ in range(count)]
+    return [label.upper() if index % 3 == 0 else ' %s ' % label for index, label in enumerate(labels)]
+
+
+@benchmark('annotation_serial', unit='values', repeat=1)
+def annotation_serial(context):
+    """ One exact search per value, in a loop """
+    client = context.new_client()
+    values = free_text(context)
+    for value in values:
+        next(iter(client.search(query=value.strip().replace(' ', '%20'), filters={'exact': 'true'})), None)
+    return len(values)
+
+
+@benchmark('annotation_pipeline', unit='values', repeat=1)
+def annotation_pipeline(context):
+    from ebi.ols.api.annotation import Annotator
+    annotator = Annotator(context.new_client(), workers=16, rows=10)
+    count = sum(1 for _ in annotator.annotate(free_text(context)))
+    context.extra.update(annotator.stats._asdict())
+    return count
+
+
+_snapshots = {}
+
+
+def snapshot_client(context):
+    """ Client on a snapshot of the stand-in server first ontology terms (built once per server, not measured) """
+    import tempfile
+    from ebi.ols.api.backends import RestBackend, SqliteBackend
+    from ebi.ols.api.client import OlsClient
+    if context.server.url not in _snapshots:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'ols.sqlite')
+        SqliteBackend.create(path, RestBackend(context.server.url), ontologies=['ont0'], kinds=('terms',))
+        _snapshots[context.server.url] = (directory, path)
+    path = _snapshots[context.server.url][1]
+    context.extra['snapshot_bytes'] = os.path.getsize(path)
+    return OlsClient(backend=SqliteBackend(path), page_size=context.options.page_size)
+
+
+@benchmark('ontology_iteration_offline', unit='terms')
+def ontology_iteration_offline(context):
+    terms = snapshot_client(context).ontology('ont0').terms()
+    return sum(1 for _ in terms)
+
+
+@benchmark('detail_lookup_offline', unit='calls')
+def detail_lookup_offline(context):
+    client = snapshot_client(context)
+    iris = list(context.server.dataset.items['terms']['ont0'].keys())
+    calls = 50
+    for _ in range(calls):
+        with context.measure():
+            client.term(context.random.choice(iris))
+    return calls
+
+
+@benchmark('detail_lookup_cached', unit='calls')
+def detail_lookup_cached(context):
+    """ detail_lookup over a warmed up hot set (warm-up not measured) """
+    client = context.new_client(cache={'ttl': 600, 'workers': 4})
+    iris = list(context.server.dataset.items['terms']['ont1'].keys())[:50]
+    start = time.perf_counter()
+    client.cache.warm(terms=iris).wait()
+    context.extra['warm_up_seconds'] = round(time.perf_counter() - start, 3)
+    calls = 50
+    for _ in range(calls):
+        with context.measure():
+            client.term(context.random.choice(iris))
+    context.extra.update(client.cache.stats._asdict())
+    client.cache.close()
+    return calls
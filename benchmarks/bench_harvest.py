@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import multiprocessing
+
+from benchmarks.runner import benchmark
+from ebi.ols.api.harvest import Harvester, as_json
+
+
+def harvest(context, processes):
+    harvester = Harvester(base_site=context.server.url, page_size=context.options.page_size, processes=processes,
+                          pages_per_task=2, transform=as_json)
+    context.extra['processes'] = processes
+    return len(harvester.harvest())
+
+
+@benchmark('harvest_sequential', unit='terms', repeat=1)
+def harvest_sequential(context):
+    return harvest(context, 1)
+
+
+@benchmark('harvest_process_pool', unit='terms', repeat=1)
+def harvest_process_pool(context):
+    return harvest(context, min(4, multiprocessing.cpu_count()))
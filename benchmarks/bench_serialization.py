@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import pickle
+
+from benchmarks.runner import benchmark
+from ebi.ols.api import serialization
+from ebi.ols.api.helpers import as_record
+
+_terms = {}
+
+
+def terms(context):
+    """ One ontology terms, loaded once per stand-in server """
+    if context.server.url not in _terms:
+        client = context.new_client()
+        _terms[context.server.url] = list(client.ontology('ont0').terms())
+    return _terms[context.server.url]
+
+
+def to_json(values):
+    return '\n'.join(json.dumps(as_record(value), separators=(',', ':')) for value in values).encode('utf-8')
+
+
+def from_json(data):
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+def pickle_dumps(values):
+    return pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+FORMATS = {'pickle': (pickle_dumps, pickle.loads),
+           'json': (to_json, from_json),
+           'binary': (serialization.dumps, serialization.loads)}
+
+
+def encode(context, name):
+    values = terms(context)
+    dumps = FORMATS[name][0]
+    with context.measure():
+        data = dumps(values)
+    context.extra['bytes'] = len(data)
+    context.extra['bytes_per_term'] = round(len(data) / len(values), 1)
+    return len(values)
+
+
+def decode(context, name):
+    values = terms(context)
+    dumps, loads = FORMATS[name]
+    data = dumps(values)
+    with context.measure():
+        loads(data)
+    context.extra['bytes'] = len(data)
+    return len(values)
+
+
+@benchmark('serialize_pickle_encode', unit='terms')
+def serialize_pickle_encode(context):
+    return encode(context, 'pickle')
+
+
+@benchmark('serialize_pickle_decode', unit='terms')
+def serialize_pickle_decode(context):
+    return decode(context, 'pickle')
+
+
+@benchmark('serialize_json_encode', unit='terms')
+def serialize_json_encode(context):
+    return encode(context, 'json')
+
+
+@benchmark('serialize_json_decode', unit='terms')
+def serialize_json_decode(context):
+    return decode(context, 'json')
+
+
+@benchmark('serialize_binary_encode', unit='terms')
+def serialize_binary_encode(context):
+    return encode(context, 'binary')
+
+
+@benchmark('serialize_binary_decode', unit='terms')
+def serialize_binary_decode(context):
+    return decode(context, 'binary')
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import subprocess
+import sys
+
+from benchmarks.runner import benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@benchmark('client_import', unit='processes', repeat=5)
+def client_import(context):
+    """ Fresh interpreter importing the client and building an OlsClient """
+    script = 'from ebi.ols.api.client import OlsClient; OlsClient(base_site="{}")'.format(context.server.url)
+    with context.measure():
+        subprocess.check_call([sys.executable, '-W', 'ignore', '-c', script], cwd=ROOT)
+    return 1
+
+
+@benchmark('client_startup', unit='clients')
+def client_startup(context):
+    """ OlsClient construction then a first detail lookup """
+    clients = 20
+    for _ in range(clients):
+        with context.measure():
+            client = context.new_client()
+        client.term('http://purl.obolibrary.org/obo/ONT1_0000001')
+    return clients
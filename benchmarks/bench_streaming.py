@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import requests
+
+from benchmarks.runner import benchmark
+
+PAGE_SIZES = (50, 200, 1000)
+
+
+def first_item_and_peak(context, stream):
+    """
+    Per page size: time to first element of a page, and traced memory peak while iterating the whole list, without
+    keeping helpers (first page, decoded by list creation, excluded)
+    """
+    first_items, peaks = OrderedDict(), OrderedDict()
+    for page_size in PAGE_SIZES:
+        terms = context.new_client(page_size=page_size, stream=stream).ontology('ont0').terms()
+        # stand-in server runs in this process: have it render (and cache) pages before tracing memory
+        for page in range(terms.pages):
+            requests.get(terms._page_uri(page)).content
+        page = 1 if terms.pages > 1 else 0
+        start = time.perf_counter()
+        if stream:
+            elements = terms.stream_page(page)
+            next(elements)
+            elements.close()
+        else:
+            terms.elem_class_instance(**terms._get_data(terms.path, terms.fetch_page(page))[0])
+        first_items[page_size] = time.perf_counter() - start
+        context.latencies.append(first_items[page_size])
+        tracemalloc.start()
+        try:
+            for _ in terms._gen_elems_forward(min(page_size, len(terms)), len(terms)):
+                pass
+            peaks[page_size] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    context.extra['first_item_seconds'] = first_items
+    context.extra['peak_bytes'] = peaks
+    return len(PAGE_SIZES)
+
+
+@benchmark('page_decoding_standard', unit='page sizes', repeat=1)
+def page_decoding_standard(context):
+    return first_item_and_peak(context, False)
+
+
+@benchmark('page_decoding_streamed', unit='page sizes', repeat=1)
+def page_decoding_streamed(context):
+    return first_item_and_peak(context, True)
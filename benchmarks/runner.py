@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import argparse
+import contextlib
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_MODULES = ['benchmarks.bench_client', 'benchmarks.bench_startup', 'benchmarks.bench_harvest',
+                     'benchmarks.bench_streaming', 'benchmarks.bench_serialization']
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+_registry = OrderedDict()
+
+
+def benchmark(name, unit='ops', repeat=None):
+    """
+    Register a benchmark scenario.
+    The decorated function receives a :class:`Context` and returns the number of operations (items, calls) performed.
+    :param name: scenario name, key in results files
+    :param unit: what one operation is (terms, calls, ...)
+    :param repeat: override default repeat count
+    """
+
+    def register(func):
+        _registry[name] = (func, unit, repeat)
+        return func
+
+    return register
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(ratio * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summary(values):
+    return OrderedDict([
+        ('min', min(values)),
+        ('median', statistics.median(values)),
+        ('mean', statistics.mean(values)),
+        ('p95', percentile(values, 0.95)),
+        ('max', max(values)),
+    ])
+
+
+class Context(object):
+    """
+    Benchmark execution context: started stand-in server, fresh client, seeded random and per operation timings
+    """
+
+    def __init__(self, server, options):
+        self.server = server
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.latencies = []
+        self.extra = OrderedDict()
+
+    def new_client(self, **kwargs):
+        from ebi.ols.api.client import OlsClient
+        kwargs.setdefault('page_size', self.options.page_size)
+        return OlsClient(base_site=self.server.url, **kwargs)
+
+    @contextlib.contextmanager
+    def measure(self):
+        """ Record one operation latency """
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(__file__)).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_benchmarks():
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+    return _registry
+
+
+def run(options):
+    from tests.ols_stub import OlsStubServer
+    scenarios = load_benchmarks()
+    selected = [name for name in scenarios if not options.only or any(o in name for o in options.only)]
+    results = OrderedDict()
+    with OlsStubServer(ontologies=options.ontologies, terms=options.terms, latency=options.latency,
+                       annotation_size=options.annotation_size) as server:
+        for name in selected:
+            func, unit, repeat = scenarios[name]
+            repeat = repeat or options.repeat
+            durations, operations, latencies = [], 0, []
+            context = None
+            for _ in range(repeat):
+                context = Context(server, options)
+                start = time.perf_counter()
+                operations = func(context)
+                durations.append(time.perf_counter() - start)
+                latencies.extend(context.latencies)
+            result = OrderedDict([('unit', unit), ('repeat', repeat), ('operations', operations)])
+            result['duration'] = summary(durations)
+            result['throughput'] = operations / result['duration']['median'] if result['duration']['median'] else None
+            if latencies:
+                result['latency'] = summary(latencies)
+            result.update(context.extra)
+            results[name] = result
+            logger.info('%s: %s %s in %.4fs (median)', name, operations, unit, result['duration']['median'])
+            print('{:<40} {:>10.4f}s {:>12.1f} {}/s'.format(name, result['duration']['median'],
+                                                            result['throughput'] or 0, unit))
+    return OrderedDict([
+        ('meta', OrderedDict([
+            ('commit', git_commit()),
+            ('date', datetime.datetime.now().isoformat()),
+            ('python', platform.python_version()),
+            ('platform', platform.platform()),
+            ('params', OrderedDict([(key, getattr(options, key)) for key in
+                                    ('ontologies', 'terms', 'page_size', 'latency', 'annotation_size', 'repeat',
+                                     'seed')])),
+        ])),
+        ('results', results)
+    ])
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compare two results documents on median durations
+    :param baseline: reference results
+    :param current: new results
+    :param threshold: accepted relative slow down
+    :return: list of (name, baseline median, current median, ratio, regressed)
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['duration']['median']
+        after = result['duration']['median']
+        ratio = after / before if before else float('inf')
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='OLS client benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='run benchmarks and store results as JSON')
+    run_parser.add_argument('--ontologies', type=int, default=3)
+    run_parser.add_argument('--terms', type=int, default=1000, help='terms per ontology')
+    run_parser.add_argument('--page-size', dest='page_size', type=int, default=100)
+    run_parser.add_argument('--latency', type=float, default=0.0, help='stand-in server latency (seconds)')
+    run_parser.add_argument('--annotation-size', dest='annotation_size', type=int, default=0)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--only', action='append', help='run only scenarios whose name contains this')
+    run_parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='accepted relative slow down')
+    options = parser.parse_args(argv)
+
+    if options.command == 'run':
+        results = run(options)
+        output = options.output or os.path.join(RESULTS_DIR, '{}.json'.format(results['meta']['commit']))
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print('Results stored in {}'.format(output))
+        return 0
+    elif options.command == 'compare':
+        with open(options.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(options.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        regressions = 0
+        for name, before, after, ratio, regressed in compare(baseline, current, options.threshold):
+            regressions += regressed
+            print('{:<40} {:>10.4f}s {:>10.4f}s {:>7.2f}x {}'.format(name, before, after, ratio,
+                                                                    'REGRESSION' if regressed else ''))
+        return 1 if regressions else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+In memory accession index: resolves user supplied identifiers (``GO:0008150``, ``go_0008150``, full IRIs,
+alternative ids) to compact term records without any remote call::
+
+    index = AccessionIndex.from_ontology(client.ontology('go'))
+    index.save('go.index.json.gz')
+    ...
+    index = AccessionIndex.load('go.index.json.gz')
+    index['GO:0008150'].label
+
+Index can also be filled while iterating terms for something else (`collect`), or from `ols-harvest` output
+(`from_harvest`).
+"""
+import gzip
+import json
+import os
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.helpers import guess_accession
+
+__all__ = ['AccessionIndex', 'TermRecord', 'accession_key']
+
+#: indexed term, `obo_id` holds term accession (guessed from short form when OLS does not provide any)
+TermRecord = namedtuple('TermRecord', ['iri', 'obo_id', 'short_form', 'label', 'ontology_name', 'is_obsolete',
+                                       'is_defining_ontology', 'term_replaced_by'])
+
+#: term fields loaded to build an index (see list `fields` projection)
+INDEX_FIELDS = ('iri', 'obo_id', 'short_form', 'label', 'ontology_name', 'is_obsolete', 'is_defining_ontology',
+                'term_replaced_by', 'annotation')
+
+
+def accession_key(identifier):
+    """
+    Lookup key for an identifier: IRIs are kept as is, CURIEs and short forms are case insensitive and share the
+    same key (GO:0008150, go_0008150)
+    :param identifier: str
+    :return: str
+    """
+    identifier = identifier.strip()
+    if '://' in identifier:
+        return identifier
+    return identifier.replace(':', '_').casefold()
+
+
+def _value(item, name):
+    return item.get(name) if isinstance(item, Mapping) else getattr(item, name, None)
+
+
+def _record(item):
+    """ TermRecord and alternative ids from a Term helper or a term record mapping (harvest / json) """
+    annotation = _value(item, 'annotation')
+    alternatives = _value(annotation, 'has_alternative_id') if annotation is not None else None
+    short_form = _value(item, 'short_form')
+    iri = _value(item, 'iri')
+    obo_id = _value(item, 'obo_id')
+    if not obo_id:
+        obo_id = item.accession if not isinstance(item, Mapping) else \
+            guess_accession(short_form or (iri or '').rsplit('/', 1)[-1])
+    ontology_name = _value(item, 'ontology_name')
+    record = TermRecord(iri, obo_id or None, short_form, _value(item, 'label'),
+                        sys.intern(ontology_name) if ontology_name else ontology_name,
+                        bool(_value(item, 'is_obsolete')), bool(_value(item, 'is_defining_ontology')),
+                        _value(item, 'term_replaced_by'))
+    return record, alternatives or []
+
+
+class AccessionIndex(object):
+    """
+    Identifiers to `TermRecord` mapping, one record per IRI (the defining ontology one when the term is listed in
+    several ontologies). Primary identifiers (IRI, obo_id, short form) always win over alternative ids.
+    """
+    version = 1
+
+    def __init__(self, terms=None):
+        """
+        :param terms: Term helpers or term mappings to index
+        """
+        self._records = []
+        self._keys = {}
+        self._alternatives = {}
+        if terms is not None:
+            self.update(terms)
+
+    @classmethod
+    def from_ontology(cls, ontology):
+        """
+        Index all ontology terms (only indexed fields are loaded)
+        :param ontology: Ontology helper
+        :return: AccessionIndex
+        """
+        return cls(ontology.terms(fields=INDEX_FIELDS))
+
+    @classmethod
+    def from_harvest(cls, path):
+        """
+        Index terms harvested in a json lines file (`ols-harvest` / `JsonLinesSink` output)
+        :param path: file path
+        :return: AccessionIndex
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def add(self, term):
+        """
+        Index one term
+        :param term: Term helper or term mapping
+        :return: TermRecord actually indexed for term IRI
+        """
+        record, alternatives = _record(term)
+        position = self._keys.get(record.iri) if record.iri else None
+        if position is None:
+            position = len(self._records)
+            self._records.append(record)
+        elif record.is_defining_ontology and not self._records[position].is_defining_ontology:
+            # replaced record accessions must not resolve to the defining one
+            replaced = self._records[position]
+            for identifier in (replaced.obo_id, replaced.short_form):
+                if identifier and self._keys.get(accession_key(identifier)) == position:
+                    del self._keys[accession_key(identifier)]
+            self._records[position] = record
+        else:
+            record = self._records[position]
+        for identifier in (record.obo_id, record.short_form):
+            if identifier:
+                self._keys[accession_key(identifier)] = position
+        if record.iri:
+            self._keys[record.iri] = position
+        for identifier in alternatives:
+            self._alternatives.setdefault(accession_key(identifier), position)
+        return self._records[position]
+
+    def update(self, terms):
+        """
+        Index terms
+        :param terms: iterable of Term helpers or term mappings
+        :return: number of terms read
+        """
+        count = 0
+        for count, term in enumerate(terms, 1):
+            self.add(term)
+        return count
+
+    def collect(self, terms):
+        """
+        Index terms while they are iterated, ex: `for term in index.collect(ontology.terms()): ...`
+        :param terms: iterable of Term helpers or term mappings
+        :return: generator of terms, unchanged
+        """
+        for term in terms:
+            self.add(term)
+            yield term
+
+    def get(self, identifier, default=None):
+        """
+        Record for an IRI, obo_id, short form or alternative id
+        :param identifier: str
+        :param default: returned when identifier is unknown
+        :return: TermRecord
+        """
+        key = accession_key(identifier)
+        position = self._keys.get(key)
+        if position is None:
+            position = self._alternatives.get(key)
+            if position is None:
+                return default
+        return self._records[position]
+
+    def __getitem__(self, identifier):
+        record = self.get(identifier)
+        if record is None:
+            raise KeyError(identifier)
+        return record
+
+    def __contains__(self, identifier):
+        return self.get(identifier) is not None
+
+    def is_alternative(self, identifier):
+        """ True when identifier is only known as an alternative id """
+        key = accession_key(identifier)
+        return key not in self._keys and key in self._alternatives
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __repr__(self):
+        return '<AccessionIndex(terms={}, alternatives={})>'.format(len(self._records), len(self._alternatives))
+
+    def to_dict(self):
+        return {'version': self.version, 'fields': list(TermRecord._fields),
+                'records': [list(record) for record in self._records], 'alternatives': self._alternatives}
+
+    @classmethod
+    def from_dict(cls, content):
+        if content.get('version') != cls.version or content.get('fields') != list(TermRecord._fields):
+            raise exceptions.BadParameter('Unsupported accession index version %s' % content.get('version'))
+        index = cls()
+        index._records = [TermRecord(*values) for values in content['records']]
+        for position, record in enumerate(index._records):
+            for identifier in (record.obo_id, record.short_form):
+                if identifier:
+                    index._keys[accession_key(identifier)] = position
+            if record.iri:
+                index._keys[record.iri] = position
+        index._alternatives = dict(content['alternatives'])
+        return index
+
+    def save(self, path):
+        """ Store index as compact json file, gzipped when path ends with .gz (replaced atomically) """
+        temporary = path + '.tmp'
+        with (gzip.open if path.endswith('.gz') else open)(temporary, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Read index from `save` file """
+        with (gzip.open if path.endswith('.gz') else open)(path, 'rt', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Bulk free text annotation: maps labels (ex: samples metadata values) to their best matching OLS item::
+
+    annotator = Annotator(client, workers=16, rows=10, ontology='efo', type='class')
+    for annotation in annotator.annotate(values):
+        print(annotation.input, annotation.match and annotation.match.obo_id, annotation.score)
+    print(annotator.stats)
+
+Values are normalized (case, punctuation, spaces, see `search_index.normalize`), each distinct one is searched once,
+concurrently, first `rows` hits only. Hits are ranked again against the value the same way `SearchIndex` ranks its
+own hits (exact label 100, exact synonym 90, label starting with value 80...), hits OLS found through other fields
+score `SEARCHED`. Results (misses included) are cached for next `annotate` calls.
+"""
+import copy
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.base import BaseClient
+from ebi.ols.api.search_index import SearchIndex, normalize
+
+logger = logging.getLogger(__name__)
+__all__ = ['Annotator', 'Annotation', 'AnnotationStats', 'SEARCHED']
+
+#: score of a hit matching none of its names (OLS matched another field: description, identifiers...)
+SEARCHED = 40
+
+#: one annotated value: `match` is the best hit (helper), None when nothing matched or search failed (`error`)
+Annotation = namedtuple('Annotation', ['input', 'match', 'score', 'error'])
+#: `queries` searches sent, `cached` values served from cache (or from a search already sent for the same value)
+AnnotationStats = namedtuple('AnnotationStats', ['inputs', 'queries', 'cached', 'matched', 'errors', 'elapsed',
+                                                 'throughput'])
+
+
+def best_match(query, hits):
+    """
+    Best hit for query
+    :param query: normalized query
+    :param hits: search hits (helpers), in OLS order
+    :return: (hit, score), (None, None) when there is no hit
+    """
+    if not hits:
+        return None, None
+    index = SearchIndex(hits)
+    ranked = index.search(query, rows=len(hits), filters={'obsoletes': 'true'})
+    if not ranked:
+        return hits[0], SEARCHED
+    by_key = {(hit.iri, getattr(hit, 'ontology_name', None)): hit for hit in reversed(hits)}
+    return by_key[(ranked[0].iri, ranked[0].ontology_name)], ranked[0].score
+
+
+class Annotator(object):
+    """
+    Concurrent, cached free text values annotation through OLS search
+    """
+
+    def __init__(self, client, workers=8, rows=10, filters=None, **kwargs):
+        """
+        :param client: OlsClient
+        :param workers: searches running at the same time
+        :param rows: hits considered per value (first search page only)
+        :param filters: `client.search` filters (ontology, type, exact, queryFields...), or as keyword arguments
+        """
+        filters = dict(filters or kwargs)
+        try:
+            BaseClient.filters_response(dict(filters))
+        except AssertionError as e:
+            raise exceptions.BadFilters(str(e))
+        self.client = client
+        self.workers = max(1, workers)
+        self.rows = max(1, rows)
+        self.filters = filters
+        self._search = None
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(('inputs', 'queries', 'cached', 'matched', 'errors'), 0)
+        self._elapsed = 0.0
+
+    def _searcher(self):
+        with self._lock:
+            if self._search is None:
+                # shared search client (and root document), with first page only as long as needed
+                self._search = copy.copy(self.client.search)
+                self._search.page_size = self.rows
+            return self._search
+
+    def _count(self, name):
+        # annotators may be shared by threads annotating their own values
+        with self._lock:
+            self._counts[name] += 1
+
+    def _lookup(self, normalized):
+        results = self._searcher()(query=normalized, filters=self.filters)
+        hits = list(itertools.islice(results, self.rows)) if len(results) else []
+        return best_match(normalized, hits)
+
+    def _annotation(self, value, future):
+        try:
+            match, score = future.result()
+        except Exception as e:
+            logger.warning('Unable to annotate %s: %s', value, e)
+            self._count('errors')
+            return Annotation(value, None, None, str(e))
+        if match is not None:
+            self._count('matched')
+        return Annotation(value, match, score, None)
+
+    def annotate(self, values):
+        """
+        Annotate values
+        :param values: iterable of str, read as annotations are consumed
+        :return: generator of Annotation, one per value, in completion order (values already known first)
+        """
+        pending = {}
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(self.workers) as executor:
+                for value in values:
+                    self._count('inputs')
+                    normalized = normalize(value) if isinstance(value, str) else ''
+                    if not normalized:
+                        yield Annotation(value, None, None, None)
+                        continue
+                    future = self._cache.get(normalized)
+                    if future is not None:
+                        self._count('cached')
+                        if future in pending:
+                            # search already sent, value waits for it
+                            pending[future][1].append(value)
+                        else:
+                            yield self._annotation(value, future)
+                        continue
+                    self._count('queries')
+                    future = self._cache[normalized] = executor.submit(self._lookup, normalized)
+                    pending[future] = (normalized, [value])
+                    # bounded look ahead: annotations stream out while next values are read
+                    while len(pending) >= self.workers * 4:
+                        yield from self._completed(pending, False)
+                    yield from self._completed(pending, True)
+                while pending:
+                    yield from self._completed(pending, False)
+        finally:
+            with self._lock:
+                self._elapsed += time.perf_counter() - start
+
+    def _completed(self, pending, ready_only):
+        done, _ = wait(pending, timeout=0 if ready_only else None, return_when=FIRST_COMPLETED)
+        for future in done:
+            normalized, values = pending.pop(future)
+            if future.exception() is not None:
+                # failed searches are sent again for next values
+                self._cache.pop(normalized, None)
+            for value in values:
+                yield self._annotation(value, future)
+
+    @property
+    def stats(self):
+        """ Counts since annotator creation, `throughput` in values per second """
+        with self._lock:
+            elapsed, counts = self._elapsed, dict(self._counts)
+        return AnnotationStats(elapsed=elapsed, throughput=counts['inputs'] / elapsed if elapsed else None, **counts)
+
+    def clear(self):
+        """ Forget cached annotations """
+        self._cache.clear()
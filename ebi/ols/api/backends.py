@@ -0,0 +1,710 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Content backends: where OLS content comes from, under `ListClientMixin`, `DetailClientMixin` and
+`SearchClientMixin` (and the helpers they return). A `Backend` answers a few content primitives (lists pages, element
+detail, related items i.e. links from a term to others, search), and the client primitives the mixins call (`page`,
+`detail`, `follow` and `search`) from them, so the whole client (lists, details, search, helpers relations, cursors,
+shards) runs unchanged on top of any backend::
+
+    # snapshot some ontologies once, while online
+    SqliteBackend.create('ols.sqlite', RestBackend('https://www.ebi.ac.uk/ols/api'), ontologies=['go', 'efo'])
+    # then, with no network at all
+    client = OlsClient(backend=SqliteBackend('ols.sqlite'))
+    for term in client.ontology('go').terms():
+        ...
+
+`RestBackend` reads the OLS REST api, it is the default client backend, `SqliteBackend` a local snapshot file.
+"""
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.hal import KINDS, RELATIONS, HalDocuments, make_uri
+from ebi.ols.api.transports import _unquote_all
+
+logger = logging.getLogger(__name__)
+__all__ = ['Backend', 'Document', 'RestBackend', 'SqliteBackend', 'KINDS', 'RELATIONS']
+
+#: search documents `type` per list kind
+TYPES = OrderedDict([('terms', 'class'), ('properties', 'property'), ('individuals', 'individual'),
+                     ('ontologies', 'ontology')])
+# relation -> (stored parents relation, towards descendants, transitive)
+_DERIVED = {
+    'parents': ('parents', False, False),
+    'ancestors': ('parents', False, True),
+    'children': ('parents', True, False),
+    'descendants': ('parents', True, True),
+    'hierarchicalParents': ('hierarchicalParents', False, False),
+    'hierarchicalAncestors': ('hierarchicalParents', False, True),
+    'hierarchicalChildren': ('hierarchicalParents', True, False),
+    'hierarchicalDescendants': ('hierarchicalParents', True, True),
+}
+_HEADERS = {'Accept': 'application/hal+json, application/json'}
+
+
+class Document(dict):
+    """
+    Api document (element, list page, search response or api root) as json decoded, with the url it was read from
+    """
+
+    def __init__(self, url, content=()):
+        super().__init__(content)
+        self.url = url
+
+    @property
+    def data(self):
+        return self
+
+    @property
+    def links(self):
+        """ Document links urls by name (self link excluded) """
+        return OrderedDict((name, link['href']) for name, link in (self.get('_links') or {}).items()
+                           if name != 'self')
+
+    def __repr__(self):
+        return '<Document({})>'.format(self.url)
+
+
+def api_error(error):
+    """
+    Client exception for an api error document
+    :param error: error document, with its 'status'
+    :return: OlsException
+    """
+    if error['status'] == 404:
+        return exceptions.NotFoundException(error)
+    elif 400 <= error['status'] < 500:
+        return exceptions.BadParameter(error)
+    return exceptions.ServerError(error)
+
+
+def with_query(url, params):
+    """ url with params added to its query, sets values as sorted comma separated values """
+    query = [(name, ','.join(sorted(value)) if isinstance(value, (set, frozenset)) else value)
+             for name, value in params.items()]
+    if not query:
+        return url
+    return url + ('&' if '?' in url else '?') + urllib.parse.urlencode(query, safe=',')
+
+
+class Backend(abc.ABC):
+    """
+    OLS content primitives. Documents are plain OLS api elements (json decoded), their `_links` (mapping or list of
+    link names) only tell which links elements have: links urls are built by the client primitives.
+    Lists primitives return (documents, total elements count), unknown elements None.
+
+    Client primitives (`detail`, `page`, `follow`, `search`) answer api urls under `site` as api documents. They are
+    routed to content primitives here, list pages elements are returned as stored: nothing is rendered as json nor
+    decoded again.
+    """
+    #: api root url answered by client primitives (`OlsClient(backend=..., base_site=...)` sets it)
+    site = 'https://www.ebi.ac.uk/ols/api'
+    #: whether list pages can be read incrementally (see `open`, `ClientConfig.stream`)
+    streaming = False
+
+    @abc.abstractmethod
+    def ontologies(self, page=0, size=20):
+        """ Ontologies page """
+        pass
+
+    @abc.abstractmethod
+    def ontology(self, ontology_id):
+        """ Ontology document, None when unknown """
+        pass
+
+    @abc.abstractmethod
+    def items(self, kind, ontology_id=None, page=0, size=20, filters=None):
+        """
+        Items page
+        :param kind: 'terms', 'properties' or 'individuals'
+        :param ontology_id: ontology items, None for all ontologies ones
+        :param filters: only items whose 'iri', 'short_form' or 'obo_id' is the one given
+        """
+        pass
+
+    @abc.abstractmethod
+    def item(self, kind, ontology_id, iri):
+        """ Item document, None when unknown """
+        pass
+
+    @abc.abstractmethod
+    def related(self, ontology_id, iri, relation, page=0, size=20):
+        """ Term related terms page (link following, see `RELATIONS`), None when term or relation is unknown """
+        pass
+
+    @abc.abstractmethod
+    def search(self, params):
+        """
+        Search documents
+        :param params: OLS search parameters (q, rows, start, ontology, type, exact, fieldList...), str values
+        :return: (documents, numFound)
+        """
+        pass
+
+    def close(self):
+        pass
+
+    def detail(self, url):
+        """
+        Api document at url: element, elements list page (one IRI in several ontologies), ontology or api root
+        :raise NotFoundException: nothing at url
+        """
+        return self._route(url, {})
+
+    def page(self, url, params=None):
+        """
+        List page document
+        :param url: list url
+        :param params: page, size and list filters
+        """
+        return self._route(url, dict(params or {}))
+
+    def follow(self, document, name, params=None):
+        """
+        Page of the list a document link leads to (ontology terms, term relations...)
+        :param document: Document
+        :param name: link name
+        :param params: page, size and list filters
+        """
+        href = document.links.get(name)
+        if href is None:
+            raise exceptions.NotFoundException({'status': 404, 'error': 'Not Found', 'path': document.url,
+                                                'message': 'No %s link' % name})
+        return self.page(href.split('{', 1)[0], params)
+
+    def _route(self, url, params):
+        """ Api document at url, from content primitives """
+        parsed = urllib.parse.urlsplit(url)
+        params = dict(((name, values[-1]) for name, values in urllib.parse.parse_qs(parsed.query).items()),
+                      **params)
+        hal = HalDocuments(self.site)
+        root = urllib.parse.urlsplit(hal.site).path
+        try:
+            document = self._routed(hal, root, parsed.path, params)
+        except ValueError as e:
+            raise api_error(hal.error(400, parsed.path, str(e))[1])
+        if document is None:
+            raise api_error(hal.error(404, parsed.path)[1])
+        return Document(url, document)
+
+    def _routed(self, hal, root, path, params):
+        if not (path + '/').startswith(root + '/'):
+            return None
+        segments = [segment for segment in path[len(root):].split('/') if segment]
+        if not segments:
+            return hal.root()
+        if segments[0] == 'search' and len(segments) == 1:
+            return hal.search(*self.search(params), params)
+        page, size = int(params.get('page', 0)), int(params.get('size', 20))
+        if segments[0] == 'ontologies':
+            if len(segments) == 1:
+                return hal.paged(segments, 'ontologies', *self.ontologies(page, size), params)[1]
+            ontology_id = segments[1]
+            if len(segments) == 2:
+                ontology = self.ontology(ontology_id)
+                return hal.ontology_document(ontology) if ontology else None
+            kind = segments[2]
+            if kind not in KINDS or len(segments) > 5:
+                return None
+            if len(segments) == 3:
+                if self.ontology(ontology_id) is None:
+                    return None
+                return hal.paged(segments, kind, *self.items(kind, ontology_id, page, size, params), params)[1]
+            iri = _unquote_all(segments[3])
+            if len(segments) == 4:
+                item = self.item(kind, ontology_id, iri)
+                return hal.item_document(kind, item) if item else None
+            related = self.related(ontology_id, iri, segments[4], page, size) if kind == 'terms' else None
+            return hal.paged(segments, kind, *related, params)[1] if related is not None else None
+        if segments[0] in KINDS and len(segments) <= 2:
+            kind = segments[0]
+            if len(segments) == 2:
+                params = dict(params, iri=_unquote_all(segments[1]))
+            documents, total = self.items(kind, None, page, size, params)
+            if len(segments) == 2:
+                if not total:
+                    return None
+                del params['iri']
+            return hal.paged(segments, kind, documents, total, params)[1]
+        return None
+
+
+class RestBackend(Backend):
+    """
+    Backend reading a remote OLS api, default client one: api documents are read as they are, through the client
+    transport session when there is one (cassettes, failover, hedging), list pages can be streamed.
+    """
+    streaming = True
+
+    def __init__(self, site='https://www.ebi.ac.uk/ols/api', session=None, timeout=30, transport=None):
+        """
+        :param site: api root url
+        :param session: requests session
+        :param timeout: requests timeout, seconds
+        :param transport: coreapi transport whose session is used (see `ebi.ols.api.transports`)
+        """
+        self.site = site.rstrip('/')
+        if session is None and transport is not None:
+            # coreapi transports keep their requests session private, reuse it (connection pool, mounted adapters)
+            session = getattr(transport, '_session', None)
+        self._owned = session is None
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def __repr__(self):
+        return '<RestBackend(site={})>'.format(self.site)
+
+    def _request(self, url, params=None, stream=False):
+        url = with_query(url, params or {})
+        response = self.session.get(url, timeout=self.timeout, stream=stream, headers=_HEADERS)
+        if response.status_code >= 400:
+            try:
+                error = response.json()
+            except ValueError:
+                error = None
+            finally:
+                response.close()
+            if not isinstance(error, dict):
+                error = {'message': response.text}
+            error.setdefault('status', response.status_code)
+            error.setdefault('path', urllib.parse.urlsplit(url).path)
+            raise api_error(error)
+        return response
+
+    def _get(self, path, params=None):
+        try:
+            return self._request(self.site + '/' + path, params).json()
+        except exceptions.NotFoundException:
+            return None
+
+    @staticmethod
+    def _page(document, name):
+        if document is None:
+            return None
+        return document.get('_embedded', {}).get(name, []), document.get('page', {}).get('totalElements', 0)
+
+    def ontologies(self, page=0, size=20):
+        return self._page(self._get('ontologies', {'page': page, 'size': size}), 'ontologies')
+
+    def ontology(self, ontology_id):
+        return self._get('ontologies/' + ontology_id)
+
+    def items(self, kind, ontology_id=None, page=0, size=20, filters=None):
+        path = 'ontologies/{}/{}'.format(ontology_id, kind) if ontology_id else kind
+        return self._page(self._get(path, dict(filters or {}, page=page, size=size)), kind) or ([], 0)
+
+    def item(self, kind, ontology_id, iri):
+        return self._get('ontologies/{}/{}/{}'.format(ontology_id, kind, make_uri(iri)))
+
+    def related(self, ontology_id, iri, relation, page=0, size=20):
+        return self._page(self._get('ontologies/{}/terms/{}/{}'.format(ontology_id, make_uri(iri), relation),
+                                    {'page': page, 'size': size}), 'terms')
+
+    def search(self, params):
+        response = self._request(self.site + '/search', params).json()['response']
+        return response['docs'], response['numFound']
+
+    def detail(self, url):
+        return Document(url, self._request(url).json())
+
+    def page(self, url, params=None):
+        return Document(with_query(url, params or {}), self._request(url, params).json())
+
+    def open(self, url):
+        """
+        Request list page without reading its content
+        :return: requests.Response, body to be read with `iter_content`
+        """
+        return self._request(url, stream=True)
+
+    def close(self):
+        if self._owned:
+            self.session.close()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS items (
+    position INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ontology_id TEXT NOT NULL,
+    iri TEXT NOT NULL,
+    short_form TEXT,
+    obo_id TEXT,
+    is_obsolete INTEGER NOT NULL,
+    names TEXT NOT NULL,
+    subsets TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS items_key ON items (kind, ontology_id, iri);
+CREATE INDEX IF NOT EXISTS items_iri ON items (kind, iri);
+CREATE INDEX IF NOT EXISTS items_short_form ON items (kind, short_form);
+CREATE INDEX IF NOT EXISTS items_obo_id ON items (kind, obo_id);
+CREATE TABLE IF NOT EXISTS edges (ontology_id TEXT NOT NULL, relation TEXT NOT NULL, child TEXT NOT NULL,
+                                  parent TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS edges_up ON edges (ontology_id, relation, child);
+CREATE INDEX IF NOT EXISTS edges_down ON edges (ontology_id, relation, parent);
+"""
+# names / subsets columns are newline delimited lowercased values (newline first and last): exact value is
+# instr(names, nl || value || nl), value prefix instr(names, nl || value)
+_NL = '\n'
+
+
+def _delimited(values):
+    return _NL + _NL.join(value.lower() for value in values if value) + _NL
+
+
+def _listed(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _row(kind, ontology_id, document):
+    """ items table row for a document """
+    document = dict(document)
+    links = document.pop('_links', None)
+    if links is not None:
+        # only links names are kept, urls are built when serving
+        document['_links'] = [name for name in links if name != 'self']
+    if kind == 'ontologies':
+        config = document.get('config') or {}
+        iri, short_form, obo_id = ontology_id, ontology_id, None
+        names = [config.get('title'), ontology_id]
+        subsets, obsolete = [], False
+    else:
+        iri, short_form, obo_id = document['iri'], document.get('short_form'), document.get('obo_id')
+        names = [document.get('label')] + _listed(document.get('synonyms')) + [short_form, obo_id]
+        subsets, obsolete = _listed(document.get('in_subset')), bool(document.get('is_obsolete'))
+    return (kind, ontology_id, iri, short_form, obo_id, int(obsolete), _delimited(names), _delimited(subsets),
+            json.dumps(document, separators=(',', ':')))
+
+
+class SqliteBackend(Backend):
+    """
+    Local snapshot of OLS content in one SQLite file (see `create`), safe to share between threads (one read
+    connection per thread). Lists, details and relations are index lookups, search is a scan ranking exact names
+    first, then names starting with the query, then names containing it (names being labels, synonyms, short forms
+    and obo ids).
+    """
+    version = 1
+
+    def __init__(self, path):
+        """
+        :param path: snapshot file, created empty when it does not exist
+        """
+        self.path = path
+        self._local = threading.local()
+        self._totals = {}
+        self._relations = None
+        self._setup()
+
+    def _setup(self):
+        db = self.db
+        db.executescript(_SCHEMA)
+        db.execute('INSERT OR IGNORE INTO meta VALUES (?, ?)', ('version', str(self.version)))
+        version = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        if version != str(self.version):
+            raise exceptions.BadParameter('Unsupported snapshot version %s in %s' % (version, self.path))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, isolation_level=None)
+
+    @property
+    def db(self):
+        """ This thread connection """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def meta(self, key, default=None):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @property
+    def relations(self):
+        """ Stored relations (parents ones, the other ones are derived from them) """
+        if self._relations is None:
+            self._relations = self.meta('relations', [])
+        return self._relations
+
+    def __repr__(self):
+        return '<SqliteBackend(path={})>'.format(self.path)
+
+    @classmethod
+    def create(cls, path, source, ontologies=None, kinds=KINDS, relations=('parents', 'hierarchicalParents'),
+               page_size=500, workers=8):
+        """
+        Snapshot content from another backend (replacing `path` atomically once complete)
+        :param path: snapshot file
+        :param source: Backend to copy from, usually a RestBackend
+        :param ontologies: ontologies ids, None for all
+        :param kinds: lists copied per ontology
+        :param relations: terms relations copied ('parents' and / or 'hierarchicalParents', one call per term each),
+            children, ancestors and descendants ones are derived from them
+        :param page_size: source lists pages size
+        :param workers: relations loaded at the same time
+        :return: SqliteBackend
+        """
+        unknown = set(relations) - {'parents', 'hierarchicalParents'}
+        if unknown:
+            raise exceptions.BadParameter('Only parents relations can be stored, not %s' % ', '.join(sorted(unknown)))
+        temporary = path + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        start = time.perf_counter()
+        snapshot = cls(temporary)
+        db = snapshot.db
+        if ontologies is None:
+            documents = _pages(lambda page: source.ontologies(page, page_size), page_size)
+        else:
+            documents = (source.ontology(ontology_id) for ontology_id in ontologies)
+        with ThreadPoolExecutor(max(1, workers)) as executor:
+            for ontology in documents:
+                if ontology is None:
+                    raise exceptions.NotFoundException({'message': 'Ontology not found', 'path': str(ontologies)})
+                ontology_id = ontology['ontologyId']
+                db.execute('BEGIN')
+                db.execute('INSERT INTO items (kind, ontology_id, iri, short_form, obo_id, is_obsolete, names, '
+                           'subsets, document) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                           _row('ontologies', ontology_id, ontology))
+                for kind in kinds:
+                    iris = []
+                    for batch in _batches(_pages(lambda page: source.items(kind, ontology_id, page, page_size),
+                                                 page_size), page_size):
+                        db.executemany('INSERT OR IGNORE INTO items (kind, ontology_id, iri, short_form, obo_id, '
+                                       'is_obsolete, names, subsets, document) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                       [_row(kind, ontology_id, item) for item in batch])
+                        iris.extend(item['iri'] for item in batch)
+                    if kind == 'terms':
+                        for relation in relations:
+                            db.executemany('INSERT INTO edges VALUES (?, ?, ?, ?)',
+                                           _edges(executor, source, ontology_id, iris, relation, page_size,
+                                                  workers))
+                db.execute('COMMIT')
+                logger.info('Stored %s in %s', ontology_id, path)
+        db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+            ('relations', json.dumps(list(relations))), ('kinds', json.dumps(list(kinds))),
+            ('created', json.dumps(time.strftime('%Y-%m-%dT%H:%M:%S%z'))),
+            ('source', json.dumps(getattr(source, 'site', None)))])
+        db.execute('ANALYZE')
+        snapshot.close()
+        os.replace(temporary, path)
+        logger.info('Snapshot %s created in %.1fs', path, time.perf_counter() - start)
+        return cls(path)
+
+    def _total(self, query, params):
+        key = (query, params)
+        if key not in self._totals:
+            self._totals[key] = self.db.execute('SELECT count(*) FROM items WHERE ' + query, params).fetchone()[0]
+        return self._totals[key]
+
+    def _page(self, query, params, page, size):
+        rows = self.db.execute('SELECT document FROM items WHERE ' + query + ' ORDER BY position LIMIT ? OFFSET ?',
+                               params + (size, page * size))
+        return [json.loads(document) for document, in rows], self._total(query, params)
+
+    def _one(self, kind, ontology_id, iri):
+        row = self.db.execute('SELECT document FROM items WHERE kind = ? AND ontology_id = ? AND iri = ?',
+                              (kind, ontology_id, iri)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ontologies(self, page=0, size=20):
+        return self._page("kind = 'ontologies'", (), page, size)
+
+    def ontology(self, ontology_id):
+        return self._one('ontologies', ontology_id, ontology_id)
+
+    def items(self, kind, ontology_id=None, page=0, size=20, filters=None):
+        query, params = 'kind = ?', (kind,)
+        if ontology_id is not None:
+            query, params = query + ' AND ontology_id = ?', params + (ontology_id,)
+        for name in ('iri', 'short_form', 'obo_id'):
+            if filters and name in filters:
+                query, params = query + ' AND {} = ?'.format(name), params + (filters[name],)
+                break
+        return self._page(query, params, page, size)
+
+    def item(self, kind, ontology_id, iri):
+        return self._one(kind, ontology_id, iri)
+
+    def _related_iris(self, ontology_id, iris, relation):
+        """ Recursive query of related terms IRIs, None when relation is not stored """
+        base, down, transitive = _DERIVED[relation]
+        if base not in self.relations:
+            return None
+        source, target = ('parent', 'child') if down else ('child', 'parent')
+        seeds = ', '.join('?' * len(iris))
+        if not transitive:
+            return ('SELECT {} FROM edges WHERE ontology_id = ? AND relation = ? AND {} IN ({})'.format(
+                target, source, seeds), (ontology_id, base) + tuple(iris))
+        return ('WITH RECURSIVE related(iri) AS (SELECT {target} FROM edges WHERE ontology_id = ? AND relation = ? '
+                'AND {source} IN ({seeds}) UNION SELECT edges.{target} FROM edges JOIN related ON edges.{source} = '
+                'related.iri WHERE edges.ontology_id = ? AND edges.relation = ?) SELECT iri FROM related'.format(
+                    target=target, source=source, seeds=seeds), (ontology_id, base) + tuple(iris) + (ontology_id, base))
+
+    def related(self, ontology_id, iri, relation, page=0, size=20):
+        if relation not in _DERIVED or self.item('terms', ontology_id, iri) is None:
+            return None
+        related = self._related_iris(ontology_id, [iri], relation)
+        if related is None:
+            return None
+        query, params = related
+        return self._page("kind = 'terms' AND ontology_id = ? AND iri IN (" + query + ')', (ontology_id,) + params,
+                          page, size)
+
+    def search(self, params):
+        query = (params.get('q') or '').lower()
+        rows, start = int(params.get('rows', 10)), int(params.get('start', 0))
+        types = [kind for kind, name in TYPES.items()
+                 if name in params.get('type', 'class,property,individual,ontology').split(',')]
+        where = ['kind IN ({})'.format(', '.join('?' * len(types)))]
+        values = list(types)
+        if params.get('ontology'):
+            ontologies = params['ontology'].split(',')
+            where.append('ontology_id IN ({})'.format(', '.join('?' * len(ontologies))))
+            values.extend(ontologies)
+        if params.get('obsoletes') != 'true':
+            where.append('NOT is_obsolete')
+        if params.get('slim'):
+            slims = params['slim'].lower().split(',')
+            where.append('(' + ' OR '.join(['instr(subsets, ?)'] * len(slims)) + ')')
+            values.extend(_NL + slim + _NL for slim in slims)
+        for name, relation in (('childrenOf', 'descendants'), ('allChildrenOf', 'hierarchicalDescendants')):
+            if params.get(name):
+                related = self._related_iris_any(params[name].split(','), relation)
+                where.append("kind = 'terms' AND iri IN (" + related[0] + ')')
+                values.extend(related[1])
+        if query == '*':
+            score = '1'
+        else:
+            score = ('CASE WHEN instr(names, :exact) THEN 0 WHEN instr(names, :prefix) THEN 1 '
+                     'WHEN instr(names, :query) THEN 2 END')
+        if params.get('exact') == 'true' and query != '*':
+            score = 'CASE WHEN instr(names, :exact) THEN 0 END'
+        named = {'exact': _NL + query + _NL, 'prefix': _NL + query, 'query': query}
+        # positional filters values are named too, to mix them with the score parameters
+        for position, value in enumerate(values):
+            named['v%s' % position] = value
+        condition = ' AND '.join(where)
+        for position in range(len(values)):
+            condition = condition.replace('?', ':v%s' % position, 1)
+        ranked = 'SELECT kind, ontology_id, document, {} AS score, position FROM items WHERE {}'.format(
+            score, condition)
+        total = self.db.execute('SELECT count(*) FROM (' + ranked + ') WHERE score IS NOT NULL', named).fetchone()[0]
+        found = self.db.execute('SELECT kind, ontology_id, document FROM (' + ranked + ') WHERE score IS NOT NULL '
+                                'ORDER BY score, position LIMIT :rows OFFSET :start',
+                                dict(named, rows=rows, start=start))
+        fields = params['fieldList'].split(',') if params.get('fieldList') else None
+        docs = [_search_document(kind, ontology_id, json.loads(document), fields) for kind, ontology_id, document
+                in found]
+        return docs, total
+
+    def _related_iris_any(self, iris, relation):
+        """ Related terms in any ontology storing the seed terms """
+        base, down, transitive = _DERIVED[relation]
+        if base not in self.relations:
+            raise exceptions.BadFilters('%s relation is not stored in %s' % (base, self.path))
+        seeds = ', '.join('?' * len(iris))
+        return ('WITH RECURSIVE related(ontology_id, iri) AS (SELECT ontology_id, child FROM edges WHERE relation = ? '
+                'AND parent IN ({}) UNION SELECT edges.ontology_id, edges.child FROM edges JOIN related ON '
+                'edges.parent = related.iri AND edges.ontology_id = related.ontology_id WHERE edges.relation = ?) '
+                'SELECT iri FROM related'.format(seeds), [base] + list(iris) + [base])
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __getstate__(self):
+        # connections stay in their process (harvest workers, shards open the file again)
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._local = threading.local()
+        self._totals = {}
+        self._relations = None
+
+
+def _pages(fetch, size):
+    """ All documents of a paged list, `fetch(page)` returns (documents, total) """
+    page = 0
+    while True:
+        documents, total = fetch(page)
+        yield from documents
+        page += 1
+        if not documents or page * size >= total:
+            return
+
+
+def _batches(documents, size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parents(source, ontology_id, iri, relation, size):
+    return [parent['iri'] for parent in _pages(lambda page: source.related(ontology_id, iri, relation, page, size)
+                                                or ([], 0), size)]
+
+
+def _edges(executor, source, ontology_id, iris, relation, size, workers):
+    """ (ontology, relation, child, parent) rows, terms parents loaded concurrently """
+    window = deque()
+    for iri in iris:
+        window.append((iri, executor.submit(_parents, source, ontology_id, iri, relation, size)))
+        while len(window) > workers * 4:
+            child, future = window.popleft()
+            yield from ((ontology_id, relation, child, parent) for parent in future.result())
+    while window:
+        child, future = window.popleft()
+        yield from ((ontology_id, relation, child, parent) for parent in future.result())
+
+
+def _search_document(kind, ontology_id, document, fields=None):
+    if kind == 'ontologies':
+        config = document.get('config') or {}
+        iri, label, short_form, obo_id = config.get('fileLocation'), config.get('title'), ontology_id, None
+        description = [config['description']] if config.get('description') else []
+        prefix, defining = config.get('preferredPrefix') or ontology_id.upper(), True
+    else:
+        iri, label, short_form, obo_id = (document.get(name) for name in ('iri', 'label', 'short_form', 'obo_id'))
+        description = _listed(document.get('description'))
+        prefix, defining = document.get('ontology_prefix'), document.get('is_defining_ontology', True)
+    doc = OrderedDict([
+        ('id', '{}:{}:{}'.format(ontology_id, TYPES[kind], iri)), ('iri', iri), ('short_form', short_form),
+        ('obo_id', obo_id), ('label', label), ('description', description), ('ontology_name', ontology_id),
+        ('ontology_prefix', prefix), ('type', TYPES[kind]), ('is_defining_ontology', defining)])
+    if fields:
+        doc = OrderedDict((name, value) for name, value in doc.items() if name in fields)
+    return doc
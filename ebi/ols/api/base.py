@@ -13,23 +13,63 @@
    limitations under the License.
 """
 import collections
+import copy
+import functools
 import logging
 import math
 import os
+import threading
 import time
 import urllib.parse
 
-import coreapi.exceptions
-from coreapi import Client, codecs
-from hal_codec import HALCodec as OriginCodec
-from hal_codec import _parse_document as HALParseDocument
-from requests.exceptions import ConnectionError
-
 from ebi.ols.api import exceptions
 
 logger = logging.getLogger(__name__)
-__all__ = ['HALCodec', 'DetailClientMixin', 'ListClientMixin',
-           'SearchClientMixin', 'retry_requests']
+__all__ = ['ClientConfig', 'Cursor', 'HALCodec', 'DetailClientMixin', 'ListClientMixin', 'ListIterator',
+           'SearchClientMixin', 'Shard', 'retry_requests']
+
+
+class ClientConfig(object):
+    """
+    Settings carried by every api client created from an `OlsClient` and by the helpers they return, so that
+    several clients (different sites, page sizes, transports) can be used concurrently in one process.
+    """
+    #: configuration used by helpers not created through a client (ex: `helpers.Term(iri=.., ontology_name=..)`),
+    #: first `OlsClient` one, or set with `OlsClient.set_default()`.
+    default = None
+
+    def __init__(self, site='https://www.ebi.ac.uk/ols/api', page_size=500, transport=None, max_retry=5,
+                 retry_delay=5, stream=False, backend=None):
+        """
+        :param site: OLS api base url
+        :param page_size: lists page size
+        :param transport: coreapi transport used for all calls
+        :param max_retry: calls tries in case of network / server error
+        :param retry_delay: seconds between two tries
+        :param stream: decode lists pages incrementally while iterating (see `ebi.ols.api.streaming`)
+        :param backend: content backend (see `ebi.ols.api.backends`), default: `RestBackend` on site and transport
+        """
+        self.site = site
+        self.page_size = page_size
+        self.transport = transport
+        self.max_retry = max_retry
+        self.retry_delay = retry_delay
+        self.stream = stream
+        self._backend = backend
+
+    @property
+    def backend(self):
+        """ Backend answering all api calls, the REST one is only built when first used """
+        if self._backend is None:
+            from ebi.ols.api.backends import RestBackend
+            self._backend = RestBackend(self.site, transport=self.transport)
+        return self._backend
+
+    def __repr__(self):
+        return '<ClientConfig(site={}, page_size={})>'.format(self.site, self.page_size)
+
+
+ClientConfig.default = ClientConfig()
 
 
 def retry_requests(api_func):
@@ -40,27 +80,39 @@ def retry_requests(api_func):
     """
     from itertools import chain
 
+    class Trace(object):
+        """ Call description, only built when actually logged (arguments may be whole documents) """
+
+        def __init__(self, args, kwargs):
+            self.args = args
+            self.kwargs = kwargs
+
+        def __str__(self):
+            return "%s.%s(%s)" % (self.args[0].__class__.__name__, api_func.__name__,
+                                  ", ".join(map(repr, chain(self.args[1:], self.kwargs.values()))))
+
     def call_api(*args, **kwargs):
-        call_object = args[0].__class__.__name__
+        from requests.exceptions import ConnectionError, Timeout
+        config = getattr(args[0], 'config', None) or ClientConfig.default
         retry = 1
-        max_retry = 5
+        max_retry = config.max_retry
+        trace = Trace(args, kwargs)
         while retry <= max_retry:
-            trace = "%s.%s(%s)" % (call_object, api_func.__name__,
-                                   ", ".join(map(repr, chain(args[1:], kwargs.values()))))
             result = None
             try:
                 logger.debug('Calling client (%s/%s): %s ', retry, max_retry, trace)
                 result = api_func(*args, **kwargs)
                 return result
-            except (ConnectionError, coreapi.exceptions.CoreAPIException, exceptions.ServerError) as e:
-                # wait 5 seconds until next OLS api client try
+            except (ConnectionError, Timeout, exceptions.ServerError) as e:
                 logger.warning('Api Error: %s', e)
                 if logger.isEnabledFor(logging.INFO):
                     logger.info("Full response %s", result)
-                logger.warning('Call retry (%s/%s): %s ', retry, max_retry, trace)
-                time.sleep(5)
                 retry += 1
-                if retry > max_retry:
+                if retry <= max_retry:
+                    # wait (5 seconds by default) until next OLS api client try
+                    logger.warning('Call retry (%s/%s): %s ', retry, max_retry, trace)
+                    time.sleep(config.retry_delay)
+                else:
                     logger.error('API unrecoverable error %s', trace)
                     logger.error('Errors %s, %s', args, kwargs)
                     raise exceptions.ObjectNotRetrievedError(e)
@@ -78,33 +130,70 @@ def retry_requests(api_func):
     return call_api
 
 
-class HALCodec(OriginCodec):
+class HALCodec(object):
+    """
+    coreapi codec for HAL documents, with 'hal' format (api clients read json documents as they are, this codec is
+    kept for coreapi clients of the api).
+    Delegates to hal_codec.HALCodec, imported on first decoding only to keep this module import cheap.
+    """
     format = 'hal'
+    media_type = 'application/hal+json'
+    supports = ['decoding']
+    _codec = None
+
+    def get_media_types(self):
+        return [self.media_type]
+
+    def load(self, bytes, **kwargs):
+        if HALCodec._codec is None:
+            from hal_codec import HALCodec as OriginCodec
+            HALCodec._codec = OriginCodec()
+        return HALCodec._codec.load(bytes, **kwargs)
+
+
+@functools.lru_cache(maxsize=64)
+def fields_keys(fields):
+    """
+    Json keys possibly matching requested fields (OLS mixes snake_case and camelCase keys)
+    :param fields: frozenset of python names
+    :return: tuple
+    """
+    import inflection
+    keys = []
+    for field in sorted(fields):
+        for key in (field, inflection.camelize(field, False)):
+            if key not in keys:
+                keys.append(key)
+    return tuple(keys)
 
 
 class BaseClient:
-    decoders = [HALCodec(), codecs.JSONCodec()]
+    #: requested fields (None: all), others are not converted into returned helpers attributes
+    fields = None
 
-    def __init__(self, uri, elem_class):
+    def __init__(self, uri, elem_class, transport=None, config=None):
         """
         Init from base uri and expected element helper class
         :param uri: relative uri to base OLS url
         :param elem_class: helper class expected
+        :param transport: coreapi transport to use instead of default HTTP one (see `ebi.ols.api.transports`)
+        :param config: `ClientConfig` of the OlsClient this client belongs to, bound to returned helpers
         """
-        self.client = Client(decoders=self.decoders)
+        self.config = config
+        if transport is None and config is not None:
+            transport = config.transport
+        self.transport = transport
+        self.backend = self._get_backend(transport, config or ClientConfig.default)
         self.uri = uri
         self.elem_class = elem_class
 
-    def _parse_response(self, received, path=''):
-        logger.debug("Parse response from %s/%s (%s)", self.uri, path, type(received))
-        if isinstance(received, coreapi.document.Document):
-            return received
-        elif isinstance(received, collections.OrderedDict):
-            return HALParseDocument(received)
-        logger.error('%s/%s did not retrieved a parse-able object object: %s', self.uri, path, type(received))
-        raise exceptions.UnparsedDocumentException(
-            'Document (%s) %s could not be parsed' % (received.__class__.__name__,
-                                                      received))
+    @staticmethod
+    def _get_backend(transport, config):
+        """ Configuration backend, a REST one for a transport the configuration does not use """
+        if transport is not None and transport is not config.transport:
+            from ebi.ols.api.backends import RestBackend
+            return RestBackend(config.site, transport=transport)
+        return config.backend
 
     @staticmethod
     def filters_response(filters):
@@ -150,7 +239,10 @@ class BaseClient:
                 raise AssertionError("Wrong filter type %s" % filters['type'])
             assert assertion_set.issubset({'class', 'property', 'individual', 'ontology', 'term'}), \
                 "Wrong type - check OLS doc"
-            filters['type'] = filters['type'].replace('term', 'class')
+            if isinstance(filters['type'], set):
+                filters['type'] = {'class' if value == 'term' else value for value in filters['type']}
+            else:
+                filters['type'] = filters['type'].replace('term', 'class')
         if 'exact' in filters:
             assert filters['exact'] in ['true', 'false'], '"exact" only accept true|false'
         if 'groupFields' in filters:
@@ -177,10 +269,34 @@ class BaseClient:
     def elem_class_instance(self, **data):
         """
         Get an item object from dedicated class expected object
+        Embedded HAL links (terms, parents, ...) are not helpers data, they would shadow helpers methods.
         :param data:
         :return:
         """
-        return self.elem_class(**data)
+        return self.bind(self.elem_class(**self.project(data)))
+
+    def project(self, data):
+        """ Element data without HAL links, restricted to requested fields if any """
+        if self.fields is None:
+            return {name: value for name, value in data.items() if name != '_links'}
+        # only requested keys are looked up, other ones (annotations...) are never even iterated
+        return {key: data[key] for key in fields_keys(self.fields) if key in data}
+
+    @staticmethod
+    def make_fields(fields):
+        """ Normalized requested fields set (python names: `obo_id`, `ontology_id`...) """
+        from ebi.ols.api.helpers import underscore
+        if fields is None:
+            return None
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        return frozenset(underscore(field.strip()) for field in fields)
+
+    def bind(self, helper):
+        """ Attach current client configuration to helper, used for its own sub queries (terms, relations) """
+        if self.config is not None:
+            helper.client_config = self.config
+        return helper
 
 
 class DetailClientMixin(BaseClient):
@@ -188,42 +304,262 @@ class DetailClientMixin(BaseClient):
     Item detailed client, fetch a unique OLS api resource based ont its identifier
 
     """
+    #: identifiers (IRIs) known to return several elements, with the ontology whose element was returned
+    defining_cache_size = 4096
+
+    def __init__(self, uri, elem_class, transport=None, config=None):
+        super().__init__(uri, elem_class, transport, config)
+        # shared with projected copies
+        self._defining = collections.OrderedDict()
+        self._defining_lock = threading.Lock()
 
     @retry_requests
-    def __call__(self, identifier, silent=True, unique=True):
+    def __call__(self, identifier, silent=True, unique=True, fields=None):
         """ Check one element from OLS API according to specified identifier
         In cas API returns multiple element return either:
         - the one which is defining_ontology (flag True)
         - The first one if none (Should not happen)
+        Once known, this element ontology is remembered: next lookups for identifier directly load it from there.
+        :param fields: only convert these fields into returned helper (ex: ['iri', 'obo_id', 'label'])
         """
+        if fields is not None:
+            # projection on a copy, shared detail clients are never altered
+            projected = copy.copy(self)
+            projected.fields = self.make_fields(fields)
+            return projected(identifier, silent, unique)
         iri = self.make_uri(identifier)
         path = "/".join([self.uri, iri])
         logger_id = '[identifier:{}, path:{}]'.format(iri, path)
         logger.debug('Detail client %s [silent:%s, unique:%s]', logger_id, silent, unique)
+        with self._defining_lock:
+            ontology_name = self._defining.get(identifier) if unique else None
+        if ontology_name:
+            helper = self._from_defining(identifier, iri, ontology_name)
+            if helper is not None:
+                return helper
+        document = self.backend.detail(path)
+        if 'page' in document:
+            # the request returned a list of object
+            if not silent:
+                logger.warning('OLS returned multiple {}s for {}'.format(self.elem_class.__name__, logger_id))
+            # return a list instead
+            elms = ListClientMixin(self.uri, self.elem_class, document, 100, transport=self.transport,
+                                   config=self.config, fields=self.fields)
+            if not unique:
+                return elms
+            if not elms.data:
+                raise exceptions.NotFoundException({'status': 404, 'error': 'Not Found', 'path': path,
+                                                    'message': 'No %s found' % self.elem_class.__name__})
+            # first page elements data, only the returned one is converted into helper
+            defining = next((data for data in elms.data if data.get('is_defining_ontology')), None)
+            if defining is not None:
+                helper = self.elem_class_instance(**defining)
+                ontology_name = defining.get('ontology_name')
+            else:
+                helper = next((x for x in elms if x.is_defining_ontology), None) or elms[0]
+                ontology_name = getattr(helper, 'ontology_name', None)
+            self._remember(identifier, ontology_name)
+            return helper
+        return self.elem_class_instance(**document)
+
+    def _remember(self, identifier, ontology_name):
+        if ontology_name:
+            with self._defining_lock:
+                self._defining[identifier] = ontology_name
+                self._defining.move_to_end(identifier)
+                while len(self._defining) > self.defining_cache_size:
+                    self._defining.popitem(last=False)
+
+    def _from_defining(self, identifier, iri, ontology_name):
+        """ Element from its remembered ontology endpoint, None when it is not there anymore """
+        base, path = self.uri.rsplit('/', 1)
         try:
-            document = self._parse_response(self.client.get(path, force_codec=True), iri)
-            if self.elem_class.path in document.data:
-                # the request returned a list of object
-                if not silent:
-                    logger.warning('OLS returned multiple {}s for {}'.format(self.elem_class.__name__, logger_id))
-                # return a list instead
-                elms = ListClientMixin(self.uri, self.elem_class, document, 100)
-                if not unique:
-                    return elms
-                else:
-                    return next((x for x in elms if x.is_defining_ontology), elms[0])
-            return self.elem_class_instance(**document.data)
-        except coreapi.exceptions.ErrorMessage as e:
-            if 'status' in e.error:
-                if e.error['status'] == 404:
-                    raise exceptions.NotFoundException(e.error)
-                elif 400 < e.error['status'] < 499:
-                    raise exceptions.BadParameter(e.error)
-                elif e.error['status'] >= 500:
-                    raise exceptions.ServerError(e.error)
-            raise exceptions.OlsException(e.error)
-        except coreapi.exceptions.CoreAPIException as e:
-            raise e
+            document = self.backend.detail('/'.join([base, 'ontologies', ontology_name, path, iri]))
+        except exceptions.NotFoundException:
+            logger.info('%s not found in %s anymore', identifier, ontology_name)
+            with self._defining_lock:
+                self._defining.pop(identifier, None)
+            return None
+        return self.elem_class_instance(**document)
+
+
+class Cursor(object):
+    """
+    Serializable list iteration position: enough to rebuild a list client and continue an iteration from there, only
+    fetching the page the position belongs to (see `ListClientMixin.from_cursor`, `OlsClient.resume`).
+    """
+    version = 1
+
+    def __init__(self, kind, uri, elem_class, index=0, page_size=500, filters=None, query=None, fields=None,
+                 href=None):
+        """
+        :param kind: 'list' or 'search'
+        :param uri: list client base uri (lists items are under uri/<helper path>)
+        :param elem_class: helper class name (from `ebi.ols.api.helpers`)
+        :param index: next element index in full list
+        :param page_size: list page size, position page is index // page_size
+        :param filters: list / search filters
+        :param query: searched string
+        :param fields: requested fields
+        :param href: list pages url, without paging parameters (default uri/<helper path>)
+        """
+        self.kind = kind
+        self.uri = uri
+        self.elem_class = elem_class
+        self.index = index
+        self.page_size = page_size
+        self.filters = dict(filters) if filters else {}
+        self.query = query
+        self.fields = sorted(fields) if fields is not None else None
+        self.href = href
+
+    @property
+    def page(self):
+        return self.index // self.page_size
+
+    @property
+    def offset(self):
+        return self.index % self.page_size
+
+    def to_dict(self):
+        return collections.OrderedDict([
+            ('version', self.version), ('kind', self.kind), ('uri', self.uri), ('elem_class', self.elem_class),
+            ('index', self.index), ('page_size', self.page_size), ('page', self.page), ('offset', self.offset),
+            ('filters', {name: sorted(value) if isinstance(value, set) else value
+                         for name, value in self.filters.items()}),
+            ('query', self.query), ('fields', self.fields), ('href', self.href)])
+
+    @classmethod
+    def from_dict(cls, content):
+        if content.get('version') != cls.version:
+            raise exceptions.BadParameter('Unsupported cursor version %s' % content.get('version'))
+        filters = {name: set(value) if isinstance(value, list) else value
+                   for name, value in (content.get('filters') or {}).items()}
+        return cls(content['kind'], content['uri'], content['elem_class'], content['index'], content['page_size'],
+                   filters, content.get('query'), content.get('fields'), content.get('href'))
+
+    def save(self, path):
+        """ Store cursor as json checkpoint file (replaced atomically) """
+        import json
+        temporary = path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Read cursor from json checkpoint file """
+        import json
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __eq__(self, other):
+        return isinstance(other, Cursor) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return '<Cursor({} {} {}, index={}, page={}, offset={})>'.format(
+            self.kind, self.elem_class, self.uri, self.index, self.page, self.offset)
+
+
+class ListIterator(object):
+    """
+    List iterator aware of its position, which can be checkpointed at any time with `cursor()`
+    """
+
+    def __init__(self, items, begin, end, checkpoint=None, every=None):
+        """
+        :param items: iterated list client
+        :param begin: first element index
+        :param end: stop index
+        :param checkpoint: json file where cursor is saved every `every` elements and on iteration error
+        :param every: elements between checkpoints (default list page size)
+        """
+        self.items = items
+        self.index = begin
+        self.checkpoint = checkpoint
+        self.every = every or items.page_size
+        self._elements = items._gen_elems_forward(begin, end)
+
+    def cursor(self):
+        """ Position of next element to return """
+        return self.items.cursor(self.index)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            element = next(self._elements)
+        except StopIteration:
+            if self.checkpoint:
+                self.cursor().save(self.checkpoint)
+            raise
+        except Exception:
+            if self.checkpoint:
+                logger.warning('Iteration stopped at %s, cursor saved to %s', self.index, self.checkpoint)
+                self.cursor().save(self.checkpoint)
+            raise
+        self.index += 1
+        if self.checkpoint and self.index % self.every == 0:
+            self.cursor().save(self.checkpoint)
+        return element
+
+
+class Shard(object):
+    """
+    Contiguous pages range of a list / search results, independent from the list it comes from (see
+    `ListClientMixin.shard`). Shards are picklable: they can be shipped to other processes or hosts, where they fetch
+    their own pages (with default HTTP transport, custom transports are not shipped).
+    """
+
+    def __init__(self, cursor, first_page, last_page, total, config=None):
+        """
+        :param cursor: list position (index ignored)
+        :param first_page: first shard page
+        :param last_page: page after shard last one
+        :param total: full list length
+        :param config: `ClientConfig` used to fetch pages
+        """
+        self.cursor = cursor
+        self.first_page = first_page
+        self.last_page = last_page
+        self.total = total
+        self.config = config
+
+    @property
+    def begin(self):
+        return min(self.first_page * self.cursor.page_size, self.total)
+
+    @property
+    def end(self):
+        return min(self.last_page * self.cursor.page_size, self.total)
+
+    def __len__(self):
+        return self.end - self.begin
+
+    def __iter__(self):
+        if not len(self):
+            return iter(())
+        cursor = copy.copy(self.cursor)
+        cursor.index = self.begin
+        list_class = SearchClientMixin if cursor.kind == 'search' else ListClientMixin
+        return ListIterator(list_class.from_cursor(cursor, config=self.config), self.begin, self.end)
+
+    def __getstate__(self):
+        from ebi.ols.api.backends import RestBackend
+        state = dict(self.__dict__)
+        config = self.config
+        if config is not None and (config.transport is not None or isinstance(config._backend, RestBackend)):
+            # transports and REST sessions stay in this process, workers build their own
+            state['config'] = copy.copy(config)
+            state['config'].transport = None
+            state['config']._backend = None
+        return state
+
+    def __repr__(self):
+        return '<Shard({} {} {}, pages=[{}, {}), elements=[{}, {}))>'.format(
+            self.cursor.kind, self.cursor.elem_class, self.cursor.uri, self.first_page, self.last_page, self.begin,
+            self.end)
 
 
 class ListClientMixin(BaseClient):
@@ -232,49 +568,44 @@ class ListClientMixin(BaseClient):
     """
     _pages = None
     _len = None
+    _href = None
     page_size = 500
     current_filters = {}
+    #: maximum number of pages fetched at the same time for slices
+    max_fetch_workers = 8
+    #: number of elements shown in list representation
+    repr_size = 5
 
-    def __init__(self, uri, elem_class, document=None, page_size=500, filters=None, index=0):
+    def __init__(self, uri, elem_class, document=None, page_size=500, filters=None, index=0, transport=None,
+                 config=None, fields=None):
         """
         Initialize a list object
         :param uri: the OLS api base source uri
         :param elem_class: the expected class items objects
-        :param: coreapi.Document from api (used to avoid double call to api if already loade elsewhere
+        :param: backends.Document from api (used to avoid double call to api if already loade elsewhere
+        :param transport: coreapi transport to use instead of default HTTP one
+        :param config: `ClientConfig` bound to returned helpers
+        :param fields: only convert these fields into returned helpers
         """
+        self.fields = self.make_fields(fields)
         if filters is None:
             filters = {}
         self.current_filters = filters
         self.page_size = page_size
-        super().__init__(document.url if document is not None else uri, elem_class)
-        try:
-            if document is not None:
-                assert (isinstance(document, coreapi.document.Document))
-                self.document = document
-            else:
-                self.document = self._parse_response(self.client.get(uri, force_codec=True))
-            logger.debug('ListClientMixin init[%s][%s][%s]', self.elem_class, self.document.url, self.page_size)
-        except coreapi.exceptions.ErrorMessage as e:
-            if 'status' in e.error:
-                if e.error['status'] == 404:
-                    raise exceptions.NotFoundException(e.error)
-                elif 400 < e.error['status'] < 499:
-                    raise exceptions.BadParameter(e.error)
-                elif e.error['status'] >= 500:
-                    raise exceptions.ServerError(e.error)
-            raise exceptions.OlsException(e.error)
-        except coreapi.exceptions.CoreAPIException as e:
-            raise e
+        super().__init__(document.url if document is not None else uri, elem_class, transport, config)
+        self.document = document if document is not None else self.backend.detail(uri)
+        logger.debug('ListClientMixin init[%s][%s][%s]', self.elem_class, self.document.url, self.page_size)
         self.index = index
 
     @retry_requests
-    def __call__(self, filters=None, action=None):
+    def __call__(self, filters=None, action=None, fields=None):
         """
         Allow to search for a list of helpers, retrieve self, wich is now a iterator on the actual list of related
         helpers
+        :param fields: only convert these fields into returned helpers (default: all, or this list ones)
         """
-        if filters is None:
-            filters = {}
+        # never alter caller's filters
+        filters = dict(filters) if filters else {}
         page_size = self.page_size
         if filters:
             try:
@@ -287,28 +618,16 @@ class ListClientMixin(BaseClient):
         params = {'page': 0, 'size': page_size}
         params.update(filters)
         path = action if action else self.path
-        try:
-            document = self.fetch_document(path, params, filters)
-        except coreapi.exceptions.ErrorMessage as e:
-            if 'status' in e.error:
-                if e.error['status'] == 404:
-                    raise exceptions.NotFoundException(e.error)
-                elif 400 < e.error['status'] < 499:
-                    raise exceptions.BadParameter(e.error)
-                elif e.error['status'] >= 500:
-                    raise exceptions.ServerError(e.error)
-            raise exceptions.OlsException(e.error)
-        except coreapi.exceptions.CoreAPIException as e:
-            raise e
-
-        obj = self.__class__(path, self.elem_class, document, page_size, filters)
+        document = self.fetch_document(path, params, filters)
+        obj = self.__class__(path, self.elem_class, document, page_size, filters, transport=self.transport,
+                             config=self.config, fields=fields if fields is not None else self.fields)
         obj.uri = urllib.parse.urljoin(obj.uri, os.path.dirname(urllib.parse.urlparse(obj.uri).path))
         return obj
 
     @retry_requests
     def fetch_document(self, path, params=None, filters=None, base_document=None):
         """
-        Fetch coreapi.Document object fro specified path (based on current loaded document fro base uri
+        Fetch first page of the list a link of current loaded document (or base_document) leads to
         :param base_document: initial document
         :param filters: filters to apply
         :param path: related path
@@ -324,7 +643,81 @@ class ListClientMixin(BaseClient):
         logger.info('Loading document %s/%s', base_document.url, path)
         logger.info("With Params: %s",
                      '&'.join(['%s=%s' % (name, value) for name, value in params.items()])) if params else None
-        return self._parse_response(self.client.action(base_document, path, params=params, validate=False), path)
+        return self.backend.follow(base_document, path, params)
+
+    @property
+    def href(self):
+        """
+        List url, without paging parameters: the one of its pages documents (relations lists included), or
+        uri/path for lists built on the api root document
+        """
+        if self._href is None:
+            document = getattr(self, 'document', None)
+            if document is not None and 'page' in document and document.url:
+                parts = urllib.parse.urlsplit(document.url)
+                self._href = urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+            else:
+                self._href = '/'.join([self.uri, self.path])
+        return self._href
+
+    def _page_params(self, page):
+        params = collections.OrderedDict((name, value) for name, value in self.current_filters.items()
+                                         if name not in ('page', 'size'))
+        params.update(page=page, size=self.page_size)
+        return params
+
+    def _page_uri(self, page):
+        params = [(name, ','.join(sorted(value)) if isinstance(value, set) else value)
+                  for name, value in self._page_params(page).items()]
+        return self.href + '?' + urllib.parse.urlencode(params)
+
+    def _stream_keys(self):
+        return '_embedded', self.path
+
+    @property
+    def streamed(self):
+        """ Whether pages are decoded incrementally while iterating (see `ClientConfig.stream`) """
+        return self.config is not None and self.config.stream and self.backend.streaming
+
+    @retry_requests
+    def open_page(self, page):
+        """
+        Request page without reading its content
+        :param page: expected page
+        :return: requests.Response, body to be read with `iter_content`
+        """
+        uri = self._page_uri(page)
+        logger.debug('Stream page "%s"', uri)
+        return self.backend.open(uri)
+
+    def stream_page(self, page):
+        """
+        Generate page elements data as they are decoded from HTTP body
+        :param page: expected page
+        :return: generator of dict
+        """
+        from ebi.ols.api.streaming import iter_elements, CHUNK_SIZE
+        response = self.open_page(page)
+        try:
+            for element in iter_elements(response.iter_content(CHUNK_SIZE), self._stream_keys()):
+                yield element
+        finally:
+            response.close()
+
+    def _gen_elems_streamed(self, begin, end):
+        while begin < end:
+            page, offset = divmod(begin, self.page_size)
+            position = 0
+            for data in self.stream_page(page):
+                if position >= offset:
+                    yield self.elem_class_instance(**data)
+                    begin += 1
+                    if begin >= end:
+                        return
+                position += 1
+            if position <= offset:
+                # list is shorter than announced
+                return
 
     @retry_requests
     def fetch_page(self, page):
@@ -333,21 +726,8 @@ class ListClientMixin(BaseClient):
         :param page: expected page
         :return Document: fetched page document fro api
         """
-        uri = '/'.join([self.uri, self.path]) + '?page={}&size={}'.format(page, self.page_size)
-        logger.debug('Fetch page "%s"', uri)
-        try:
-            return self._parse_response(self.client.get(uri, force_codec=True))
-        except coreapi.exceptions.ErrorMessage as e:
-            if 'status' in e.error:
-                if e.error['status'] == 404:
-                    raise exceptions.NotFoundException(e.error)
-                elif 400 < e.error['status'] < 499:
-                    raise exceptions.BadParameter(e.error)
-                elif e.error['status'] >= 500:
-                    raise exceptions.ServerError(e.error)
-            raise exceptions.OlsException(e.error)
-        except coreapi.exceptions.CoreAPIException as e:
-            raise e
+        logger.debug('Fetch page %s of "%s"', page, self.href)
+        return self.backend.page(self.href, self._page_params(page))
 
     @property
     def path(self):
@@ -383,8 +763,7 @@ class ListClientMixin(BaseClient):
         self._pages = pages
 
     def _get_data(self, path, document):
-        if path in document:
-            return document.data[path]
+        return document.get('_embedded', {}).get(path)
 
     @property
     def data(self):
@@ -404,59 +783,149 @@ class ListClientMixin(BaseClient):
 
     def _gen_elems_forward(self, begin, end):
         page = begin // self.page_size
+        if self.streamed and page != self.page:
+            yield from self._gen_elems_streamed(begin, end)
+            return
         if page != self.page:
             document = self.fetch_page(page)
         else:
             document = self.document
 
         index = begin % self.page_size
+        # page elements are extracted once per page, not once per element
+        elements = self._get_data(self.path, document) or []
         while begin < end:
-            if index >= len(self._get_data(self.path, document)):
+            if index >= len(elements):
+                if self.streamed:
+                    yield from self._gen_elems_streamed(begin, end)
+                    return
                 index = 0
-                document = self.fetch_document('next',
-                                               filters=self.current_filters,
-                                               base_document=document)
-            data = self._get_data(self.path, document)[index]
-            yield self.elem_class_instance(**data)
+                page += 1
+                # consumed page is released before next one is loaded
+                document = elements = None
+                document = self.fetch_page(page)
+                elements = self._get_data(self.path, document) or []
+                if not elements:
+                    # list is shorter than announced
+                    return
+            yield self.elem_class_instance(**elements[index])
             index += 1
             begin += 1
 
     def __iter__(self):
         """
         Iter elements in current list, if outbound current pages items, load next page
-        :return: generator
+        :return: ListIterator
         """
-        index = self.index
-        return self._gen_elems_forward(index, len(self))
+        return ListIterator(self, self.index, len(self))
+
+    def iterate(self, checkpoint=None, every=None):
+        """
+        Iterate list saving its position into a checkpoint file, to resume it later with `OlsClient.resume`
+        :param checkpoint: json cursor file path
+        :param every: elements between two saves (default page size), cursor is also saved on error and at the end
+        :return: ListIterator
+        """
+        return ListIterator(self, self.index, len(self), checkpoint, every)
+
+    def cursor(self, index=None):
+        """
+        Serializable position in list
+        :param index: position (default list start index)
+        :return: Cursor
+        """
+        return Cursor('list', self.uri, self.elem_class.__name__, self.index if index is None else index,
+                      self.page_size, self.current_filters, fields=self.fields, href=self.href)
+
+    def shard(self, index, count):
+        """
+        Split list pages in `count` contiguous ranges, and get the `index` one
+        :param index: shard number, from 0 to count - 1
+        :param count: number of shards
+        :return: Shard
+        """
+        if not 0 <= index < count:
+            raise exceptions.BadParameter({'message': 'Shard index %s out of [0, %s)' % (index, count)})
+        pages = math.ceil(len(self) / self.page_size)
+        return Shard(self.cursor(0), index * pages // count, (index + 1) * pages // count, len(self), self.config)
+
+    @classmethod
+    def from_cursor(cls, cursor, transport=None, config=None):
+        """
+        Rebuild list client positioned at cursor, only cursor page is fetched
+        :param cursor: Cursor
+        :param transport: coreapi transport
+        :param config: ClientConfig
+        :return: list client, iteration starts at cursor index
+        """
+        import ebi.ols.api.helpers as helpers
+        items = cls.__new__(cls)
+        BaseClient.__init__(items, cursor.uri, getattr(helpers, cursor.elem_class), transport, config)
+        items.page_size = cursor.page_size
+        items.current_filters = dict(cursor.filters)
+        items.fields = cls.make_fields(cursor.fields)
+        # pages url of the listed collection (relations lists are not under uri)
+        items._href = cursor.href
+        if cursor.query is not None:
+            items.query = cursor.query
+        items.document = items.fetch_page(cursor.page)
+        items.index = cursor.index
+        return items
+
+    def _fetch_pages(self, pages):
+        """
+        Fetch pages documents concurrently, current page document is reused
+        :param pages: pages numbers
+        :return: dict page -> Document
+        """
+        documents = {}
+        if self.page in pages:
+            documents[self.page] = self.document
+        missing = [page for page in pages if page not in documents]
+        if len(missing) == 1:
+            documents[missing[0]] = self.fetch_page(missing[0])
+        elif missing:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(min(len(missing), self.max_fetch_workers)) as executor:
+                documents.update(zip(missing, executor.map(self.fetch_page, missing)))
+        return documents
+
+    def _slice_indexes(self, item):
+        length = len(self)
+        if any(bound is not None and bound > length for bound in (item.start, item.stop)):
+            raise IndexError('Out of bound indexes. Container len: %s ' % length)
+        if item.step is None and item.start is not None and item.stop is not None \
+                and 0 <= item.stop < item.start:
+            # historical behaviour: [high:low] is [low:high] reversed
+            return range(item.start - 1, item.stop - 1, -1)
+        return range(*item.indices(length))
 
     def __getitem__(self, item):
         """
         Return indexed item, if exists
-        :param item: int the current index to get
-        :return: item class object
+        Slices support negative / None bounds and steps (python semantics, except [high:low] which returns
+        [low:high] reversed), the distinct pages they cover are fetched concurrently.
+        :param item: int the current index to get, or slice
+        :return: item class object, or list of item class objects for slices
         """
         if isinstance(item, slice):
-            logger.debug('Sliced params [%s %s]', item.start, item.stop)
-            if item.start > len(self) or item.stop > len(self):
-                raise IndexError('Out of bound indexes. Container len: %s ', len(self))
-
-            logger.debug('Creating slice from [%s - %s]', item.start, item.stop)
-            if item.start < item.stop:
-                return [elem for elem in self._gen_elems_forward(item.start, item.stop)]
-            else:
-                list_slice = [elem for elem in self._gen_elems_forward(item.stop, item.start)]
-                list_slice.reverse()
-                return list_slice
+            indexes = self._slice_indexes(item)
+            logger.debug('Creating slice from %s', indexes)
+            documents = self._fetch_pages(sorted({index // self.page_size for index in indexes}))
+            return [self.elem_class_instance(
+                **self._get_data(self.path, documents[index // self.page_size])[index % self.page_size])
+                for index in indexes]
         elif isinstance(item, int):
-            index = item % self.page_size
-            if index >= len(self):
+            length = len(self)
+            index = item + length if item < 0 else item
+            if not 0 <= index < length:
                 raise IndexError("No corresponding key {}".format(item))
-            page = item // self.page_size
+            page = index // self.page_size
             document = self.document
             if page != self.page:
                 document = self.fetch_page(page)
 
-            data = self._get_data(self.path, document)[index]
+            data = self._get_data(self.path, document)[index % self.page_size]
             return self.elem_class_instance(**data)
         else:
             raise TypeError("Key indexes must be int, not {}".format(type(item)))
@@ -465,8 +934,9 @@ class ListClientMixin(BaseClient):
         """ String repr of list
         :return str
         """
-        elements_string = ', '.join([repr(self.elem_class_instance(**data)) for data in self.data])
-        dots = '...' if self.pages > 1 else ''
+        data = self.data
+        elements_string = ', '.join([repr(self.elem_class_instance(**element)) for element in data[:self.repr_size]])
+        dots = '...' if self.pages > 1 or len(data) > self.repr_size else ''
         return '{}(page: {}, pages: {}, [{}{}])'.format(self.__class__.__name__,
                                                         self.page,
                                                         self.pages,
@@ -481,11 +951,12 @@ class SearchClientMixin(ListClientMixin):
     """
     path = 'response'
 
-    def __call__(self, query=None, filters=None, **kwargs):
+    def __call__(self, query=None, filters=None, fields=None, **kwargs):
         """
 
         :param filters: filters to apply to search
         :param query: searched string
+        :param fields: only retrieve these fields (sent as `fieldList`, plus `type` to get right helpers)
         :return: a list of mixed items (individuals, ontologies, terms, properties)
         """
         if filters is None:
@@ -493,9 +964,14 @@ class SearchClientMixin(ListClientMixin):
         if query is None:
             raise exceptions.BadParameter({'error': "Bad Request", 'message': 'Missing query',
                                            'status': 400, 'path': 'search', 'timestamp': time.time()})
-        self.query = query
-        call_filters = filters or {key: value for key, value in kwargs.items()} or {}
-        obj = super().__call__(call_filters)
+        call_filters = dict(filters or {key: value for key, value in kwargs.items()} or {})
+        # search on a copy, shared client (i.e. `OlsClient.search`) is never altered by concurrent queries
+        search = copy.copy(self)
+        search.query = query
+        if fields is not None:
+            search.fields = self.make_fields(fields)
+            call_filters['fieldList'] = set(search.fields) | {'type'}
+        obj = super(SearchClientMixin, search).__call__(call_filters)
         obj.query = query
         return obj
 
@@ -510,14 +986,21 @@ class SearchClientMixin(ListClientMixin):
         """
         import ebi.ols.api.helpers as helpers
         type_item = kwargs.pop('type', None)
+        if self.fields is not None:
+            kwargs = self.project(kwargs)
         if type_item == 'property':
-            return helpers.Property(**kwargs)
+            return self.bind(helpers.Property(**kwargs))
         elif type_item == 'individual':
-            return helpers.Individual(**kwargs)
+            return self.bind(helpers.Individual(**kwargs))
         elif type_item == 'ontology':
-            return helpers.Ontology(**kwargs)
+            return self.bind(helpers.Ontology(**kwargs))
         else:
-            return helpers.Term(**kwargs)
+            return self.bind(helpers.Term(**kwargs))
+
+    def cursor(self, index=None):
+        """ Serializable position in search results """
+        return Cursor('search', self.uri, self.elem_class.__name__, self.index if index is None else index,
+                      self.page_size, self.current_filters, self.query, self.fields)
 
     def _get_start(self, document):
         return document[self.path]['start']
@@ -549,7 +1032,7 @@ class SearchClientMixin(ListClientMixin):
         return self._get_pages()
 
     def _get_data(self, path, document):
-        return document.data[path]['docs']
+        return document[path]['docs']
 
     @property
     def data(self):
@@ -562,47 +1045,49 @@ class SearchClientMixin(ListClientMixin):
             filters = {}
         if params is None:
             params = filters or self.current_filters
+        params = dict(params)
         params.pop('page', 0)
         params.pop('size', 0)
-        uri = '/'.join([self.uri, 'search'])
-        uri += '?q=' + self.query
-        filters_uri = ''
-        for filter_name, filter_value in params.items():
-            logger.debug('Filter %s:%s', filter_name, filter_value)
-            if isinstance(filter_value, set):
-                filters_uri += '&' + filter_name + '=' + ','.join(filter_value)
-            else:
-                filters_uri += '&' + filter_name + '=' + filter_value
-        uri += filters_uri
-        return uri
+        logger.debug('Filters %s', params)
+        params = [('q', self.query)] + [(name, ','.join(sorted(value)) if isinstance(value, set) else value)
+                                        for name, value in params.items()]
+        return '/'.join([self.uri, 'search']) + '?' + urllib.parse.urlencode(params, safe=',')
 
     @retry_requests
     def fetch_document(self, path, params=None, filters={}, base_document=None):
         """
-        Fetch current search elements
-        :param base_document:
+        Fetch current search elements, current document is left untouched: iteration cursors keep their own.
+        :param base_document: document to start from when fetching 'next' one (default: current)
         :param filters:
         :param path: the uri relative path
         :param params: search params
         :return: Document
         """
-        if base_document:
-            self.document = base_document
-        start = 0 if path != 'next' else self.start + self.page_size
-        uri = self._get_base_uri(params, filters)
-        final_uri = uri + '&rows={}&start={}'.format(self.page_size, start)
-        logger.debug('Final uri %s', final_uri)
-        self.document = self.client.get(final_uri, format='hal')
-        logger.debug('Loaded document from %s', self.document.url)
-        return self.document
+        if base_document is None:
+            base_document = getattr(self, 'document', None)
+        start = 0 if path != 'next' else self._get_start(base_document) + self.page_size
+        return self._search(params if params is not None else (filters or self.current_filters), start)
+
+    def _page_uri(self, page):
+        return self._get_base_uri() + '&rows={}&start={}'.format(self.page_size, page * self.page_size)
+
+    def _stream_keys(self):
+        return 'response', 'docs'
 
     @retry_requests
     def fetch_page(self, page):
         """ Fetch OLS api search page
         :return Document
         """
-        base_uri = self._get_base_uri()
-        uri = base_uri + '&rows={}&start={}'.format(self.page_size, page * self.page_size)
-        self.document = self.client.get(uri, format='hal')
-        logger.debug('Loaded page %s', self.document.url)
-        return self.document
+        return self._search(self.current_filters, page * self.page_size)
+
+    def _search(self, params, start):
+        """ Search response document, from backend search primitive """
+        from ebi.ols.api.backends import Document
+        uri = self._get_base_uri(params) + '&rows={}&start={}'.format(self.page_size, start)
+        logger.debug('Search %s', uri)
+        query = {name: ','.join(sorted(value)) if isinstance(value, set) else value
+                 for name, value in params.items() if name not in ('page', 'size')}
+        query.update(q=self.query, rows=self.page_size, start=start)
+        documents, total = self.backend.search(query)
+        return Document(uri, {self.path: {'numFound': total, 'start': start, 'docs': documents}})
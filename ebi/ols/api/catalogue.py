@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Local ontologies catalogue: ontologies metadata are kept in memory (and optionally in a json file), so that
+`client.ontology(id)` is a dictionary lookup once the catalogue is loaded::
+
+    client = OlsClient(catalogue='ols-catalogue.json')
+    go = client.ontology('go')
+
+The catalogue is paged again once older than `max_age`, only entries whose loaded / updated / version changed are
+rebuilt (helpers for unchanged ones are kept as they are).
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.base import BaseClient, fields_keys, retry_requests
+from ebi.ols.api.helpers import Ontology, as_record
+
+logger = logging.getLogger(__name__)
+__all__ = ['OntologyCatalogue']
+
+
+def fingerprint(raw):
+    """ Ontology metadata values telling whether an ontology changed since last catalogue load """
+    config = raw.get('config') or {}
+    return [raw.get('loaded'), raw.get('updated'), raw.get('version'), config.get('version'),
+            config.get('versionIri', config.get('version_iri'))]
+
+
+class OntologyCatalogue(object):
+    """
+    Cached ontologies catalogue, shared by all threads of a client. Returned `Ontology` helpers are shared
+    instances as well, they should be treated as read only.
+    """
+    version = 1
+
+    def __init__(self, client, path=None, max_age=3600):
+        """
+        :param client: OlsClient
+        :param path: json file where catalogue is stored / reloaded from (default: memory only)
+        :param max_age: seconds before catalogue is paged again, None: never
+        """
+        self.client = client
+        self.config = client.config
+        self.path = path
+        self.max_age = max_age
+        self.fetched = None
+        self._raw = {}
+        self._ontologies = {}
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @property
+    def stale(self):
+        return self.fetched is None or (self.max_age is not None and time.time() - self.fetched > self.max_age)
+
+    @retry_requests
+    def _fetch(self):
+        """ Raw (json compatible) ontologies entries, by ontology id """
+        lists = self.client.ontologies
+        entries, page = {}, 0
+        while True:
+            document = lists.fetch_page(page)
+            data = lists._get_data(lists.path, document) or []
+            for element in data:
+                raw = as_record(lists.project(element))
+                entries[raw.get('ontologyId', raw.get('ontology_id'))] = raw
+            if not data or 'next' not in document.links:
+                return entries
+            page += 1
+
+    def refresh(self, force=False):
+        """
+        Page catalogue again when stale (or forced), rebuild changed entries only
+        :param force: refresh even if catalogue is not stale
+        :return: ids of ontologies added, changed or removed (None when not refreshed)
+        """
+        with self._lock:
+            if not force and not self.stale:
+                return None
+            entries = self._fetch()
+            changed = {ontology_id for ontology_id in set(entries) | set(self._raw)
+                       if ontology_id not in entries or ontology_id not in self._raw or
+                       fingerprint(entries[ontology_id]) != fingerprint(self._raw[ontology_id])}
+            for ontology_id in changed:
+                self._ontologies.pop(ontology_id, None)
+            # unchanged entries keep their previous values (and helpers)
+            self._raw = {ontology_id: raw if ontology_id in changed else self._raw[ontology_id]
+                         for ontology_id, raw in entries.items()}
+            self.fetched = time.time()
+            logger.debug('Ontologies catalogue refreshed, %s entries changed', len(changed))
+            if self.path:
+                self.save()
+            return sorted(changed)
+
+    def get(self, ontology_id):
+        """
+        Catalogue ontology
+        :param ontology_id: ontology id
+        :return: Ontology
+        """
+        ontology = self._ontologies.get(ontology_id)
+        if ontology is not None and not self.stale:
+            return ontology
+        self.refresh()
+        with self._lock:
+            ontology = self._ontologies.get(ontology_id)
+            if ontology is None:
+                raw = self._raw.get(ontology_id)
+                if raw is None:
+                    raise exceptions.NotFoundException({'status': 404, 'message': 'Unknown ontology %s' % ontology_id,
+                                                        'path': ontology_id})
+                ontology = self._ontologies[ontology_id] = Ontology(**raw)
+                ontology.client_config = self.config
+            return ontology
+
+    def __call__(self, identifier, silent=True, unique=True, fields=None):
+        """
+        `DetailClientMixin` compatible call, ontology ids being unique `unique` is not relevant here
+        :param fields: requested fields, projected helpers are built from the catalogue entry (not cached)
+        """
+        if fields is None:
+            return self.get(identifier)
+        with self._lock:
+            self.get(identifier)
+            raw = self._raw[identifier]
+        ontology = Ontology(**{key: raw[key] for key in fields_keys(BaseClient.make_fields(fields)) if key in raw})
+        ontology.client_config = self.config
+        return ontology
+
+    def __contains__(self, ontology_id):
+        self.refresh()
+        return ontology_id in self._raw
+
+    def __len__(self):
+        self.refresh()
+        return len(self._raw)
+
+    def ontologies(self):
+        """ All catalogue ontologies """
+        self.refresh()
+        return [self.get(ontology_id) for ontology_id in sorted(self._raw)]
+
+    def save(self, path=None):
+        """ Store catalogue as json file (replaced atomically) """
+        path = path or self.path
+        temporary = path + '.tmp'
+        with self._lock, open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'site': self.config.site, 'fetched': self.fetched,
+                       'ontologies': self._raw}, f, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    def load(self, path=None):
+        """ Read catalogue from json file, ignored when stored for another site or catalogue version """
+        path = path or self.path
+        with open(path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        if content.get('version') != self.version or content.get('site') != self.config.site:
+            logger.warning('Ignored ontologies catalogue %s (other site or version)', path)
+            return
+        with self._lock:
+            self._raw = content['ontologies']
+            self._ontologies = {}
+            self.fetched = content.get('fetched')
+
+    def __repr__(self):
+        return '<OntologyCatalogue(site={}, ontologies={}, fetched={})>'.format(
+            self.config.site, len(self._raw), self.fetched)
@@ -14,27 +14,51 @@
 """
 import inspect
 import logging
+import threading
+import warnings
 
-from coreapi import Client
-
-from ebi.ols.api.base import ListClientMixin, DetailClientMixin, HALCodec, SearchClientMixin, retry_requests
+from ebi.ols.api import exceptions
+from ebi.ols.api.base import ClientConfig, Cursor, ListClientMixin, DetailClientMixin, SearchClientMixin, \
+    retry_requests
 from ebi.ols.api.helpers import OLSHelper, Property, Individual, Ontology, Term
 
 def_page_size = 500
 logger = logging.getLogger(__name__)
 
 
+class lazy_client(object):
+    """
+    Build an api client on first attribute access, then keep it as a plain instance attribute
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        client = instance.__dict__[self.name] = self.factory(instance)
+        return client
+
+
 class OlsClient(object):
     """
     Official EMBL/EBI Ontology Lookup Service generic client.
     """
     site = 'https://www.ebi.ac.uk/ols/api'
     page_size = 500
+    #: whether `ClientConfig.default` was set by a client (see `set_default`), settings change warned once
+    _default_set = False
+    _default_warned = False
 
     class ItemClient(object):
 
-        def __init__(self, base_site):
+        def __init__(self, base_site, transport=None, config=None):
             self.uri = base_site
+            self.transport = transport
+            self.config = config
 
         def __call__(self, *args, **kwargs):
             item = None
@@ -51,8 +75,8 @@ class OlsClient(object):
                     False) else None
                 uri = '/'.join(filter(None, [self.uri, base_uri, item.path]))
                 logger.debug('ItemClient uri %s', uri)
-                inner_client = DetailClientMixin(uri, item.__class__)
-                return inner_client(item.iri)
+                inner_client = DetailClientMixin(uri, item.__class__, self.transport, self.config)
+                return inner_client(item.iri, fields=kwargs.get('fields'))
             else:
                 assert ('ontology_name' in kwargs)
                 assert ('iri' in kwargs)
@@ -62,30 +86,167 @@ class OlsClient(object):
                     assert (issubclass(item, OLSHelper))
                 else:
                     assert (issubclass(item.__class__, OLSHelper))
-                return self.__call__(item=item(ontology_name=kwargs.get('ontology_name'), iri=kwargs.get('iri')))
+                return self.__call__(item=item(ontology_name=kwargs.get('ontology_name'), iri=kwargs.get('iri')),
+                                     fields=kwargs.get('fields'))
+
+    def __init__(self, page_size=None, base_site=None, transport=None, max_retry=5, retry_delay=5, stream=False,
+                 catalogue=None, backend=None, cache=None):
+        """
+        Init client from base Api URI. Nothing is requested until first actual api call,
+        api root document is only loaded when a list or search client is first used.
+        Settings are kept per client (see `ClientConfig`), and carried by returned helpers, so several clients
+        can be used at the same time.
+        :param page_size: lists page size
+        :param base_site: OLS api base url, or list of urls of deployments serving the same content: each call goes
+            to the fastest healthy one (see `ebi.ols.api.transports.FailoverTransport`, `client.transport.stats()`)
+        :param transport: coreapi transport used for all calls, such as
+            `ebi.ols.api.transports.CassetteTransport` to record / replay exchanges
+        :param max_retry: calls tries in case of network / server error
+        :param retry_delay: seconds between two tries
+        :param stream: decode lists / search pages incrementally while iterating: time to first item and memory
+            do not grow with page size
+        :param catalogue: serve `ontology(id)` from a local ontologies catalogue (see `OntologyCatalogue`): True to
+            keep it in memory, or json file path to keep it across runs as well
+        :param backend: serve every call from this content backend instead of the OLS api, ex: a local snapshot
+            (see `ebi.ols.api.backends.SqliteBackend`) to run with no network
+        :param cache: cache `ontology` / `term` / `property` / `individual` lookups, served stale while refreshed
+            in the background (see `ebi.ols.api.warmup.DetailCache`, `client.cache.warm(...)`): True, or mapping of
+            cache settings (ttl, refresh_ahead, stale, workers, max_size)
+        """
+        if backend is not None:
+            if transport is not None or isinstance(base_site, (list, tuple)):
+                raise exceptions.BadParameter('A backend can not be set along with a transport or several base sites')
+            # backend answers api urls under client site
+            if base_site:
+                backend.site = base_site.rstrip('/')
+            base_site = backend.site
+        if isinstance(base_site, (list, tuple)):
+            from ebi.ols.api.transports import FailoverTransport
+            if transport is not None:
+                raise exceptions.BadParameter('A transport can not be set along with several base sites')
+            transport = FailoverTransport(base_site)
+            base_site = transport.sites[0]
+        self.config = ClientConfig(site=base_site or OlsClient.site, page_size=page_size or def_page_size,
+                                   transport=transport, max_retry=max_retry, retry_delay=retry_delay, stream=stream,
+                                   backend=backend)
+        if not OlsClient._default_set:
+            # helpers created on their own (not returned by any client) use first client settings
+            self.set_default()
+        elif not OlsClient._default_warned and (self.config.site, self.config.page_size, transport) != \
+                (ClientConfig.default.site, ClientConfig.default.page_size, ClientConfig.default.transport):
+            warnings.warn('Helpers created on their own no longer use latest OlsClient settings, but first one (%s): '
+                          'call set_default() on this client to use it instead' % ClientConfig.default.site,
+                          DeprecationWarning, stacklevel=2)
+            OlsClient._default_warned = True
+        self.page_size = self.config.page_size
+        self.site = self.config.site
+        self.transport = transport
+        self._document = None
+        self._lock = threading.Lock()
+        self.detail = self.ItemClient(self.site, transport, self.config)
+        self.catalogue = None
+        if catalogue:
+            from ebi.ols.api.catalogue import OntologyCatalogue
+            self.catalogue = OntologyCatalogue(self, path=catalogue if isinstance(catalogue, str) else None)
+        self.cache = None
+        if cache:
+            from ebi.ols.api.warmup import DetailCache
+            self.cache = DetailCache(self, **(cache if isinstance(cache, dict) else {}))
+
+    def set_default(self):
+        """
+        Use this client settings for helpers created on their own (not returned by any client), ex:
+        `helpers.Term(iri=.., ontology_name=..).load_relation('parents')`, process wide. First client created
+        sets them if none did before.
+        :return: self
+        """
+        ClientConfig.default = self.config
+        OlsClient._default_set = True
+        return self
 
     @retry_requests
-    def __init__(self, page_size=None, base_site=None):
-        # Init client from base Api URI
-        # Hacky page size update for all future request to OlsClient
-        OlsClient.page_size = page_size or def_page_size
-        if base_site:
-            OlsClient.site = base_site
-        document = Client(decoders=[HALCodec()]).get(self.site)
+    def _fetch_document(self):
+        document = self.config.backend.detail(self.site)
         logger.debug('OlsClient [%s][%s]', document.url, self.page_size)
-        # List Clients
-        self.ontologies = ListClientMixin('/'.join([self.site, 'ontologies']), Ontology, document,
-                                          self.page_size)
-        self.terms = ListClientMixin('/'.join([self.site, 'terms']), Term, document, self.page_size)
-        self.properties = ListClientMixin('/'.join([self.site, 'properties']), Property, document,
-                                          self.page_size)
-        self.individuals = ListClientMixin('/'.join([self.site, 'individuals']), Individual, document,
-                                           self.page_size)
-        # Details client
-        self.ontology = DetailClientMixin('/'.join([self.site, 'ontologies']), Ontology)
-        self.term = DetailClientMixin('/'.join([self.site, 'terms']), Term)
-        self.property = DetailClientMixin('/'.join([self.site, 'properties']), Property)
-        self.individual = DetailClientMixin('/'.join([self.site, 'individuals']), Individual)
-        # Special clients
-        self.search = SearchClientMixin('/'.join([self.site, 'search']), OLSHelper, document, self.page_size)
-        self.detail = self.ItemClient(self.site)
+        return document
+
+    @property
+    def document(self):
+        """ OLS api root document, fetched on first need """
+        if self._document is None:
+            with self._lock:
+                if self._document is None:
+                    self._document = self._fetch_document()
+        return self._document
+
+    # List Clients
+    @lazy_client
+    def ontologies(self):
+        return ListClientMixin('/'.join([self.site, 'ontologies']), Ontology, self.document, self.page_size,
+                               config=self.config)
+
+    @lazy_client
+    def terms(self):
+        return ListClientMixin('/'.join([self.site, 'terms']), Term, self.document, self.page_size,
+                               config=self.config)
+
+    @lazy_client
+    def properties(self):
+        return ListClientMixin('/'.join([self.site, 'properties']), Property, self.document, self.page_size,
+                               config=self.config)
+
+    @lazy_client
+    def individuals(self):
+        return ListClientMixin('/'.join([self.site, 'individuals']), Individual, self.document, self.page_size,
+                               config=self.config)
+
+    # Details client
+    @lazy_client
+    def ontology(self):
+        if self.cache is not None:
+            return self.cache.client_for('ontology')
+        if self.catalogue is not None:
+            return self.catalogue
+        return DetailClientMixin('/'.join([self.site, 'ontologies']), Ontology, config=self.config)
+
+    @lazy_client
+    def term(self):
+        if self.cache is not None:
+            return self.cache.client_for('term')
+        return DetailClientMixin('/'.join([self.site, 'terms']), Term, config=self.config)
+
+    @lazy_client
+    def property(self):
+        if self.cache is not None:
+            return self.cache.client_for('property')
+        return DetailClientMixin('/'.join([self.site, 'properties']), Property, config=self.config)
+
+    @lazy_client
+    def individual(self):
+        if self.cache is not None:
+            return self.cache.client_for('individual')
+        return DetailClientMixin('/'.join([self.site, 'individuals']), Individual, config=self.config)
+
+    def resume(self, cursor):
+        """
+        Rebuild a list or search results from a cursor (see `ListClientMixin.iterate`, `ListIterator.cursor`),
+        iterating it continues from cursor position, earlier pages are not fetched again.
+        :param cursor: `Cursor` or checkpoint file path
+        :return: ListClientMixin or SearchClientMixin
+        """
+        if isinstance(cursor, str):
+            cursor = Cursor.load(cursor)
+        list_class = SearchClientMixin if cursor.kind == 'search' else ListClientMixin
+        return list_class.from_cursor(cursor, config=self.config)
+
+    # Special clients
+    @lazy_client
+    def search(self):
+        return SearchClientMixin('/'.join([self.site, 'search']), OLSHelper, self.document, self.page_size,
+                                 config=self.config)
+
+    @lazy_client
+    def resolver(self):
+        """ Batch identifiers resolution with results cache, see `ebi.ols.api.resolver.CurieResolver` """
+        from ebi.ols.api.resolver import CurieResolver
+        return CurieResolver(self)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Precomputed ancestors closure of an ontology hierarchy, for subsumption queries in bulk with no remote call::
+
+    closure = Closure.from_ontology(client.ontology('go'))
+    closure.save('go.closure')
+    ...
+    closure = Closure.load('go.closure')  # memory mapped, shared by all processes loading it
+    a, b = closure.ids(children), closure.ids(parents)
+    closure.is_a(a, b)
+
+Terms get dense integer ids (sorted IRIs order). Closure is stored as one sorted array of ``term * size + ancestor``
+keys (every term being its own ancestor) with per term offsets: ``is_a`` is a binary search per pair, term ancestors
+a contiguous slice. Queries are vectorized with numpy when it is installed (arrays are then returned), and run on
+plain memoryviews otherwise.
+"""
+import array
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ebi.ols.api import exceptions
+
+__all__ = ['Closure', 'hierarchy']
+
+MAGIC = b'OLSC'
+# magic, version, byte order, terms count, closure keys count, iris json size
+_HEADER = struct.Struct('<4sBBxxqqq')
+_ORDERS = {'little': 0, 'big': 1}
+
+_numpy = []
+
+
+def numpy():
+    """ numpy module, None when not installed (imported on first need) """
+    if not _numpy:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        _numpy.append(module)
+    return _numpy[0]
+
+
+def _scalar(value):
+    return not hasattr(value, '__len__')
+
+
+def _parents(config, ontology_name, iri, relation):
+    from ebi.ols.api.base import ListClientMixin
+    from ebi.ols.api.helpers import Term
+    client = ListClientMixin(
+        config.site + '/ontologies/' + ontology_name + '/terms/' + ListClientMixin.make_uri(iri),
+        elem_class=Term, page_size=config.page_size, config=config)
+    if relation not in client.document.links:
+        # root terms
+        return []
+    return [parent.iri for parent in client(action=relation, fields=['iri'])]
+
+
+def hierarchy(ontology, relation='parents', workers=8):
+    """
+    Ontology hierarchy, one call per non root term (made concurrently)
+    :param ontology: Ontology helper
+    :param relation: 'parents' (is_a) or 'hierarchicalParents' (is_a and part_of like relations)
+    :param workers: parents lists loaded at the same time
+    :return: generator of (term IRI, parents IRIs)
+    """
+    config = ontology._get_config()
+    terms = ontology.terms(fields=['iri', 'is_root'])
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        window = deque()
+        for term in terms:
+            future = None if term.is_root else executor.submit(_parents, config, ontology.ontology_id, term.iri,
+                                                               relation)
+            window.append((term.iri, future))
+            while len(window) > workers * 4:
+                iri, future = window.popleft()
+                yield iri, future.result() if future else []
+        while window:
+            iri, future = window.popleft()
+            yield iri, future.result() if future else []
+
+
+class Closure(object):
+    """
+    Ancestors closure over dense term ids (see `id` / `ids` / `iri`). Query methods accept one id or a sequence
+    of ids.
+    """
+    version = 1
+
+    def __init__(self, iris, keys, offsets, depths, path=None, buffer=None):
+        """ Use `build`, `from_ontology` or `load` """
+        self.iris = iris
+        self.size = len(iris)
+        self._ids = {iri: position for position, iri in enumerate(iris)}
+        self.keys = keys
+        self.offsets = offsets
+        self.depths = depths
+        self.path = path
+        self._buffer = buffer
+        np = numpy()
+        if np is not None:
+            self._keys = np.frombuffer(keys, dtype=np.int64)
+            self._offsets = np.frombuffer(offsets, dtype=np.int64)
+            self._depths = np.frombuffer(depths, dtype=np.int32)
+
+    @classmethod
+    def build(cls, edges):
+        """
+        Compute closure
+        :param edges: mapping or iterable of (term IRI, parents IRIs), parents not listed as terms are added
+        :return: Closure
+        """
+        parents = {}
+        for iri, term_parents in (edges.items() if hasattr(edges, 'items') else edges):
+            parents.setdefault(iri, set()).update(term_parents or ())
+            for parent in term_parents or ():
+                parents.setdefault(parent, set())
+        iris = sorted(parents)
+        ids = {iri: position for position, iri in enumerate(iris)}
+        parent_ids = [[ids[parent] for parent in parents[iri] if parent != iri] for iri in iris]
+        # parents first (Kahn): each term ancestors are its parents ancestors
+        children = [[] for _ in iris]
+        waiting = [len(term_parents) for term_parents in parent_ids]
+        for term, term_parents in enumerate(parent_ids):
+            for parent in term_parents:
+                children[parent].append(term)
+        ready = deque(term for term, count in enumerate(waiting) if not count)
+        ancestors, depths = [None] * len(iris), array.array('i', [0] * len(iris))
+        while ready:
+            term = ready.popleft()
+            found = {term}
+            for parent in parent_ids[term]:
+                found |= ancestors[parent]
+                depths[term] = max(depths[term], depths[parent] + 1)
+            ancestors[term] = found
+            for child in children[term]:
+                waiting[child] -= 1
+                if not waiting[child]:
+                    ready.append(child)
+        if any(found is None for found in ancestors):
+            cyclic = [iris[term] for term, found in enumerate(ancestors) if found is None]
+            raise exceptions.BadParameter('Hierarchy cycle through %s terms, ex: %s' % (len(cyclic), cyclic[0]))
+        size = len(iris)
+        keys, offsets = array.array('q'), array.array('q', [0])
+        for term, found in enumerate(ancestors):
+            keys.extend(term * size + ancestor for ancestor in sorted(found))
+            offsets.append(len(keys))
+        return cls(iris, memoryview(keys), memoryview(offsets), memoryview(depths))
+
+    @classmethod
+    def from_ontology(cls, ontology, relation='parents', workers=8):
+        """
+        Closure of an ontology hierarchy (see `hierarchy`)
+        :param ontology: Ontology helper
+        :param relation: 'parents' or 'hierarchicalParents'
+        :param workers: parents lists loaded at the same time
+        :return: Closure
+        """
+        return cls.build(hierarchy(ontology, relation, workers))
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '<Closure(terms={}, pairs={}, path={})>'.format(self.size, len(self.keys), self.path)
+
+    def id(self, iri):
+        """ Term id, KeyError when term is unknown """
+        return self._ids[iri]
+
+    def ids(self, iris):
+        """ Terms ids, -1 for unknown terms (never ancestor nor descendant of anything) """
+        ids = [self._ids.get(iri, -1) for iri in iris]
+        np = numpy()
+        return np.array(ids, dtype=np.int64) if np is not None else ids
+
+    def iri(self, term):
+        return self.iris[term]
+
+    def ancestors(self, term, include_self=False):
+        """
+        Term ancestors ids, sorted
+        :param term: term id
+        :param include_self: term is listed among its ancestors
+        :return: array (numpy) or list of ids
+        """
+        start, end = self.offsets[term], self.offsets[term + 1]
+        base = term * self.size
+        np = numpy()
+        if np is not None:
+            found = self._keys[start:end] - base
+            return found if include_self else found[found != term]
+        return [key - base for key in self.keys[start:end] if include_self or key - base != term]
+
+    def is_a(self, terms, ancestors):
+        """
+        Subsumption test, pairwise: terms[i] is ancestors[i] or one of its descendants
+        :param terms: term id or sequence of ids (-1 ids are unknown terms)
+        :param ancestors: term id or sequence of ids, same length as terms
+        :return: bool, or numpy bool array / list of bool
+        """
+        scalar = _scalar(terms) and _scalar(ancestors)
+        np = numpy()
+        if np is not None:
+            terms, ancestors = np.asarray(terms, dtype=np.int64), np.asarray(ancestors, dtype=np.int64)
+            known = (terms >= 0) & (ancestors >= 0)
+            wanted = terms * self.size + ancestors
+            positions = np.minimum(np.searchsorted(self._keys, wanted), max(0, len(self._keys) - 1))
+            result = known & (self._keys[positions] == wanted) if len(self._keys) else known & False
+            return bool(result) if scalar else result
+        if scalar:
+            terms, ancestors = [terms], [ancestors]
+        keys, size = self.keys, self.size
+        result = []
+        for term, ancestor in zip(terms, ancestors):
+            if term < 0 or ancestor < 0:
+                result.append(False)
+                continue
+            wanted = term * size + ancestor
+            end = self.offsets[term + 1]
+            position = bisect.bisect_left(keys, wanted, self.offsets[term], end)
+            result.append(position < end and keys[position] == wanted)
+        return result[0] if scalar else result
+
+    def lca(self, first, second):
+        """
+        Lowest common ancestors, pairwise: deepest term both terms are (or descend from), lowest id among deepest ones
+        :param first: term id or sequence of ids
+        :param second: term id or sequence of ids, same length
+        :return: id, or numpy array / list of ids (-1 when terms have no common ancestor)
+        """
+        scalar = _scalar(first) and _scalar(second)
+        np = numpy()
+        if np is not None:
+            result = self._lca(np, np.atleast_1d(np.asarray(first, dtype=np.int64)),
+                               np.atleast_1d(np.asarray(second, dtype=np.int64)))
+            return int(result[0]) if scalar else result
+        if scalar:
+            first, second = [first], [second]
+        result = []
+        for one, other in zip(first, second):
+            one, other = int(one), int(other)
+            if one < 0 or other < 0:
+                result.append(-1)
+                continue
+            common = set(self.ancestors(one, True)).intersection(self.ancestors(other, True))
+            # deepest first, then lowest id
+            result.append(max(common, key=lambda term: (self.depths[term], -term)) if common else -1)
+        return result[0] if scalar else result
+
+    def _lca(self, np, first, second):
+        """ Vectorized `lca`: all first terms ancestors are looked up among second ones at once """
+        result = np.full(len(first), -1, dtype=np.int64)
+        pairs = np.flatnonzero((first >= 0) & (second >= 0))
+        if not len(pairs) or not len(self._keys):
+            return result
+        # one row per (pair, ancestor of its first term): contiguous closure slices, flattened
+        terms = first[pairs]
+        starts = self._offsets[terms]
+        counts = self._offsets[terms + 1] - starts
+        rows = np.repeat(np.arange(len(pairs)), counts)
+        # position of each row in its slice: row index minus its pair first row index
+        positions = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        ancestors = self._keys[starts[rows] + positions] - terms[rows] * self.size
+        # common ones are ancestors of second terms as well
+        wanted = second[pairs][rows] * self.size + ancestors
+        found = np.minimum(np.searchsorted(self._keys, wanted), len(self._keys) - 1)
+        common = self._keys[found] == wanted
+        rows, ancestors = rows[common], ancestors[common]
+        # per pair, deepest first then lowest id: first row of each pair once sorted
+        order = np.lexsort((ancestors, -self._depths[ancestors], rows))
+        rows, first_rows = np.unique(rows[order], return_index=True)
+        result[pairs[rows]] = ancestors[order][first_rows]
+        return result
+
+    def save(self, path):
+        """ Store closure as binary file (replaced atomically), to be memory mapped by `load` """
+        iris = json.dumps(self.iris, separators=(',', ':')).encode('utf-8')
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, self.version, _ORDERS[sys.byteorder], self.size, len(self.keys),
+                                 len(iris)))
+            # 8 bytes aligned sections: keys, offsets, depths, iris
+            for section in (self.keys, self.offsets, self.depths):
+                f.write(section)
+            f.write(b'\0' * (-f.tell() % 8))
+            f.write(iris)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory map a `save` file: arrays are read in place, pages are shared by all processes mapping the file
+        :param path: file path
+        :return: Closure
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, order, size, count, iris_size = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != cls.version or order != _ORDERS[sys.byteorder]:
+            buffer.close()
+            raise exceptions.BadParameter('Unsupported closure file %s' % path)
+        view = memoryview(buffer)
+        start = _HEADER.size
+        sections = []
+        for length, item_size, code in ((count, 8, 'q'), (size + 1, 8, 'q'), (size, 4, 'i')):
+            sections.append(view[start:start + length * item_size].cast(code))
+            start += length * item_size
+        start += -start % 8
+        iris = json.loads(bytes(view[start:start + iris_size]).decode('utf-8'))
+        return cls(iris, *sections, path=path, buffer=buffer)
+
+    def __getstate__(self):
+        if self.path is None:
+            raise exceptions.BadParameter('Only saved closures can be sent to other processes')
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        loaded = self.load(state['path'])
+        self.__dict__.update(loaded.__dict__)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Streaming ontology versions diff: terms are fingerprinted (content hash, plus label and obsolescence values) while
+they are iterated, and compared to the fingerprints stored for the previous version::
+
+    for change in diff_ontology(client.ontology('go'), 'go.snapshot.json.gz'):
+        print(change.kind, change.iri)
+
+Only fingerprints are kept (and stored), never terms payloads: memory grows with the number of terms only.
+"""
+import gzip
+import hashlib
+import json
+import os
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.accessions import _value
+from ebi.ols.api.helpers import as_record
+
+__all__ = ['Change', 'Snapshot', 'TermFingerprint', 'diff_ontology', 'fingerprint', 'ADDED', 'REMOVED', 'OBSOLETED',
+           'RELABELLED', 'CHANGED']
+
+ADDED = 'added'
+REMOVED = 'removed'
+OBSOLETED = 'obsoleted'
+RELABELLED = 'relabelled'
+#: content changed, term neither obsoleted nor relabelled
+CHANGED = 'changed'
+
+#: `digest` hashes all term content, other values are kept to describe changes
+TermFingerprint = namedtuple('TermFingerprint', ['digest', 'label', 'is_obsolete', 'term_replaced_by'])
+#: one term change: `old` / `new` fingerprints (None for added / removed terms)
+Change = namedtuple('Change', ['kind', 'iri', 'old', 'new'])
+
+# helpers attributes which are not term content (client settings, lazily cached values)
+_IGNORED = {'client_config', '_relations_types', '_accession'}
+
+
+def _plain(value):
+    """ json encoder fallback for coreapi documents values (only converted when met) """
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence):
+        return list(value)
+    return as_record(value) if hasattr(value, '__dict__') else str(value)
+
+
+def fingerprint(term):
+    """
+    Stable term fingerprint: same content, same digest, whatever attributes order or helper / mapping form
+    :param term: Term helper or term mapping (harvest records)
+    :return: TermFingerprint
+    """
+    items = term.items() if isinstance(term, Mapping) else vars(term).items()
+    content = {name: value for name, value in items if name not in _IGNORED}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_plain)
+    digest = hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+    return TermFingerprint(digest, _value(term, 'label'), bool(_value(term, 'is_obsolete')),
+                           _value(term, 'term_replaced_by'))
+
+
+def _changes(iri, old, new):
+    if old.digest == new.digest:
+        return []
+    changes = []
+    if new.is_obsolete and not old.is_obsolete:
+        changes.append(Change(OBSOLETED, iri, old, new))
+    if new.label != old.label:
+        changes.append(Change(RELABELLED, iri, old, new))
+    return changes or [Change(CHANGED, iri, old, new)]
+
+
+class Snapshot(object):
+    """
+    Ontology terms fingerprints, for one ontology version
+    """
+    version = 1
+
+    def __init__(self, ontology_id=None, ontology_version=None):
+        self.ontology_id = ontology_id
+        self.ontology_version = ontology_version
+        self.terms = {}
+
+    @classmethod
+    def from_terms(cls, terms, ontology_id=None, ontology_version=None):
+        """
+        Fingerprint terms
+        :param terms: iterable of Term helpers or term mappings
+        :return: Snapshot
+        """
+        snapshot = cls(ontology_id, ontology_version)
+        for term in terms:
+            snapshot.add(term)
+        return snapshot
+
+    def add(self, term):
+        """ Fingerprint one term, returned """
+        iri = _value(term, 'iri')
+        self.terms[iri] = fingerprint(term)
+        return self.terms[iri]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, iri):
+        return iri in self.terms
+
+    def __repr__(self):
+        return '<Snapshot(ontology_id={}, version={}, terms={})>'.format(self.ontology_id, self.ontology_version,
+                                                                         len(self.terms))
+
+    def diff(self, terms, record=None):
+        """
+        Compare terms, while they are iterated, with this snapshot ones
+        :param terms: iterable of Term helpers or term mappings (new version)
+        :param record: Snapshot to which new version fingerprints are added (ex: to be stored for next diff)
+        :return: generator of Change, removed terms last
+        """
+        seen = set()
+        for term in terms:
+            iri = _value(term, 'iri')
+            new = fingerprint(term)
+            if record is not None:
+                record.terms[iri] = new
+            seen.add(iri)
+            old = self.terms.get(iri)
+            if old is None:
+                yield Change(ADDED, iri, None, new)
+            else:
+                yield from _changes(iri, old, new)
+        for iri, old in self.terms.items():
+            if iri not in seen:
+                yield Change(REMOVED, iri, old, None)
+
+    def to_dict(self):
+        return {'version': self.version, 'ontology_id': self.ontology_id, 'ontology_version': self.ontology_version,
+                'fields': list(TermFingerprint._fields), 'terms': self.terms}
+
+    @classmethod
+    def from_dict(cls, content):
+        if content.get('version') != cls.version or content.get('fields') != list(TermFingerprint._fields):
+            raise exceptions.BadParameter('Unsupported snapshot version %s' % content.get('version'))
+        snapshot = cls(content.get('ontology_id'), content.get('ontology_version'))
+        snapshot.terms = {iri: TermFingerprint(*values) for iri, values in content['terms'].items()}
+        return snapshot
+
+    def save(self, path):
+        """ Store snapshot as compact json file, gzipped when path ends with .gz (replaced atomically) """
+        temporary = path + '.tmp'
+        with (gzip.open if path.endswith('.gz') else open)(temporary, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Read snapshot from `save` file """
+        with (gzip.open if path.endswith('.gz') else open)(path, 'rt', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def diff_ontology(ontology, path, force=False, fields=None):
+    """
+    Changes since ontology snapshot stored in `path`, the new snapshot replaces it once all changes are read (all
+    terms are reported as added when there is no snapshot yet)
+    :param ontology: Ontology helper
+    :param path: snapshot file
+    :param force: compare terms even though ontology version did not change
+    :param fields: only fingerprint these terms fields (see list `fields` projection), same ones on every call
+    :return: generator of Change
+    """
+    previous = Snapshot.load(path) if os.path.exists(path) else Snapshot(ontology.ontology_id)
+    version = ontology.version
+    if not force and previous.terms and version is not None and previous.ontology_version == version:
+        return
+    current = Snapshot(ontology.ontology_id, version)
+    yield from previous.diff(ontology.terms(fields=fields), record=current)
+    current.save(path)
@@ -69,3 +69,10 @@ class UnparsedDocumentException(OlsException):
     Received document from OLS API can not be parsed into proper Document object
     """
     pass
+
+
+class NotRecordedError(OlsException):
+    """
+    Requested exchange is not available from replayed cassette
+    """
+    pass
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+OLS api documents, rendered as the api does (HAL pages, elements links, errors, search responses) from plain
+elements. Used to answer api urls without the api (see `ebi.ols.api.backends.Backend`) and by the tests stub server.
+"""
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from ebi.ols.api.base import BaseClient
+
+__all__ = ['HalDocuments', 'KINDS', 'RELATIONS', 'make_uri']
+
+KINDS = ('terms', 'properties', 'individuals')
+RELATIONS = ('parents', 'ancestors', 'children', 'descendants',
+             'hierarchicalParents', 'hierarchicalAncestors', 'hierarchicalChildren', 'hierarchicalDescendants')
+
+#: OLS api double encodes IRIs in paths
+make_uri = BaseClient.make_uri
+
+
+class HalDocuments(object):
+    """
+    Api documents of an OLS api `site`, links included
+    """
+
+    def __init__(self, site):
+        """
+        :param site: api root url
+        """
+        self.site = site.rstrip('/')
+
+    @staticmethod
+    def error(status, path, message='Resource not found'):
+        """ (status, error document) """
+        return status, OrderedDict([('timestamp', int(time.time() * 1000)), ('status', status),
+                                    ('error', {404: 'Not Found', 400: 'Bad Request'}.get(status, 'Server Error')),
+                                    ('message', message), ('path', path)])
+
+    def link(self, *parts, **query):
+        href = '/'.join((self.site,) + parts)
+        if query:
+            href += '?' + urllib.parse.urlencode(query)
+        return {'href': href}
+
+    def root(self):
+        return {'_links': OrderedDict((name, self.link(name)) for name in
+                                      ('ontologies', 'individuals', 'terms', 'properties', 'search'))}
+
+    def ontology_document(self, document):
+        document = OrderedDict(document)
+        document.pop('_links', None)
+        ontology_id = document['ontologyId']
+        document['_links'] = OrderedDict([('self', self.link('ontologies', ontology_id))] +
+                                         [(kind, self.link('ontologies', ontology_id, kind)) for kind in KINDS])
+        return document
+
+    def item_document(self, kind, document):
+        """
+        :param kind: one of `KINDS`
+        :param document: item, its `_links` (mapping or list of links names) tell which links it has (default: all
+            terms relations)
+        """
+        document = OrderedDict(document)
+        names = document.pop('_links', None)
+        if names is None:
+            names = RELATIONS + ('jstree', 'graph') if kind == 'terms' else ()
+        base = ('ontologies', document['ontology_name'], kind, make_uri(document['iri']))
+        document['_links'] = OrderedDict([('self', self.link(*base))] +
+                                         [(name, self.link(*(base + (name,)))) for name in names if name != 'self'])
+        return document
+
+    def paged(self, segments, name, documents, total, params):
+        """
+        (status, page document)
+        :param segments: list path under site
+        :param name: embedded elements name
+        :param documents: page elements documents
+        :param total: list elements count
+        :param params: request parameters (page, size, filters)
+        """
+        size, page = int(params.get('size', 20)), int(params.get('page', 0))
+        pages = -(-total // size) if size else 0
+        extra = {key: value for key, value in params.items() if key not in ('page', 'size')}
+
+        def page_link(number):
+            return self.link(*segments, **dict(extra, page=number, size=size))
+
+        links = OrderedDict([('self', page_link(page))])
+        if pages:
+            links['first'] = page_link(0)
+            if page > 0:
+                links['prev'] = page_link(page - 1)
+            if page < pages - 1:
+                links['next'] = page_link(page + 1)
+            links['last'] = page_link(pages - 1)
+        document = OrderedDict()
+        if documents:
+            document['_embedded'] = {name: documents}
+        document['_links'] = links
+        document['page'] = OrderedDict([('size', size), ('totalElements', total), ('totalPages', pages),
+                                        ('number', page)])
+        return 200, document
+
+    @staticmethod
+    def search(documents, total, params):
+        """ Search (solr) response document """
+        return OrderedDict([
+            ('responseHeader', {'status': 0, 'QTime': 0, 'params': params}),
+            ('response', OrderedDict([('numFound', total), ('start', int(params.get('start', 0))),
+                                      ('docs', documents)]))])
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Parallel harvest of several ontologies items, spread over a pool of processes::
+
+    harvester = Harvester(processes=8)
+    with JsonLinesSink('terms.jsonl') as sink:
+        harvester.harvest(['go', 'efo'], sink=sink)
+
+Each ontology list is split into page ranges (tasks), every worker process uses its own `OlsClient` (hence its own
+HTTP session) and builds helpers out of the parent process, parent only merges results into the sink.
+Also available as `ols-harvest` console script.
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import sys
+import time
+from collections import namedtuple
+
+from ebi.ols.api import exceptions
+# kept importable from here
+from ebi.ols.api.helpers import as_record
+
+logger = logging.getLogger(__name__)
+__all__ = ['Harvester', 'HarvestTask', 'HarvestProgress', 'JsonLinesSink', 'as_record', 'as_json']
+
+#: ontology list pages range [first_page, last_page), last_page None means up to list end
+HarvestTask = namedtuple('HarvestTask', ['ontology_id', 'kind', 'first_page', 'last_page'])
+HarvestProgress = namedtuple('HarvestProgress', ['done', 'total', 'items', 'elapsed', 'task'])
+
+KINDS = ('terms', 'properties', 'individuals')
+
+# per worker process state, set by `_init_worker`
+_worker = {}
+
+
+def as_json(helper):
+    """ Json line for helper, default `ols-harvest` transform """
+    return json.dumps(as_record(helper), separators=(',', ':'), default=str)
+
+
+def _init_worker(settings, transform):
+    from ebi.ols.api.client import OlsClient
+    _worker['client'] = OlsClient(**settings)
+    _worker['transform'] = transform
+    _worker['lists'] = {}
+
+
+def _list_client(ontology_id, kind):
+    from ebi.ols.api.base import ListClientMixin
+    import ebi.ols.api.helpers as helpers
+    key = (ontology_id, kind)
+    if key not in _worker['lists']:
+        config = _worker['client'].config
+        elem_class = {'terms': helpers.Term, 'properties': helpers.Property, 'individuals': helpers.Individual}[kind]
+        _worker['lists'][key] = ListClientMixin('/'.join([config.site, 'ontologies', ontology_id]), elem_class,
+                                                page_size=config.page_size, config=config)
+    return _worker['lists'][key]
+
+
+def _run_task(task):
+    """
+    Load task pages items in worker process
+    :param task: HarvestTask
+    :return: (task, items list)
+    """
+    items = []
+    transform = _worker['transform']
+    lists = _list_client(task.ontology_id, task.kind)
+    page = task.first_page
+    while task.last_page is None or page < task.last_page:
+        try:
+            document = lists.fetch_page(page)
+        except exceptions.NotFoundException:
+            # ontology announced more items than it actually lists
+            break
+        data = lists._get_data(lists.path, document) or []
+        for element in data:
+            helper = lists.elem_class_instance(**element)
+            items.append(transform(helper) if transform else helper)
+        if not data or 'next' not in document.links:
+            break
+        page += 1
+    return task, items
+
+
+class JsonLinesSink(object):
+    """
+    Harvest sink writing one json document per line (`as_json` transformed items are written as is)
+    """
+
+    def __init__(self, path_or_file):
+        """
+        :param path_or_file: file path, or opened text file
+        """
+        self._owned = isinstance(path_or_file, str)
+        self.file = open(path_or_file, 'w', encoding='utf-8') if self._owned else path_or_file
+        self.count = 0
+
+    def __call__(self, task, items):
+        for item in items:
+            self.file.write((item if isinstance(item, str) else as_json(item)) + '\n')
+        self.count += len(items)
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Harvester(object):
+    """
+    Harvest ontologies terms / properties / individuals with a pool of worker processes
+    """
+
+    def __init__(self, base_site=None, page_size=None, processes=None, kinds=('terms',), pages_per_task=4,
+                 transform=None, max_retry=5, retry_delay=5):
+        """
+        :param base_site: OLS api base url (default: `OlsClient.site`)
+        :param page_size: list page size (default: `OlsClient.page_size`)
+        :param processes: worker processes, default cpu count, 1 runs everything in current process
+        :param kinds: items lists to harvest among 'terms', 'properties', 'individuals'
+        :param pages_per_task: pages loaded by a worker at a time (large ontologies are spread over workers)
+        :param transform: picklable function applied to each helper in workers (ex: `as_json`)
+        :param max_retry: calls tries in case of network / server error
+        :param retry_delay: seconds between two tries
+        """
+        from ebi.ols.api.client import OlsClient
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise exceptions.BadParameter('Unknown harvested items %s' % ', '.join(sorted(unknown)))
+        self.settings = {'base_site': base_site or OlsClient.site, 'page_size': page_size or OlsClient.page_size,
+                         'max_retry': max_retry, 'retry_delay': retry_delay}
+        self.processes = processes or multiprocessing.cpu_count()
+        self.kinds = tuple(kinds)
+        self.pages_per_task = max(1, pages_per_task)
+        self.transform = transform
+
+    def tasks(self, ontologies=None):
+        """
+        Split harvest into tasks, from ontologies announced items numbers
+        :param ontologies: ontologies ids (default all), unknown ones are skipped
+        :return: list of HarvestTask
+        """
+        from ebi.ols.api.client import OlsClient
+        client = OlsClient(**self.settings)
+        catalogue = {ontology.ontology_id: ontology for ontology in client.ontologies()}
+        if ontologies is None:
+            ontologies = list(catalogue.keys())
+        page_size = self.settings['page_size']
+        sizes = []
+        for ontology_id in ontologies:
+            if ontology_id not in catalogue:
+                logger.warning('Unknown ontology %s, skipped', ontology_id)
+                continue
+            for kind in self.kinds:
+                sizes.append((getattr(catalogue[ontology_id], 'number_of_' + kind, None) or 0, ontology_id, kind))
+        tasks = []
+        # biggest lists first, small ones fill workers idle time at the end
+        for number, ontology_id, kind in sorted(sizes, key=lambda size: -size[0]):
+            pages = max(1, math.ceil(number / page_size))
+            for first_page in range(0, pages, self.pages_per_task):
+                last_page = first_page + self.pages_per_task
+                # last range follows list to its actual end
+                tasks.append(HarvestTask(ontology_id, kind, first_page, last_page if last_page < pages else None))
+        return tasks
+
+    def __call__(self, ontologies=None):
+        """
+        Generate harvested items as they are loaded (tasks completion order)
+        :param ontologies: ontologies ids (default all)
+        :return: generator of (HarvestTask, items list)
+        """
+        return self._run(self.tasks(ontologies))
+
+    def harvest(self, ontologies=None, sink=None, progress=None):
+        """
+        Harvest items into one sink
+        :param ontologies: ontologies ids (default all)
+        :param sink: callable(task, items) called in current process for each completed task (default: collect)
+        :param progress: callable(HarvestProgress) called after each completed task (default: log)
+        :return: number of items harvested, or items list when no sink
+        """
+        collected = [] if sink is None else None
+        if sink is None:
+            def sink(task, items):
+                collected.extend(items)
+        start = time.perf_counter()
+        tasks = self.tasks(ontologies)
+        total, count = len(tasks), 0
+        for done, (task, items) in enumerate(self._run(tasks), 1):
+            sink(task, items)
+            count += len(items)
+            state = HarvestProgress(done, total, count, time.perf_counter() - start, task)
+            if progress:
+                progress(state)
+            else:
+                logger.info('Harvested %s/%s tasks, %s items (%.1fs)', done, total, count, state.elapsed)
+        return count if collected is None else collected
+
+    def _run(self, tasks):
+        if self.processes <= 1:
+            _init_worker(self.settings, self.transform)
+            for task in tasks:
+                yield _run_task(task)
+            return
+        with multiprocessing.Pool(min(self.processes, max(1, len(tasks))), initializer=_init_worker,
+                                  initargs=(self.settings, self.transform)) as pool:
+            for result in pool.imap_unordered(_run_task, tasks):
+                yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ols-harvest', description='Harvest OLS ontologies items in parallel')
+    parser.add_argument('ontologies', nargs='*', help='ontologies ids (default: all)')
+    parser.add_argument('--site', help='OLS api base url')
+    parser.add_argument('--kind', action='append', choices=KINDS, help='items to harvest (default: terms)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: cpu count)')
+    parser.add_argument('--page-size', dest='page_size', type=int, default=None)
+    parser.add_argument('--pages-per-task', dest='pages_per_task', type=int, default=4)
+    parser.add_argument('--max-retry', dest='max_retry', type=int, default=5)
+    parser.add_argument('--retry-delay', dest='retry_delay', type=float, default=5)
+    parser.add_argument('--output', '-o', help='json lines output file (default: stdout)')
+    parser.add_argument('--quiet', '-q', action='store_true', help='no progress report')
+    options = parser.parse_args(argv)
+
+    harvester = Harvester(base_site=options.site, page_size=options.page_size, processes=options.processes,
+                          kinds=options.kind or ('terms',), pages_per_task=options.pages_per_task,
+                          transform=as_json, max_retry=options.max_retry, retry_delay=options.retry_delay)
+
+    def report(state):
+        if not options.quiet:
+            sys.stderr.write('\r[{}/{}] {} items, {:.1f}s, {:.0f} items/s'.format(
+                state.done, state.total, state.items, state.elapsed, state.items / state.elapsed if state.elapsed else 0))
+            sys.stderr.flush()
+
+    with JsonLinesSink(options.output or sys.stdout) as sink:
+        count = harvester.harvest(options.ontologies or None, sink=sink, progress=report)
+    if not options.quiet:
+        sys.stderr.write('\n')
+    logger.info('Harvested %s items', count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,17 +12,19 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import functools
 import logging
 import re
+import threading
 from collections import namedtuple, OrderedDict
-
-import inflection
-from coreapi import Object
+from collections.abc import Mapping, Sequence
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=4096)
 def underscore(value):
+    import inflection
     val = inflection.underscore(value)
     return re.sub('\s+', '_', val)
 
@@ -36,8 +38,7 @@ def convert_keys(data):
     if data is None:
         return OrderedDict({})
     return OrderedDict(
-        {underscore(k): convert_keys(v) if isinstance(v, dict) or isinstance(v, Object) else v for k, v in
-         data.items()})
+        {underscore(k): convert_keys(v) if isinstance(v, Mapping) else v for k, v in data.items()})
 
 
 def to_python_value(value):
@@ -52,6 +53,23 @@ def to_python_value(value):
     return value
 
 
+@functools.lru_cache(maxsize=4096)
+def guess_accession(short_form):
+    """
+    Accession from a short form (or IRI last part): last '_' turned into ':', ex: GO_0008150 => GO:0008150
+    :param short_form: str
+    :return: str, None when there is no '_' to split on
+    """
+    left, separator, right = short_form.rpartition('_')
+    if not separator:
+        # no '_' character in short_form might ignore the error (may be #Thing)
+        logger.info('[NO_OBO_ID] Unable to parse %s', short_form)
+        return None
+    accession = left + ':' + right
+    logger.debug('Accession sorted out %s', accession)
+    return accession
+
+
 class HasAccessionMixin(object):
     short_form = None
     obo_id = None
@@ -89,25 +107,10 @@ class HasAccessionMixin(object):
         if not self.obo_id:
             # TODO parse annotation id which may contains the actual term accession
             # ex: https://www.ebi.ac.uk/ols/api/ontologies/pr/terms?iri=http%3A%2F%2Fwww.yeastgenome.org%2Fcgi-bin%2Flocus.fpl%3Fdbid%3DS000001596
-            to_parse = self.short_form or self.iri.rsplit('/', 1)[-1]
-            # guess
-            sp = to_parse.split('_')
-            if len(sp) >= 2:
-                try:
-                    left = '_'.join(sp[:-1])
-                    right = sp[len(sp) - 1]
-                    accession = ':'.join([left, right])
-                    logger.debug('Accession sorted out %s', accession)
-                    self._accession = accession
-                    return accession
-                except Exception as e:
-                    logger.warning('Unable to parse %s because of %s', self.short_form,e)
-                    return None
-            else:
-                # no '_' character in short_form might ignore the error (may be #Thing)
-                logger.info('[NO_OBO_ID][%s][%s]', self.short_form, self.iri)
-                logger.info('Unable to parse %s', self.short_form) if len(sp) == 1 else None
-                return None
+            if self._accession is None:
+                # guessed once per helper (False: nothing to guess from)
+                self._accession = guess_accession(self.short_form or (self.iri or '').rsplit('/', 1)[-1]) or False
+            return self._accession or None
         return self.obo_id
 
     @accession.setter
@@ -119,15 +122,22 @@ class OLSHelper(object):
     """
     Base Transfer object, mainly assign dynamically received dict keys to object attributes
     """
+    #: `ClientConfig` of the client which returned this helper, used for further calls (None: default one)
+    client_config = None
 
     def __init__(self, **kwargs):
         converted = convert_keys(kwargs)
         for name, value in converted.items():
             self.__setattr__(name, to_python_value(value))
 
+    def _get_config(self):
+        from ebi.ols.api.base import ClientConfig
+        return self.client_config or ClientConfig.default
+
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return {k: v for k, v in self.__dict__.items() if k != 'client_config'} == \
+                   {k: v for k, v in other.__dict__.items() if k != 'client_config'}
         else:
             return False
 
@@ -135,6 +145,49 @@ class OLSHelper(object):
         return not self.__eq__(other)
 
 
+def as_record(helper):
+    """
+    Plain python (json compatible) structure from helper attributes
+    :param helper: OLSHelper
+    :return: dict
+    """
+    if isinstance(helper, OLSHelper):
+        return {name: as_record(value) for name, value in vars(helper).items()
+                if name != 'client_config' and not name.startswith('_relations')}
+    elif isinstance(helper, Mapping):
+        return {name: as_record(value) for name, value in helper.items()}
+    elif isinstance(helper, Sequence) and not isinstance(helper, str):
+        return [as_record(value) for value in helper]
+    return helper
+
+
+#: subsets built per (site, ontology, updated, version), plus single subsets loaded through search, least recently
+#: used ones are dropped first
+_subsets = OrderedDict()
+_subsets_lock = threading.Lock()
+SUBSETS_CACHE_SIZE = 32
+SUBSET_FIELDS = ('iri', 'obo_id', 'short_form', 'label', 'ontology_name', 'in_subset', 'is_obsolete',
+                 'is_defining_ontology')
+SUBSET_SEARCH_FIELDS = ('iri', 'obo_id', 'short_form', 'label', 'ontology_name', 'is_defining_ontology')
+
+
+def _cached_subsets(key):
+    """ Cached subsets (or single subset), None when not built """
+    with _subsets_lock:
+        cached = _subsets.get(key)
+        if cached is not None:
+            _subsets.move_to_end(key)
+        return cached
+
+
+def _cache_subsets(key, cached):
+    with _subsets_lock:
+        _subsets[key] = cached
+        _subsets.move_to_end(key)
+        while len(_subsets) > SUBSETS_CACHE_SIZE:
+            _subsets.popitem(last=False)
+
+
 class OntologyAnnotation(OLSHelper):
     """
     An ontology annotation item.
@@ -207,21 +260,67 @@ class Ontology(OLSHelper):
             self.ontology_id, self.config.title, self.config.namespace, self.updated)
 
     def __get_list_client(self, item_class):
-        from ebi.ols.api.client import ListClientMixin, OlsClient
-        return ListClientMixin('/'.join([OlsClient.site, 'ontologies/' + self.ontology_id]), item_class,
-                               page_size=OlsClient.page_size)
+        from ebi.ols.api.base import ListClientMixin
+        config = self._get_config()
+        return ListClientMixin('/'.join([config.site, 'ontologies/' + self.ontology_id]), item_class,
+                               page_size=config.page_size, config=config)
 
-    def terms(self, filters={}):
-        """ Links to ontology associated terms"""
-        return self.__get_list_client(Term)(filters=filters)
+    def terms(self, filters={}, fields=None):
+        """ Links to ontology associated terms (`fields`: only convert these fields, ex: ['iri', 'label']) """
+        return self.__get_list_client(Term)(filters=filters, fields=fields)
 
-    def individuals(self, filters={}):
+    def individuals(self, filters={}, fields=None):
         """ Links to ontology associated individuals """
-        return self.__get_list_client(Individual)(filters=filters)
+        return self.__get_list_client(Individual)(filters=filters, fields=fields)
 
-    def properties(self, filters={}):
+    def properties(self, filters={}, fields=None):
         """ Links to ontology associated properties"""
-        return self.__get_list_client(Property)(filters=filters)
+        return self.__get_list_client(Property)(filters=filters, fields=fields)
+
+    def _subsets_key(self):
+        return self._get_config().site, self.ontology_id, self.updated, self.version
+
+    def subsets(self, refresh=False):
+        """
+        Ontology subsets (slims) by name, built in one pass over ontology terms (only subsets related fields are
+        loaded), cached for this ontology version
+        :param refresh: build again
+        :return: dict of Subset
+        """
+        key = self._subsets_key()
+        subsets = None if refresh else _cached_subsets(key)
+        if subsets is None:
+            members = {}
+            for term in self.terms(fields=SUBSET_FIELDS):
+                for name in term.in_subset or []:
+                    members.setdefault(name, OrderedDict())[term.iri] = term
+            subsets = {name: Subset(terms, name, self.ontology_id) for name, terms in members.items()}
+            _cache_subsets(key, subsets)
+        return subsets
+
+    def subset(self, name, search=False):
+        """
+        One ontology subset (slim), empty when unknown
+        :param name: subset name, ex: 'goslim_generic'
+        :param search: when subsets are not built yet, only load this one members through search `slim` filter
+            instead of all ontology terms
+        :return: Subset
+        """
+        key = self._subsets_key()
+        subsets = _cached_subsets(key)
+        subset = subsets.get(name) if subsets is not None else _cached_subsets(key + (name,))
+        if subset is not None or subsets is not None:
+            return subset or Subset(OrderedDict(), name, self.ontology_id)
+        if not search:
+            return self.subsets().get(name) or Subset(OrderedDict(), name, self.ontology_id)
+        from ebi.ols.api.base import SearchClientMixin
+        config = self._get_config()
+        client = SearchClientMixin(config.site, OLSHelper, page_size=config.page_size, config=config)
+        results = client(query='*', filters={'slim': name, 'ontology': self.ontology_id, 'type': 'class'},
+                         fields=SUBSET_SEARCH_FIELDS)
+        subset = Subset(OrderedDict((term.iri, term) for term in results), name, self.ontology_id)
+        _cache_subsets(key + (name,), subset)
+        return subset
 
     @property
     def namespace(self):
@@ -310,20 +409,24 @@ class Term(OLSHelper, HasAccessionMixin):
     @property
     def relations_types(self):
         if self._relations_types is None:
-            from .client import ListClientMixin, OlsClient
+            from .base import ListClientMixin
+            config = self._get_config()
             client = ListClientMixin(
-                OlsClient.site + '/ontologies/' + self.ontology_name + '/terms/' + ListClientMixin.make_uri(self.iri),
+                config.site + '/ontologies/' + self.ontology_name + '/terms/' + ListClientMixin.make_uri(self.iri),
                 elem_class=Term,
-                page_size=OlsClient.page_size)
+                page_size=config.page_size,
+                config=config)
             self._relations_types = [name for name in client.document.links.keys() if name not in ('graph', 'jstree')]
         return self._relations_types
 
     def load_relation(self, relation):
-        from .client import ListClientMixin, OlsClient
+        from .base import ListClientMixin
+        config = self._get_config()
         client = ListClientMixin(
-            OlsClient.site + '/ontologies/' + self.ontology_name + '/terms/' + ListClientMixin.make_uri(self.iri),
+            config.site + '/ontologies/' + self.ontology_name + '/terms/' + ListClientMixin.make_uri(self.iri),
             elem_class=Term,
-            page_size=OlsClient.page_size)
+            page_size=config.page_size,
+            config=config)
         return client(action=relation)
 
     def graph(self):
@@ -373,7 +476,74 @@ class Term(OLSHelper, HasAccessionMixin):
         return self.label
 
 
-Subset = namedtuple("Subset", ["terms"])
+class Subset(namedtuple("Subset", ["terms", "name", "ontology_name"])):
+    """
+    Ontology subset (slim): `terms` maps members IRIs to their Term (see `Ontology.subset`)
+    """
+    __slots__ = ()
+
+    def __new__(cls, terms, name=None, ontology_name=None):
+        return super().__new__(cls, terms, name, ontology_name)
+
+    def __contains__(self, term):
+        """ Membership of a Term or an IRI """
+        return getattr(term, 'iri', term) in self.terms
+
+    def map(self, term, closest=False):
+        """
+        Subset terms the term maps to through the hierarchy: term itself or its ancestors which are subset members
+        :param term: Term or IRI (from subset ontology)
+        :param closest: only keep the most specific ones (drop members ancestors of other found members)
+        :return: list of Term, most specific first (members with the most ancestors)
+        """
+        iri = getattr(term, 'iri', term)
+        config = getattr(term, 'client_config', None) or self._config()
+        ontology_name = getattr(term, 'ontology_name', None) or self.ontology_name
+        found = [self.terms[ancestor] for ancestor in (iri,) + _ancestor_iris(config, ontology_name, iri)
+                 if ancestor in self.terms]
+        # OLS ancestors order is not specified: members are ranked on their own ancestors
+        ancestors = {member.iri: _ancestor_iris(config, ontology_name, member.iri) for member in found}
+        found.sort(key=lambda member: -len(ancestors[member.iri]))
+        if closest:
+            covered = {ancestor for member in found for ancestor in ancestors[member.iri]}
+            found = [member for member in found if member.iri not in covered]
+        return found
+
+    def _config(self):
+        member = next(iter(self.terms.values()), None)
+        return getattr(member, 'client_config', None) or OLSHelper()._get_config()
+
+
+#: terms ancestors IRIs per (site, ontology, iri): slim mappings walk the same ancestors over and over
+_ancestors = OrderedDict()
+_ancestors_lock = threading.Lock()
+ANCESTORS_CACHE_SIZE = 65536
+
+
+def _ancestor_iris(config, ontology_name, iri):
+    """ Term ancestors IRIs, in OLS order, cached per site (client configs and transports are not retained) """
+    key = (config.site, ontology_name, iri)
+    with _ancestors_lock:
+        ancestors = _ancestors.get(key)
+        if ancestors is not None:
+            _ancestors.move_to_end(key)
+            return ancestors
+    from .base import ListClientMixin
+    client = ListClientMixin(
+        config.site + '/ontologies/' + ontology_name + '/terms/' + ListClientMixin.make_uri(iri),
+        elem_class=Term,
+        page_size=config.page_size,
+        config=config)
+    if 'ancestors' not in client.document.links:
+        # root terms
+        ancestors = ()
+    else:
+        ancestors = tuple(ancestor.iri for ancestor in client(action='ancestors', fields=['iri']))
+    with _ancestors_lock:
+        _ancestors[key] = ancestors
+        while len(_ancestors) > ANCESTORS_CACHE_SIZE:
+            _ancestors.popitem(last=False)
+    return ancestors
 
 
 class Individual(OLSHelper, HasAccessionMixin):
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Batch resolution of mixed identifiers (CURIEs, short forms, IRIs) to OLS terms::
+
+    resolver = CurieResolver(client, workers=16)
+    for resolution in resolver.resolve(column):
+        if resolution.status == FOUND:
+            print(resolution.identifier, resolution.term.label)
+
+OLS terms lists accept only one of `iri`, `obo_id` or `short_form` per call (see `filters_terms`): identifiers are
+de-duplicated, then resolved with one call each, concurrently, results (misses included) are kept in a cache shared
+by all `resolve` calls.
+"""
+import collections
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.base import BaseClient
+
+logger = logging.getLogger(__name__)
+__all__ = ['CurieResolver', 'Resolution', 'FOUND', 'NOT_FOUND', 'INVALID', 'ERROR']
+
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+ERROR = 'error'
+
+#: one resolved identifier: `term` is the defining ontology match (or first one), `terms` all ontologies matches,
+#: `error` the failure message for ERROR status
+Resolution = namedtuple('Resolution', ['identifier', 'status', 'term', 'terms', 'error'])
+
+
+def identifier_filter(identifier):
+    """
+    Terms list filter for an identifier
+    :param identifier: stripped identifier
+    :return: (filter name, value), None when identifier can't be looked up
+    """
+    if not identifier:
+        return None
+    if '://' in identifier:
+        return 'iri', identifier
+    if ':' in identifier:
+        return 'obo_id', identifier
+    if '_' in identifier:
+        return 'short_form', identifier
+    return None
+
+
+def identifier_key(identifier):
+    """ Cache key: a CURIE and its short form are the same identifier (OLS matches them case sensitively) """
+    return identifier if '://' in identifier else identifier.replace(':', '_')
+
+
+class CurieResolver(object):
+    """
+    Concurrent, cached identifiers to terms resolution
+    """
+
+    def __init__(self, client, workers=8, negative_ttl=None, fields=None):
+        """
+        :param client: OlsClient
+        :param workers: identifiers resolved at the same time
+        :param negative_ttl: seconds before an identifier not found is looked up again (default: never)
+        :param fields: only convert these fields into returned terms (ex: ['iri', 'obo_id', 'label'])
+        """
+        self.client = client
+        self.workers = max(1, workers)
+        self.negative_ttl = negative_ttl
+        # defining ontology match is picked among all matches
+        self.fields = BaseClient.make_fields(fields) | {'is_defining_ontology'} if fields else None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            terms, stored = entry
+            if not terms and self.negative_ttl is not None and time.monotonic() - stored > self.negative_ttl:
+                del self._cache[key]
+                return None
+            return terms
+
+    def _lookup(self, name, value):
+        """ All terms matching identifier, empty list when there is none """
+        try:
+            terms = list(self.client.terms(filters={name: value}, fields=self.fields))
+        except exceptions.NotFoundException:
+            terms = []
+        with self._lock:
+            self._cache[identifier_key(value)] = (terms, time.monotonic())
+        return terms
+
+    @staticmethod
+    def _resolution(identifier, terms):
+        if not terms:
+            return Resolution(identifier, NOT_FOUND, None, [], None)
+        defining = next((term for term in terms if term.is_defining_ontology), terms[0])
+        return Resolution(identifier, FOUND, defining, terms, None)
+
+    def resolve_one(self, identifier):
+        """
+        Resolve a single identifier (cached)
+        :param identifier: str
+        :return: Resolution
+        """
+        query = identifier_filter(identifier.strip() if isinstance(identifier, str) else None)
+        if query is None:
+            return Resolution(identifier, INVALID, None, [], None)
+        terms = self._cached(identifier_key(query[1]))
+        if terms is None:
+            try:
+                terms = self._lookup(*query)
+            except Exception as e:
+                logger.warning('Unable to resolve %s: %s', identifier, e)
+                return Resolution(identifier, ERROR, None, [], str(e))
+        return self._resolution(identifier, terms)
+
+    def resolve(self, identifiers):
+        """
+        Resolve identifiers, each distinct one is looked up once (CURIE and short form spellings
+        included)
+        :param identifiers: iterable of str, read as results are consumed
+        :return: generator of Resolution, one per identifier, in identifiers order
+        """
+        window = collections.deque()
+        pending = {}
+        with ThreadPoolExecutor(self.workers) as executor:
+            for identifier in identifiers:
+                stripped = identifier.strip() if isinstance(identifier, str) else None
+                query = identifier_filter(stripped)
+                key = identifier_key(stripped) if query else None
+                future = pending.get(key) if query else None
+                if query and future is None:
+                    terms = self._cached(key)
+                    if terms is None:
+                        future = pending[key] = executor.submit(self._lookup, *query)
+                    else:
+                        future = Future()
+                        future.set_result(terms)
+                window.append((identifier, key, future))
+                # bounded look ahead: resolutions stream out while next identifiers are read
+                while len(window) > self.workers * 4:
+                    yield self._result(pending, *window.popleft())
+            while window:
+                yield self._result(pending, *window.popleft())
+
+    def _result(self, pending, identifier, key, future):
+        if future is None:
+            return Resolution(identifier, INVALID, None, [], None)
+        if pending.get(key) is future:
+            # next occurrences are served by the cache
+            del pending[key]
+        try:
+            return self._resolution(identifier, future.result())
+        except Exception as e:
+            logger.warning('Unable to resolve %s: %s', identifier, e)
+            return Resolution(identifier, ERROR, None, [], str(e))
+
+    def clear(self):
+        """ Forget cached resolutions """
+        with self._lock:
+            self._cache.clear()
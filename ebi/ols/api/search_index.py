@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Local label / synonym search, for autocomplete like uses with no remote call::
+
+    index = SearchIndex.from_harvest('terms.jsonl')
+    index.search('memb', ontology='go', rows=10)
+
+Names (labels, `synonyms`, `obo_synonym` names, `annotation.alternative_term`) are split into tokens: every query
+token has to prefix one of a name tokens (or be close enough to one of them, when it matches none). Hits are ranked
+as OLS roughly does: exact matches first, then names starting with the query, then names containing all query
+tokens, labels before synonyms, defining ontology and shorter names first.
+"""
+import bisect
+import json
+import os
+import re
+from collections import namedtuple
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.accessions import _value
+from ebi.ols.api.base import BaseClient
+
+__all__ = ['SearchIndex', 'SearchEntry', 'SearchHit', 'normalize']
+
+#: one indexed item (term, property, individual)
+SearchEntry = namedtuple('SearchEntry', ['iri', 'obo_id', 'label', 'ontology_name', 'type', 'is_obsolete',
+                                         'is_defining_ontology'])
+#: search result: entry values, score and the name which matched
+SearchHit = namedtuple('SearchHit', SearchEntry._fields + ('score', 'matched'))
+
+#: items fields loaded to build an index (see list `fields` projection)
+INDEX_FIELDS = ('iri', 'obo_id', 'label', 'ontology_name', 'is_obsolete', 'is_defining_ontology', 'synonyms',
+                'obo_synonym', 'annotation')
+
+_TYPES = {'terms': 'class', 'properties': 'property', 'individuals': 'individual'}
+_SEPARATORS = re.compile(r'\W+')
+# scores: exact name, name starting with query, name containing all query tokens
+EXACT, PREFIX, TOKENS = 100, 80, 60
+SYNONYM_PENALTY, FUZZY_PENALTY = 10, 15
+
+
+def normalize(text):
+    """ Lower case words separated by single spaces """
+    return ' '.join(token for token in _SEPARATORS.split(text.casefold()) if token)
+
+
+def _deletes(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _distance(first, second, limit):
+    """ Levenshtein distance, anything above limit is returned as limit + 1 """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _names(item):
+    """ Item searchable names, label first """
+    names = [_value(item, 'label')]
+    names += _value(item, 'synonyms') or []
+    names += [_value(synonym, 'name') for synonym in _value(item, 'obo_synonym') or []]
+    annotation = _value(item, 'annotation')
+    if annotation is not None:
+        names += _value(annotation, 'alternative_term') or []
+    return [name for name in names if isinstance(name, str) and name]
+
+
+class SearchIndex(object):
+    """
+    In memory inverted index over items names
+    """
+    version = 1
+
+    def __init__(self, items=None):
+        """
+        :param items: helpers (Term, Property, Individual) or item mappings to index
+        """
+        self._entries = []
+        self._items = {}
+        # (normalized name, entry position, is label)
+        self._names = []
+        self._tokens = {}
+        self._exact = {}
+        self._vocabulary = None
+        self._fuzzy = None
+        if items is not None:
+            self.update(items)
+
+    @classmethod
+    def from_ontology(cls, ontology, kinds=('terms',)):
+        """
+        Index ontology items (only indexed fields are loaded)
+        :param ontology: Ontology helper
+        :param kinds: 'terms', 'properties', 'individuals'
+        :return: SearchIndex
+        """
+        index = cls()
+        for kind in kinds:
+            index.update(getattr(ontology, kind)(fields=INDEX_FIELDS))
+        return index
+
+    @classmethod
+    def from_harvest(cls, path):
+        """
+        Index items harvested in a json lines file (`ols-harvest` / `JsonLinesSink` output)
+        :param path: file path
+        :return: SearchIndex
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def add(self, item):
+        """
+        Index one item, again indexed items (same iri and ontology) are ignored
+        :param item: helper or item mapping
+        :return: SearchEntry
+        """
+        key = (_value(item, 'iri'), _value(item, 'ontology_name'))
+        if key in self._items:
+            return self._entries[self._items[key]]
+        kind = _TYPES.get(getattr(item, 'path', None)) or _value(item, 'type') or 'class'
+        entry = SearchEntry(key[0], _value(item, 'obo_id'), _value(item, 'label'), key[1], kind,
+                            bool(_value(item, 'is_obsolete')), bool(_value(item, 'is_defining_ontology')))
+        self._items[key] = len(self._entries)
+        self._entries.append(entry)
+        seen = set()
+        for rank, name in enumerate(_names(item)):
+            normalized = normalize(name)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                self._add_name(normalized, len(self._entries) - 1, rank == 0)
+        return entry
+
+    def _add_name(self, normalized, position, is_label):
+        self._names.append((normalized, position, is_label))
+        self._exact.setdefault(normalized, []).append(len(self._names) - 1)
+        for token in set(normalized.split(' ')):
+            self._tokens.setdefault(token, []).append(len(self._names) - 1)
+        self._vocabulary = self._fuzzy = None
+
+    def update(self, items):
+        """
+        Index items
+        :param items: iterable of helpers or item mappings
+        :return: number of items read
+        """
+        count = 0
+        for count, item in enumerate(items, 1):
+            self.add(item)
+        return count
+
+    def collect(self, items):
+        """
+        Index items while they are iterated
+        :param items: iterable of helpers or item mappings
+        :return: generator of items, unchanged
+        """
+        for item in items:
+            self.add(item)
+            yield item
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __repr__(self):
+        return '<SearchIndex(items={}, names={}, tokens={})>'.format(
+            len(self._entries), len(self._names), len(self._tokens))
+
+    # Query
+
+    def _prefixed(self, token):
+        """ Vocabulary tokens starting with token """
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token + '\uffff', start)
+        return self._vocabulary[start:end]
+
+    def _close(self, token):
+        """ Vocabulary tokens within one edit (two for long tokens) of token """
+        if len(token) < 4:
+            return []
+        if self._fuzzy is None:
+            self._fuzzy = {}
+            for known in self._tokens:
+                if len(known) >= 3:
+                    for deleted in _deletes(known) | {known}:
+                        self._fuzzy.setdefault(deleted, set()).add(known)
+        limit = 1 if len(token) < 8 else 2
+        candidates = set()
+        for deleted in _deletes(token) | {token}:
+            candidates.update(self._fuzzy.get(deleted, ()))
+        return [known for known in candidates if _distance(token, known, limit) <= limit]
+
+    @staticmethod
+    def _filters(filters):
+        """ Checked search filters (same keys as `client.search`): ontologies, types, obsoletes, exact, names kinds """
+        try:
+            filters = BaseClient.filters_response(dict(filters))
+        except AssertionError as e:
+            raise exceptions.BadFilters(str(e))
+        unsupported = set(filters) & {'childrenOf', 'slim', 'groupField'}
+        if unsupported:
+            raise exceptions.BadFilters('Filters not supported by local search %s' % ', '.join(sorted(unsupported)))
+
+        def values(name):
+            value = filters.get(name)
+            if not value:
+                return None
+            return set(value.split(',')) if isinstance(value, str) else set(value)
+
+        types = values('type')
+        if types:
+            types = {'class' if value == 'term' else value for value in types}
+        fields = values('queryFields')
+        return (values('ontology'), types, str(filters.get('obsoletes', '')).lower() == 'true',
+                str(filters.get('exact', '')).lower() == 'true',
+                None if fields is None else {is_label for is_label, field in ((True, 'label'), (False, 'synonym'))
+                                             if field in fields})
+
+    def search(self, query, rows=10, fuzzy=True, filters=None, **kwargs):
+        """
+        Search indexed names
+        :param query: text typed so far
+        :param rows: maximum number of hits
+        :param fuzzy: match query tokens close to indexed ones when they prefix none
+        :param filters: `client.search` like filters: ontology, type, obsoletes, exact, queryFields (label, synonym)
+        :return: list of SearchHit, best first
+        """
+        ontologies, types, obsoletes, exact, labels = self._filters(filters or kwargs)
+        normalized = normalize(query)
+        if not normalized or rows <= 0:
+            return []
+        self._prepare()
+
+        def accepted(name_id):
+            name, position, is_label = self._names[name_id]
+            entry = self._entries[position]
+            return not ((labels is not None and is_label not in labels) or
+                        (ontologies and entry.ontology_name not in ontologies) or
+                        (types and entry.type not in types) or (entry.is_obsolete and not obsoletes))
+
+        hits, seen = [], set()
+        # best tiers first, each one in names rank order
+        exact_ids = self._exact.get(normalized, ())
+        if self._collect(exact_ids, EXACT, 0, accepted, hits, seen, rows) or exact:
+            return hits
+        start = bisect.bisect_left(self._sorted_names, normalized)
+        end = bisect.bisect_left(self._sorted_names, normalized + '\uffff', start)
+        prefix_ids = set(self._sorted_ids[start:end]).difference(exact_ids)
+        if self._collect(prefix_ids, PREFIX, 0, accepted, hits, seen, rows):
+            return hits
+        candidates, fuzzy_count = None, 0
+        for token in sorted(set(normalized.split(' ')), key=len, reverse=True):
+            matching = self._prefixed(token)
+            if not matching and fuzzy:
+                matching = self._close(token)
+                fuzzy_count += 1
+            names = set()
+            for known in matching:
+                names.update(self._tokens[known])
+            candidates = names if candidates is None else candidates & names
+            if not candidates:
+                return hits
+        candidates.difference_update(prefix_ids, exact_ids)
+        self._collect(candidates, TOKENS, FUZZY_PENALTY * fuzzy_count, accepted, hits, seen, rows)
+        return hits
+
+    def _prepare(self):
+        """ Sorted structures, built again after items are added """
+        if self._vocabulary is not None:
+            return
+        self._vocabulary = sorted(self._tokens)
+        ordered = sorted(range(len(self._names)), key=lambda i: self._names[i][0])
+        self._sorted_names = [self._names[i][0] for i in ordered]
+        self._sorted_ids = ordered
+        # labels first, then defining ontology items, shorter names
+        ranked = sorted(range(len(self._names)), key=lambda i: (
+            not self._names[i][2], not self._entries[self._names[i][1]].is_defining_ontology,
+            len(self._names[i][0]), self._names[i][0]))
+        self._ranked = ranked
+        self._rank = [0] * len(ranked)
+        for rank, name_id in enumerate(ranked):
+            self._rank[name_id] = rank
+
+    def _collect(self, name_ids, score, penalty, accepted, hits, seen, rows):
+        """ Add hits for names, True once rows hits are found """
+        if len(name_ids) > len(self._ranked) // 8:
+            # large sets (short or frequent words): walking all names in rank order stops much earlier than sorting
+            ordered = (name_id for name_id in self._ranked if name_id in name_ids)
+        else:
+            ordered = sorted(name_ids, key=self._rank.__getitem__)
+        for name_id in ordered:
+            name, position, is_label = self._names[name_id]
+            if position in seen or not accepted(name_id):
+                continue
+            seen.add(position)
+            hits.append(SearchHit(*self._entries[position], score=score - penalty - (0 if is_label else SYNONYM_PENALTY),
+                                  matched=name))
+            if len(hits) >= rows:
+                return True
+        return False
+
+    # Persistence
+
+    def to_dict(self):
+        return {'version': self.version, 'fields': list(SearchEntry._fields),
+                'entries': [list(entry) for entry in self._entries],
+                'names': [list(name) for name in self._names]}
+
+    @classmethod
+    def from_dict(cls, content):
+        if content.get('version') != cls.version or content.get('fields') != list(SearchEntry._fields):
+            raise exceptions.BadParameter('Unsupported search index version %s' % content.get('version'))
+        index = cls()
+        index._entries = [SearchEntry(*values) for values in content['entries']]
+        index._items = {(entry.iri, entry.ontology_name): position for position, entry in enumerate(index._entries)}
+        for normalized, position, is_label in content['names']:
+            index._add_name(normalized, position, is_label)
+        return index
+
+    def save(self, path):
+        """ Store index as json file (replaced atomically) """
+        temporary = path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Read index from `save` file """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
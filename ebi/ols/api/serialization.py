@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Compact binary serialization of helpers (and plain values holding them), to ship them between processes or store
+them in caches::
+
+    data = dumps(terms)
+    terms = loads(data)
+
+Format (version 1): ``OLSB`` magic, version byte, then one value encoded as msgpack does for nil, booleans, integers,
+floats, strings, bytes, arrays and maps. msgpack never used byte ``0xc1`` introduces the two extensions:
+
+- ``0xc1 0x00 <id>``: helper, whose class name and attributes names (schema) follow the first time `id` is seen,
+  then its attributes values. Attributes names are thus written once per stream, not once per helper.
+- ``0xc1 0x01 <index>``: repeated string (mapping keys, ontology names...), short strings are only written once.
+
+Only `OLSHelper` classes are ever instantiated when reading, their `__init__` is not called (attributes are restored
+as they were), `client_config` is not serialized: read helpers use default configuration, as unpickled ones.
+"""
+import struct
+from collections.abc import Mapping
+
+from ebi.ols.api import exceptions
+
+__all__ = ['dumps', 'loads', 'VERSION']
+
+MAGIC = b'OLSB'
+VERSION = 1
+_MARKER = 0xc1
+_HELPER, _STRING = 0, 1
+# strings repeated in a stream are written once when their utf-8 size is within these bounds
+_SHARED_MIN, _SHARED_MAX = 3, 128
+
+_uint8, _uint16, _uint32, _uint64 = struct.Struct('>B'), struct.Struct('>H'), struct.Struct('>I'), struct.Struct('>Q')
+_int8, _int16, _int32, _int64 = struct.Struct('>b'), struct.Struct('>h'), struct.Struct('>i'), struct.Struct('>q')
+_float64 = struct.Struct('>d')
+
+
+def _helper_classes():
+    from ebi.ols.api.helpers import OLSHelper
+    classes, pending = {}, [OLSHelper]
+    while pending:
+        cls = pending.pop()
+        classes[cls.__name__] = cls
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+class _Writer(object):
+
+    def __init__(self):
+        from ebi.ols.api.helpers import OLSHelper
+        self.helper_class = OLSHelper
+        self.parts = []
+        self.schemas = {}
+        self.strings = {}
+
+    def int(self, value):
+        append = self.parts.append
+        if 0 <= value < 0x80:
+            append(_uint8.pack(value))
+        elif -32 <= value < 0:
+            append(_int8.pack(value))
+        elif value >= 0:
+            if value <= 0xff:
+                append(b'\xcc' + _uint8.pack(value))
+            elif value <= 0xffff:
+                append(b'\xcd' + _uint16.pack(value))
+            elif value <= 0xffffffff:
+                append(b'\xce' + _uint32.pack(value))
+            else:
+                append(b'\xcf' + _uint64.pack(value))
+        elif value >= -0x80:
+            append(b'\xd0' + _int8.pack(value))
+        elif value >= -0x8000:
+            append(b'\xd1' + _int16.pack(value))
+        elif value >= -0x80000000:
+            append(b'\xd2' + _int32.pack(value))
+        else:
+            append(b'\xd3' + _int64.pack(value))
+
+    def str(self, value):
+        index = self.strings.get(value)
+        if index is not None:
+            self.parts.append(b'\xc1\x01')
+            self.int(index)
+            return
+        encoded = value.encode('utf-8')
+        size = len(encoded)
+        if _SHARED_MIN <= size <= _SHARED_MAX:
+            self.strings[value] = len(self.strings)
+        if size < 32:
+            self.parts.append(_uint8.pack(0xa0 | size) + encoded)
+        elif size <= 0xff:
+            self.parts.append(b'\xd9' + _uint8.pack(size) + encoded)
+        elif size <= 0xffff:
+            self.parts.append(b'\xda' + _uint16.pack(size) + encoded)
+        else:
+            self.parts.append(b'\xdb' + _uint32.pack(size) + encoded)
+
+    def bytes(self, value):
+        size = len(value)
+        if size <= 0xff:
+            self.parts.append(b'\xc4' + _uint8.pack(size))
+        elif size <= 0xffff:
+            self.parts.append(b'\xc5' + _uint16.pack(size))
+        else:
+            self.parts.append(b'\xc6' + _uint32.pack(size))
+        self.parts.append(bytes(value))
+
+    def header(self, size, fix, codes):
+        if size < 16:
+            self.parts.append(_uint8.pack(fix | size))
+        elif size <= 0xffff:
+            self.parts.append(codes[0] + _uint16.pack(size))
+        else:
+            self.parts.append(codes[1] + _uint32.pack(size))
+
+    def helper(self, helper):
+        attributes = [(name, value) for name, value in vars(helper).items() if name != 'client_config']
+        key = (helper.__class__, tuple(name for name, _ in attributes))
+        schema = self.schemas.get(key)
+        self.parts.append(b'\xc1\x00')
+        if schema is None:
+            schema = self.schemas[key] = len(self.schemas)
+            self.int(schema)
+            self.str(helper.__class__.__name__)
+            self.value(list(key[1]))
+        else:
+            self.int(schema)
+        for _, value in attributes:
+            self.value(value)
+
+    def value(self, value):
+        kind = type(value)
+        if kind is str:
+            self.str(value)
+        elif value is None:
+            self.parts.append(b'\xc0')
+        elif kind is bool:
+            self.parts.append(b'\xc3' if value else b'\xc2')
+        elif kind is int:
+            self.int(value)
+        elif kind is float:
+            self.parts.append(b'\xcb' + _float64.pack(value))
+        elif isinstance(value, self.helper_class):
+            self.helper(value)
+        elif isinstance(value, Mapping):
+            self.header(len(value), 0x80, (b'\xde', b'\xdf'))
+            for name, item in value.items():
+                self.value(name)
+                self.value(item)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            self.bytes(value)
+        elif isinstance(value, (list, tuple, set, frozenset)) or hasattr(value, '__iter__'):
+            items = list(value)
+            self.header(len(items), 0x90, (b'\xdc', b'\xdd'))
+            for item in items:
+                self.value(item)
+        else:
+            raise TypeError('%s values can not be serialized' % kind.__name__)
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.schemas = []
+        self.strings = []
+        self.classes = None
+
+    def unpack(self, structure):
+        value, = structure.unpack_from(self.data, self.pos)
+        self.pos += structure.size
+        return value
+
+    def text(self, size):
+        end = self.pos + size
+        value = str(self.data[self.pos:end], 'utf-8')
+        self.pos = end
+        if _SHARED_MIN <= size <= _SHARED_MAX:
+            self.strings.append(value)
+        return value
+
+    def helper(self):
+        schema = self.value()
+        if schema == len(self.schemas):
+            if self.classes is None:
+                self.classes = _helper_classes()
+            name = self.value()
+            if name not in self.classes:
+                raise exceptions.BadParameter('Unknown helper class %s' % name)
+            self.schemas.append((self.classes[name], self.value()))
+        cls, names = self.schemas[schema]
+        helper = cls.__new__(cls)
+        helper.__dict__.update((name, self.value()) for name in names)
+        return helper
+
+    def value(self):
+        code = self.data[self.pos]
+        self.pos += 1
+        if code < 0x80:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if 0xa0 <= code <= 0xbf:
+            return self.text(code & 0x1f)
+        if 0x90 <= code <= 0x9f:
+            return [self.value() for _ in range(code & 0x0f)]
+        if 0x80 <= code <= 0x8f:
+            return self.map(code & 0x0f)
+        if code == 0xc0:
+            return None
+        if code == 0xc2:
+            return False
+        if code == 0xc3:
+            return True
+        if code == _MARKER:
+            kind = self.data[self.pos]
+            self.pos += 1
+            if kind == _HELPER:
+                return self.helper()
+            return self.strings[self.value()]
+        if code == 0xd9:
+            return self.text(self.unpack(_uint8))
+        if code == 0xda:
+            return self.text(self.unpack(_uint16))
+        if code == 0xdb:
+            return self.text(self.unpack(_uint32))
+        if code == 0xcb:
+            return self.unpack(_float64)
+        if code in _INTEGERS:
+            return self.unpack(_INTEGERS[code])
+        if code in (0xdc, 0xdd):
+            return [self.value() for _ in range(self.unpack(_uint16 if code == 0xdc else _uint32))]
+        if code in (0xde, 0xdf):
+            return self.map(self.unpack(_uint16 if code == 0xde else _uint32))
+        if code in (0xc4, 0xc5, 0xc6):
+            size = self.unpack({0xc4: _uint8, 0xc5: _uint16, 0xc6: _uint32}[code])
+            self.pos += size
+            return bytes(self.data[self.pos - size:self.pos])
+        raise exceptions.BadParameter('Unexpected byte 0x%02x at %s' % (code, self.pos - 1))
+
+    def map(self, size):
+        result = {}
+        for _ in range(size):
+            key = self.value()
+            result[key] = self.value()
+        return result
+
+
+_INTEGERS = {0xcc: _uint8, 0xcd: _uint16, 0xce: _uint32, 0xcf: _uint64,
+             0xd0: _int8, 0xd1: _int16, 0xd2: _int32, 0xd3: _int64}
+
+
+def dumps(value):
+    """
+    Serialize helpers, or plain values (lists, mappings...) holding helpers
+    :param value: helper or value
+    :return: bytes
+    """
+    writer = _Writer()
+    writer.value(value)
+    return MAGIC + bytes([VERSION]) + b''.join(writer.parts)
+
+
+def loads(data):
+    """
+    Read `dumps` output
+    :param data: bytes like (bytes, memoryview, mmap...), read in place
+    :return: helper or value (mappings as dict, sequences as list)
+    """
+    view = memoryview(data)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise exceptions.BadParameter('Not a serialized helper')
+    if view[len(MAGIC)] != VERSION:
+        raise exceptions.BadParameter('Unsupported serialization version %s' % view[len(MAGIC)])
+    reader = _Reader(view)
+    reader.pos = len(MAGIC) + 1
+    return reader.value()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Incremental decoding of OLS pages: list elements (``_embedded.<items>`` or search ``response.docs``) are decoded one
+by one while the HTTP body is read, instead of decoding the whole page first (see `ClientConfig.stream`).
+"""
+import codecs
+import json
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+__all__ = ['iter_elements']
+
+_WHITESPACES = ' \t\n\r'
+#: bytes read at a time from HTTP body
+CHUNK_SIZE = 65536
+COMPACT_SIZE = 65536
+
+
+class _Buffer(object):
+    """ Decoded text read so far, consumed part is dropped after each element """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder(object_pairs_hook=OrderedDict)
+
+    def more(self):
+        """ Read next chunk, False when body is fully read """
+        if self.exhausted:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            self.text += self._utf8.decode(b'', final=True)
+            return False
+        self.text += self._utf8.decode(chunk)
+        return True
+
+    def compact(self):
+        # dropping consumed text copies the remaining one: only worth it once enough text is consumed
+        if self.pos >= COMPACT_SIZE:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+
+    def peek(self):
+        """ Next non blank character (None at end of body) """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACES:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return None
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected %r at %s in streamed document' % (char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        """ Decode next json value, reading more chunks until it is complete """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if self.more():
+                    continue
+                raise
+            # a number may continue in next chunk
+            if end == len(self.text) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def _seek(buffer, keys):
+    """ Move buffer right after the opening bracket of array under keys path, False if there is none """
+    buffer.expect('{')
+    while True:
+        char = buffer.peek()
+        if char == '}':
+            buffer.pos += 1
+            return False
+        if char == ',':
+            buffer.pos += 1
+            continue
+        key = buffer.value()
+        buffer.expect(':')
+        if key == keys[0]:
+            char = buffer.peek()
+            if len(keys) == 1 and char == '[':
+                buffer.pos += 1
+                return True
+            if len(keys) > 1 and char == '{':
+                if _seek(buffer, keys[1:]):
+                    return True
+                continue
+        buffer.value()
+        buffer.compact()
+
+
+def iter_elements(chunks, keys):
+    """
+    Generate elements of the array found under keys path in a json object, as soon as each one is read.
+    Memory use is bound by one element (plus one chunk), whatever the array size.
+    :param chunks: iterable of bytes (ex: `requests.Response.iter_content()`)
+    :param keys: path to array, ex: ('_embedded', 'terms') or ('response', 'docs')
+    :return: generator of OrderedDict (HAL `_links` removed)
+    """
+    buffer = _Buffer(chunks)
+    if not _seek(buffer, tuple(keys)):
+        return
+    buffer.compact()
+    while True:
+        char = buffer.peek()
+        if char == ']':
+            return
+        if char == ',':
+            buffer.pos += 1
+            continue
+        if char is None:
+            raise ValueError('Truncated streamed document')
+        element = buffer.value()
+        buffer.compact()
+        if isinstance(element, dict):
+            element.pop('_links', None)
+        yield element
@@ -0,0 +1,543 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from coreapi.transports import HTTPTransport
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ebi.ols.api import exceptions
+
+logger = logging.getLogger(__name__)
+__all__ = ['Cassette', 'CassetteTransport', 'EndpointStats', 'FailoverTransport', 'HedgeStats', 'HedgingTransport',
+           'interaction_key']
+
+
+def _unquote_all(value):
+    previous = None
+    while previous != value:
+        previous, value = value, urllib.parse.unquote(value)
+    return value
+
+
+def interaction_key(method, url):
+    """
+    Stable key for an HTTP exchange, independent from host and from the url encoding level.
+    Path segments are fully decoded then quoted once, so double-encoded IRIs (see `BaseClient.make_uri`) and
+    single-encoded ones match, query parameters (search queries and filters) are decoded and sorted.
+    :param method: HTTP method
+    :param url: requested url
+    :return: str
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = '/'.join(urllib.parse.quote(_unquote_all(segment), safe='') for segment in parts.path.split('/'))
+    query = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    key = '{} {}'.format(method.upper(), path)
+    if query:
+        key += '?' + urllib.parse.urlencode(query)
+    return key
+
+
+class Cassette(object):
+    """
+    Recorded HTTP exchanges, stored as (optionally gzipped when file name ends with .gz) compact JSON
+    """
+    version = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.interactions = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.interactions)
+
+    def __contains__(self, key):
+        return key in self.interactions
+
+    def _open(self, mode):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def load(self):
+        with self._open('r') as f:
+            content = json.load(f)
+        if content.get('version') != self.version:
+            raise exceptions.OlsException('Unsupported cassette version %s' % content.get('version'))
+        self.interactions = content['interactions']
+        logger.debug('Loaded %s interactions from %s', len(self.interactions), self.path)
+
+    def save(self, path=None):
+        self.path = path or self.path
+        with self._lock:
+            content = {'version': self.version, 'interactions': self.interactions}
+            with self._open('w') as f:
+                json.dump(content, f, separators=(',', ':'), sort_keys=True)
+            self.dirty = False
+        logger.debug('Saved %s interactions to %s', len(self.interactions), self.path)
+
+    def record(self, request, response):
+        body = response.content.decode(response.encoding or 'utf-8') if response.content else ''
+        try:
+            # re-dump json content compactly, whatever the server formatting was
+            body = json.dumps(json.loads(body), separators=(',', ':'))
+        except ValueError:
+            pass
+        with self._lock:
+            self.interactions[interaction_key(request.method, request.url)] = {
+                'status': response.status_code,
+                'reason': response.reason,
+                'content_type': response.headers.get('content-type'),
+                'body': body
+            }
+            self.dirty = True
+
+    def play(self, request):
+        key = interaction_key(request.method, request.url)
+        interaction = self.interactions.get(key)
+        if interaction is None:
+            raise exceptions.NotRecordedError({'message': 'No recorded interaction', 'key': key,
+                                               'cassette': self.path})
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = interaction.get('reason')
+        response.headers = CaseInsensitiveDict()
+        if interaction.get('content_type'):
+            response.headers['Content-Type'] = interaction['content_type']
+        response._content = interaction['body'].encode('utf-8')
+        # content is already there, also for `stream=True` requests
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class _RecordAdapter(HTTPAdapter):
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.cassette.record(request, response)
+        return response
+
+
+class _ReplayAdapter(BaseAdapter):
+
+    def __init__(self, cassette, fallback=None):
+        super().__init__()
+        self.cassette = cassette
+        self.fallback = fallback
+
+    def send(self, request, **kwargs):
+        if self.fallback is not None and interaction_key(request.method, request.url) not in self.cassette:
+            return self.fallback.send(request, **kwargs)
+        return self.cassette.play(request)
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class CassetteTransport(HTTPTransport):
+    """
+    coreapi HTTP transport recording / replaying every exchange into a cassette file::
+
+        with CassetteTransport('ols.json.gz', mode='record') as transport:
+            client = OlsClient(transport=transport)
+            ...
+        # later, with no network
+        client = OlsClient(transport=CassetteTransport('ols.json.gz'))
+
+    Modes:
+        - replay: only serve recorded exchanges, raise `NotRecordedError` otherwise
+        - record: always call remote server and record (override) exchanges
+        - auto: replay recorded exchanges, record missing ones
+    """
+    modes = ('replay', 'record', 'auto')
+
+    def __init__(self, path, mode='replay', **kwargs):
+        if mode not in self.modes:
+            raise exceptions.BadParameter('Unknown cassette mode %s' % mode)
+        # coreapi transports are immutable objects, only private attributes can be set
+        self._cassette = Cassette(path)
+        self._mode = mode
+        session = kwargs.pop('session', None) or requests.Session()
+        if mode == 'record':
+            adapter = _RecordAdapter(self.cassette)
+        elif mode == 'auto':
+            adapter = _ReplayAdapter(self.cassette, fallback=_RecordAdapter(self.cassette))
+        else:
+            adapter = _ReplayAdapter(self.cassette)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        super().__init__(session=session, **kwargs)
+
+    @property
+    def cassette(self):
+        return self._cassette
+
+    @property
+    def mode(self):
+        return self._mode
+
+    def save(self):
+        """ Store recorded exchanges if any new ones """
+        if self.cassette.dirty:
+            self.cassette.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+
+#: one endpoint state: `latency` is the moving average of successful requests durations (seconds, None until
+#: measured), `failures` counts failed requests (connection errors, timeouts, 5xx answers)
+EndpointStats = namedtuple('EndpointStats', ['site', 'healthy', 'latency', 'requests', 'failures', 'last_error'])
+
+
+class _Endpoint(object):
+
+    def __init__(self, site, priority):
+        self.site = site.rstrip('/')
+        self.priority = priority
+        self.latency = None
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.last_error = None
+
+    def healthy(self, now):
+        return self.down_until <= now
+
+    def stats(self, now):
+        return EndpointStats(self.site, self.healthy(now), self.latency, self.requests, self.failures,
+                             self.last_error)
+
+
+class _RoutingAdapter(BaseAdapter):
+    """ Sends each request to the best endpoint, next ones when it fails """
+
+    def __init__(self, transport):
+        super().__init__()
+        self.transport = transport
+        self.adapter = HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        transport = self.transport
+        matched = transport.match(request.url)
+        if matched is None:
+            return self.adapter.send(request, **kwargs)
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = transport.timeout
+        suffix = request.url[len(matched.site):]
+        error, failed = None, None
+        for endpoint in transport.route():
+            routed = request.copy()
+            # urls (HAL links included) built from any endpoint are sent to the chosen one
+            routed.url = endpoint.site + suffix
+            start = time.perf_counter()
+            try:
+                response = self.adapter.send(routed, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                transport.failed(endpoint, e)
+                continue
+            if failed is not None:
+                # only the last error answer may be returned, earlier ones connections are released
+                failed.close()
+                failed = None
+            if response.status_code >= 500:
+                transport.failed(endpoint, 'HTTP %s' % response.status_code)
+                failed = response
+                continue
+            transport.succeeded(endpoint, time.perf_counter() - start)
+            return response
+        if failed is not None:
+            # every endpoint answered an error: let caller deal with it (see `retry_requests`)
+            return failed
+        raise error
+
+    def close(self):
+        self.adapter.close()
+
+
+class FailoverTransport(HTTPTransport):
+    """
+    coreapi HTTP transport spreading calls over several OLS deployments serving the same api (ex: public OLS and a
+    local mirror)::
+
+        client = OlsClient(base_site=['http://ols-mirror.local/api', 'https://www.ebi.ac.uk/ols/api'])
+        ...
+        client.transport.stats()
+
+    Each request goes to the healthy endpoint with the lowest latency moving average (endpoints not measured yet are
+    tried first, in sites order). An endpoint failing (connection error, timeout, 5xx answer) is skipped for
+    `cooldown` seconds and the request is sent to the next one, so lists iteration goes on whichever endpoint their
+    HAL `next` links were built for.
+    """
+
+    def __init__(self, sites, timeout=30, cooldown=30, alpha=0.3, check_interval=None, **kwargs):
+        """
+        :param sites: OLS api base urls, in preference order
+        :param timeout: seconds before a request is considered failed
+        :param cooldown: seconds a failing endpoint is skipped (until a health check succeeds)
+        :param alpha: weight of the latest duration in latency moving average
+        :param check_interval: seconds between background health checks of all endpoints (default: none)
+        """
+        if not sites:
+            raise exceptions.BadParameter('At least one site is expected')
+        # coreapi transports are immutable objects, only private attributes can be set
+        self._endpoints = [_Endpoint(site, priority) for priority, site in enumerate(sites)]
+        # longest prefixes first, a site may be a prefix of another one
+        self._prefixes = sorted(self._endpoints, key=lambda endpoint: -len(endpoint.site))
+        self._timeout = timeout
+        self._cooldown = cooldown
+        self._alpha = alpha
+        self._check_interval = check_interval
+        self._checked = time.monotonic()
+        self._checking = False
+        self._lock = threading.Lock()
+        session = kwargs.pop('session', None) or requests.Session()
+        adapter = _RoutingAdapter(self)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        super().__init__(session=session, **kwargs)
+
+    @property
+    def sites(self):
+        return [endpoint.site for endpoint in self._endpoints]
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def match(self, url):
+        """ Endpoint url was built for, None when url is not an endpoint one """
+        for endpoint in self._prefixes:
+            if url.startswith(endpoint.site) and url[len(endpoint.site):len(endpoint.site) + 1] in ('', '/', '?'):
+                return endpoint
+        return None
+
+    def route(self):
+        """ Endpoints in trial order: healthy ones, fastest first, then failing ones, soonest back first """
+        now = time.monotonic()
+        if self._check_interval is not None and now - self._checked > self._check_interval and not self._checking:
+            self._checking = True
+            threading.Thread(target=self.check, name='ols-health-check', daemon=True).start()
+        with self._lock:
+            healthy = [endpoint for endpoint in self._endpoints if endpoint.healthy(now)]
+            failing = [endpoint for endpoint in self._endpoints if not endpoint.healthy(now)]
+        healthy.sort(key=lambda endpoint: (endpoint.latency or 0, endpoint.priority))
+        failing.sort(key=lambda endpoint: endpoint.down_until)
+        return healthy + failing
+
+    def succeeded(self, endpoint, duration):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.down_until = 0.0
+            endpoint.latency = duration if endpoint.latency is None else \
+                self._alpha * duration + (1 - self._alpha) * endpoint.latency
+
+    def failed(self, endpoint, error):
+        logger.warning('OLS endpoint %s failed: %s', endpoint.site, error)
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.last_error = str(error)
+            endpoint.down_until = time.monotonic() + self._cooldown
+
+    def check(self):
+        """
+        Health check all endpoints (api root request), updating their state and latency
+        :return: list of EndpointStats
+        """
+        adapter = HTTPAdapter()
+        try:
+            for endpoint in self._endpoints:
+                request = requests.Request('GET', endpoint.site, headers={'Accept': 'application/hal+json'})
+                start = time.perf_counter()
+                try:
+                    response = adapter.send(request.prepare(), timeout=self._timeout)
+                    response.close()
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self.failed(endpoint, e)
+                    continue
+                if response.status_code >= 400:
+                    self.failed(endpoint, 'HTTP %s' % response.status_code)
+                else:
+                    self.succeeded(endpoint, time.perf_counter() - start)
+        finally:
+            adapter.close()
+            self._checked = time.monotonic()
+            self._checking = False
+        return self.stats()
+
+    def stats(self):
+        """ Endpoints state, in sites order """
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.stats(now) for endpoint in self._endpoints]
+
+
+#: hedging metrics: `hedged` duplicates sent, `won` duplicates answering first, `denied` hedges skipped because
+#: budget was spent, `delay` current hedging delay (seconds, None until enough latencies are known)
+HedgeStats = namedtuple('HedgeStats', ['requests', 'hedged', 'won', 'denied', 'delay'])
+
+
+def _discard(future):
+    """ Release a losing request connection once it answers (requests can not be aborted while in flight) """
+    if future.exception() is None:
+        future.result().close()
+
+
+class _HedgingAdapter(BaseAdapter):
+    """ Sends a duplicate of GET requests answering later than usual, first answer wins """
+
+    def __init__(self, transport, workers):
+        super().__init__()
+        self.transport = transport
+        # losing requests keep their connection until answered: pool sized for all requests in flight
+        self.adapter = HTTPAdapter(pool_maxsize=workers)
+
+    def send(self, request, **kwargs):
+        transport = self.transport
+        if request.method != 'GET':
+            return self.adapter.send(request, **kwargs)
+        delay = transport.delay()
+        start = time.perf_counter()
+        primary = transport.executor.submit(self.adapter.send, request, **kwargs)
+        if delay is None or wait([primary], timeout=delay).done or not transport.spend():
+            response = primary.result()
+            transport.measured(time.perf_counter() - start)
+            return response
+        hedge = transport.executor.submit(self.adapter.send, request.copy(), **kwargs)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None or not pending:
+                break
+        for future in (primary, hedge):
+            if future is not winner:
+                future.add_done_callback(_discard)
+        if winner is None:
+            # both failed, report original request error
+            raise primary.exception()
+        transport.measured(time.perf_counter() - start, won=winner is hedge)
+        return winner.result()
+
+    def close(self):
+        self.adapter.close()
+
+
+class HedgingTransport(HTTPTransport):
+    """
+    coreapi HTTP transport cutting tail latency: when a GET request (detail lookup, list page...) has not been
+    answered within the `percentile` of recent latencies, the same request is sent again, first answer is used and
+    the other one is dropped::
+
+        client = OlsClient(transport=HedgingTransport(percentile=0.95, budget=0.05))
+        ...
+        client.transport.stats()
+
+    Duplicates are capped by `budget`: each request earns `budget` hedge credit, a hedge costs one. The losing
+    request is not aborted: it runs to completion in the background, holding a pooled connection (and one of
+    `workers`) until answered, then its response is closed unread.
+    """
+
+    def __init__(self, percentile=0.95, budget=0.05, min_delay=0.005, window=256, min_samples=20, workers=32,
+                 **kwargs):
+        """
+        :param percentile: recent latencies percentile after which a request is hedged
+        :param budget: hedges ratio to requests (0.05: at most 5% more requests)
+        :param min_delay: minimum seconds before hedging
+        :param window: number of recent latencies kept
+        :param min_samples: latencies known before any request is hedged
+        :param workers: requests (and hedges) in flight at the same time
+        """
+        if not 0 < percentile < 1 or budget < 0:
+            raise exceptions.BadParameter('Percentile is expected in ]0, 1[, budget >= 0')
+        # coreapi transports are immutable objects, only private attributes can be set
+        self._percentile = percentile
+        self._budget = budget
+        self._min_delay = min_delay
+        self._min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        # budget credit is capped, so that hedges can not burst after a long quiet period
+        self._credit = 0.0
+        self._max_credit = max(1.0, budget * window)
+        self._counts = {'requests': 0, 'hedged': 0, 'won': 0, 'denied': 0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='ols-hedge')
+        session = kwargs.pop('session', None) or requests.Session()
+        adapter = _HedgingAdapter(self, workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        super().__init__(session=session, **kwargs)
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def delay(self):
+        """ Seconds after which a request is hedged, None while too few latencies are known """
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return max(self._min_delay, latencies[min(len(latencies) - 1, int(len(latencies) * self._percentile))])
+
+    def spend(self):
+        """ Take one hedge from budget, False when budget is spent """
+        with self._lock:
+            if self._credit >= 1:
+                self._credit -= 1
+                self._counts['hedged'] += 1
+                return True
+            self._counts['denied'] += 1
+            return False
+
+    def measured(self, duration, won=False):
+        with self._lock:
+            self._latencies.append(duration)
+            self._counts['requests'] += 1
+            self._credit = min(self._max_credit, self._credit + self._budget)
+            if won:
+                self._counts['won'] += 1
+
+    def stats(self):
+        """ Hedging metrics """
+        delay = self.delay()
+        with self._lock:
+            return HedgeStats(delay=delay, **self._counts)
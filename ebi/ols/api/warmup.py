@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Detail lookups cache for long running services, with background warm-up and stale-while-revalidate::
+
+    client = OlsClient(cache={'ttl': 3600, 'workers': 2})
+    warming = client.cache.warm(ontologies=['go', 'efo'], terms=hot_iris, relations=[('go', iri, 'children')])
+    ...
+    client.term(iri)  # cached helper
+
+Entries are fresh for `ttl` seconds, but refreshed in the background from `refresh_ahead` of their lifetime on: hot
+entries are never seen expired. Expired entries are still served (and refreshed) during `stale` seconds, older ones
+are loaded again by the caller. Warm-up and refreshes share `workers` threads (a few calls at most in flight),
+foreground misses never wait behind them.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+__all__ = ['DetailCache', 'CacheStats', 'WarmUp', 'KINDS']
+
+#: cached lookups kinds, as `OlsClient` detail clients names, plus terms relations
+KINDS = ('ontology', 'term', 'property', 'individual', 'relation')
+#: `stale` entries served while being refreshed, `refreshes` background loads (warm-up excluded)
+CacheStats = namedtuple('CacheStats', ['entries', 'hits', 'stale', 'misses', 'refreshes', 'errors'])
+
+_Entry = namedtuple('_Entry', ['value', 'fetched'])
+
+
+def _relation(config, ontology_name, iri, relation):
+    from ebi.ols.api.base import ListClientMixin
+    from ebi.ols.api.helpers import Term
+    client = ListClientMixin(
+        config.site + '/ontologies/' + ontology_name + '/terms/' + ListClientMixin.make_uri(iri),
+        elem_class=Term, page_size=config.page_size, config=config)
+    if relation not in client.document.links:
+        # root / leaf terms
+        return []
+    return list(client(action=relation))
+
+
+class _CachedDetail(object):
+    """ `DetailClientMixin` compatible client answering from cache """
+
+    def __init__(self, cache, kind):
+        self.cache = cache
+        self.kind = kind
+
+    def __call__(self, identifier, silent=True, unique=True, fields=None):
+        if fields is not None or not unique:
+            # projections and lists of elements are not cached
+            return self.cache.loaders[self.kind](identifier, silent=silent, unique=unique, fields=fields)
+        return self.cache.get(self.kind, identifier)
+
+
+class WarmUp(object):
+    """
+    Background preload of a list of cache keys, see `DetailCache.warm`
+    """
+
+    def __init__(self, cache, keys):
+        self.cache = cache
+        self.keys = keys
+        self.total = len(keys)
+        self.loaded = 0
+        self.failed = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._stopped = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='ols-warm-up', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        pending = {}
+        try:
+            for key in self.keys:
+                # a few loads queued at a time: refreshes are not stuck behind the whole warm-up
+                while len(pending) >= self.cache.workers and not self._stopped:
+                    self._completed(pending)
+                if self._stopped:
+                    break
+                pending[self.cache.schedule(key, warm=True)] = key
+            while pending:
+                self._completed(pending)
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+            logger.info('Cache warm-up done: %s loaded, %s failed in %.1fs', self.loaded, len(self.failed),
+                        self.elapsed)
+            self._done.set()
+
+    def _completed(self, pending):
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            if future.cancelled():
+                # cache closed: remaining keys are dropped too
+                self._stopped = True
+            elif future.exception() is None:
+                self.loaded += 1
+            else:
+                self.failed.append((key, future.exception()))
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """ Wait for warm-up end, return whether it is done """
+        return self._done.wait(timeout)
+
+    def stop(self):
+        """ Do not start loading remaining keys """
+        self._stopped = True
+
+    def __repr__(self):
+        return '<WarmUp(loaded={}, failed={}, total={}, done={})>'.format(self.loaded, len(self.failed), self.total,
+                                                                         self.done)
+
+
+class DetailCache(object):
+    """
+    Ontologies / terms / properties / individuals lookups and terms relations cache, shared by all threads of a
+    client. Returned helpers are shared instances, they should be treated as read only.
+    """
+    #: time source, seconds
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, client, ttl=3600, refresh_ahead=0.2, stale=None, workers=2, max_size=100000):
+        """
+        :param client: OlsClient
+        :param ttl: seconds entries are fresh
+        :param refresh_ahead: last part of entries lifetime during which they are refreshed in the background
+            (0: only refreshed once expired)
+        :param stale: seconds expired entries are still served while refreshed (default: ttl, 0: never)
+        :param workers: background loads (warm-up and refreshes) running at the same time
+        :param max_size: entries kept, least recently used ones are dropped first
+        """
+        from ebi.ols.api.base import DetailClientMixin
+        from ebi.ols.api.helpers import Individual, Ontology, Property, Term
+        self.client = client
+        self.config = client.config
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.stale = ttl if stale is None else stale
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        site = self.config.site
+        self.loaders = {
+            'ontology': client.catalogue if client.catalogue is not None else
+            DetailClientMixin(site + '/ontologies', Ontology, config=self.config),
+            'term': DetailClientMixin(site + '/terms', Term, config=self.config),
+            'property': DetailClientMixin(site + '/properties', Property, config=self.config),
+            'individual': DetailClientMixin(site + '/individuals', Individual, config=self.config),
+            'relation': lambda key: _relation(self.config, *key),
+        }
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._counts = dict.fromkeys(('hits', 'stale', 'misses', 'refreshes', 'errors'), 0)
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ols-cache')
+            return self._executor
+
+    def client_for(self, kind):
+        """ Cached detail client, used by `OlsClient` detail clients """
+        return _CachedDetail(self, kind)
+
+    def _load(self, key):
+        kind, identifier = key
+        return self.loaders[kind](identifier)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = _Entry(value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _background(self, key, warm):
+        try:
+            value = self._load(key)
+            self._store(key, value)
+            return value
+        except Exception as e:
+            if not warm:
+                with self._lock:
+                    self._counts['errors'] += 1
+                # stale value is kept, next lookup tries again
+                logger.warning('Unable to refresh %s %s: %s', key[0], key[1], e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def schedule(self, key, warm=False):
+        """ Load key in the background (once at a time per key), return its future """
+        executor = self.executor
+        with self._lock:
+            # registered before the load may end (and unregister itself)
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = executor.submit(self._background, key, warm)
+                if not warm:
+                    self._counts['refreshes'] += 1
+            return future
+
+    def get(self, kind, identifier):
+        """
+        Cached lookup
+        :param kind: one of `KINDS`
+        :param identifier: lookup identifier, (ontology_name, iri, relation) for relations
+        :return: helper, list of Term for relations
+        """
+        key = (kind, identifier)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            inflight = self._inflight.get(key)
+            age = None if entry is None else now - entry.fetched
+            if age is None or age >= self.ttl + self.stale:
+                self._counts['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counts['stale' if age >= self.ttl else 'hits'] += 1
+        if age is not None and age < self.ttl + self.stale:
+            if age >= self.ttl * (1 - self.refresh_ahead):
+                self.schedule(key)
+            return entry.value
+        if inflight is not None:
+            # already being loaded (warm-up), same result
+            try:
+                return inflight.result()
+            except CancelledError:
+                pass
+        value = self._load(key)
+        self._store(key, value)
+        return value
+
+    def related(self, ontology_name, iri, relation):
+        """ Cached term relation (ex: 'children'), list of Term """
+        return self.get('relation', (ontology_name, iri, relation))
+
+    def warm(self, ontologies=(), terms=(), properties=(), individuals=(), relations=()):
+        """
+        Preload entries in the background, ontologies first
+        :param ontologies: ontologies ids
+        :param terms: terms identifiers, as given to `client.term`
+        :param properties: properties identifiers
+        :param individuals: individuals identifiers
+        :param relations: (ontology_name, iri, relation) of terms relations
+        :return: WarmUp, running
+        """
+        keys = [('ontology', identifier) for identifier in ontologies] + \
+               [('term', identifier) for identifier in terms] + \
+               [('property', identifier) for identifier in properties] + \
+               [('individual', identifier) for identifier in individuals] + \
+               [('relation', tuple(identifier)) for identifier in relations]
+        return WarmUp(self, keys)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, kind=None, identifier=None):
+        """ Drop one entry, all entries of one kind, or everything """
+        with self._lock:
+            for key in list(self._entries):
+                if (kind is None or key[0] == kind) and (identifier is None or key[1] == identifier):
+                    del self._entries[key]
+
+    @property
+    def stats(self):
+        with self._lock:
+            return CacheStats(entries=len(self._entries), **self._counts)
+
+    def close(self):
+        """ Stop background threads (pending loads are dropped) """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for key, future in list(self._inflight.items()):
+                # running loads end on their own, queued ones never start
+                if future.cancel():
+                    del self._inflight[key]
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def __repr__(self):
+        return '<DetailCache(site={}, entries={}, ttl={})>'.format(self.config.site, len(self._entries), self.ttl)
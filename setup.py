@@ -25,8 +25,15 @@ setup(
     author_email='mchakiachvili@ebi.ac.uk',
     url='https://github.com/Ensembl/ols-client',
     license='Apache 2.0',
-    packages=find_packages(exclude=('tests', 'docs')),
+    packages=find_packages(exclude=('tests', 'docs', 'benchmarks')),
     install_requires=import_requirements(),
+    extras_require={
+        # vectorized `ebi.ols.api.closure` queries
+        'closure': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': ['ols-harvest=ebi.ols.api.harvest:main'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Environment :: Console",
@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Local OLS stand-in server.
+
+Serves synthetic (or recorded) HAL documents shaped like the public OLS REST api, so that the client can be tested
+and benchmarked without any network access::
+
+    with OlsStubServer(ontologies=3, terms=250, latency=0.01) as server:
+        client = OlsClient(base_site=server.url, page_size=100)
+        ...
+
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from ebi.ols.api.hal import KINDS, HalDocuments
+
+logger = logging.getLogger(__name__)
+
+OBO_BASE = 'http://purl.obolibrary.org/obo/'
+_WORDS = ('cell', 'membrane', 'protein', 'binding', 'signal', 'transport', 'gene', 'receptor', 'tissue',
+          'process', 'development', 'metabolic', 'kinase', 'channel', 'nucleus', 'organelle', 'response')
+_QUALIFIERS = ('regulation of', 'positive', 'negative', 'cellular', 'neural', 'response to', 'abnormal')
+
+
+class SyntheticDataset(object):
+    """
+    Deterministic in-memory OLS content.
+
+    Each ontology ``ont<n>`` holds ``terms`` classes organised as a binary tree (term ``i`` parent is term
+    ``(i - 1) // 2``), a few properties and individuals. Every ontology but the first one imports the root term
+    of ``ont0`` (``is_defining_ontology`` False) so that global detail lookups return multiple elements.
+    """
+
+    def __init__(self, ontologies=3, terms=250, properties=5, individuals=5, annotation_size=0):
+        self.ontologies = OrderedDict()
+        self.items = {kind: OrderedDict() for kind in KINDS}
+        self.parents = {}
+        for o in range(ontologies):
+            ontology_id = 'ont{}'.format(o)
+            self.ontologies[ontology_id] = self.make_ontology(ontology_id, terms, properties, individuals)
+            for kind in KINDS:
+                self.items[kind][ontology_id] = OrderedDict()
+            for i in range(terms):
+                self.add_term(ontology_id, i, annotation_size)
+            for i in range(properties):
+                self.add_item('properties', ontology_id, i)
+            for i in range(individuals):
+                self.add_item('individuals', ontology_id, i)
+        if ontologies > 1 and terms:
+            root = self.items['terms']['ont0'][self.iri('ont0', 0)]
+            for ontology_id in list(self.ontologies.keys())[1:]:
+                imported = dict(root, ontology_name=ontology_id, ontology_prefix=ontology_id.upper(),
+                                is_defining_ontology=False)
+                self.items['terms'][ontology_id][imported['iri']] = imported
+                self.ontologies[ontology_id]['numberOfTerms'] += 1
+
+    @staticmethod
+    def iri(ontology_id, index, kind='terms'):
+        prefix = {'terms': '', 'properties': 'P', 'individuals': 'I'}[kind]
+        return '{}{}_{}{:07d}'.format(OBO_BASE, ontology_id.upper(), prefix, index)
+
+    @staticmethod
+    def label(index):
+        return '{} {} {}'.format(_QUALIFIERS[index % len(_QUALIFIERS)], _WORDS[(index // 3) % len(_WORDS)], index)
+
+    @staticmethod
+    def make_ontology(ontology_id, terms, properties, individuals, version='1.0.0'):
+        return OrderedDict([
+            ('ontologyId', ontology_id),
+            ('loaded', '2020-01-01T00:00:00.000+0000'),
+            ('updated', '2020-01-01T00:00:00.000+0000'),
+            ('status', 'LOADED'),
+            ('message', ''),
+            ('version', None),
+            ('numberOfTerms', terms),
+            ('numberOfProperties', properties),
+            ('numberOfIndividuals', individuals),
+            ('config', OrderedDict([
+                ('id', ontology_id),
+                ('versionIri', '{}{}/{}/{}.owl'.format(OBO_BASE, ontology_id, version, ontology_id)),
+                ('namespace', ontology_id),
+                ('preferredPrefix', ontology_id.upper()),
+                ('title', 'Synthetic ontology {}'.format(ontology_id)),
+                ('description', 'Synthetic ontology used for offline tests'),
+                ('homepage', None),
+                ('version', version),
+                ('mailingList', None),
+                ('creators', []),
+                ('annotations', {'license': ['CC-BY'], 'default-namespace': [ontology_id]}),
+                ('fileLocation', '{}{}.owl'.format(OBO_BASE, ontology_id)),
+                ('reasonerType', 'OWL2'),
+                ('oboSlims', True),
+                ('labelProperty', 'http://www.w3.org/2000/01/rdf-schema#label'),
+                ('definitionProperties', []),
+                ('synonymProperties', []),
+                ('hierarchicalProperties', []),
+                ('baseUris', ['{}{}_'.format(OBO_BASE, ontology_id.upper())]),
+                ('hiddenProperties', []),
+                ('internalMetadataProperties', []),
+                ('skos', False)
+            ]))
+        ])
+
+    def add_term(self, ontology_id, index, annotation_size=0):
+        iri = self.iri(ontology_id, index)
+        prefix = ontology_id.upper()
+        short_form = iri.rsplit('/', 1)[-1]
+        label = self.label(index)
+        annotation = OrderedDict([
+            ('has_obo_namespace', [ontology_id]),
+            ('id', [short_form.replace('_', ':')]),
+            ('has_alternative_id', ['{}:ALT{:07d}'.format(prefix, index)] if index % 5 == 0 else []),
+            ('database_cross_reference', ['XREF:{}'.format(index)]),
+        ])
+        if annotation_size:
+            annotation['comment'] = ['Synthetic annotation block {} '.format(index) * 8] * annotation_size
+        obsolete = index % 97 == 96
+        subsets = [name for name, step in (('slim_a', 10), ('slim_b', 25)) if index % step == 0]
+        parent = (index - 1) // 2 if index else None
+        self.parents[iri] = [self.iri(ontology_id, parent)] if parent is not None else []
+        self.items['terms'][ontology_id][iri] = OrderedDict([
+            ('iri', iri),
+            ('label', label),
+            ('description', ['Definition of {}'.format(label)]),
+            ('annotation', annotation),
+            ('synonyms', ['{} synonym'.format(label)]),
+            ('ontology_name', ontology_id),
+            ('ontology_prefix', prefix),
+            ('ontology_iri', '{}{}.owl'.format(OBO_BASE, ontology_id)),
+            ('is_obsolete', obsolete),
+            ('term_replaced_by', self.iri(ontology_id, index + 1) if obsolete else None),
+            ('is_defining_ontology', True),
+            ('has_children', 2 * index + 1 < self.ontologies[ontology_id]['numberOfTerms']),
+            ('is_root', index == 0),
+            ('short_form', short_form),
+            ('obo_id', short_form.replace('_', ':')),
+            ('in_subset', subsets or None),
+            ('obo_definition_citation', [{'definition': 'Definition of {}'.format(label), 'oboXrefs': []}]),
+            ('obo_xref', [{'database': 'XREF', 'id': str(index), 'description': None, 'url': None}]),
+            ('obo_synonym', [{'name': '{} synonym'.format(label), 'scope': 'hasExactSynonym', 'type': None,
+                              'xrefs': []}]),
+        ])
+        return self.items['terms'][ontology_id][iri]
+
+    def add_item(self, kind, ontology_id, index):
+        iri = self.iri(ontology_id, index, kind)
+        short_form = iri.rsplit('/', 1)[-1]
+        item = OrderedDict([
+            ('iri', iri),
+            ('label', '{} {}'.format(kind[:-1], index)),
+            ('description', []),
+            ('annotation', {}),
+            ('synonyms', None),
+            ('ontology_name', ontology_id),
+            ('ontology_prefix', ontology_id.upper()),
+            ('ontology_iri', '{}{}.owl'.format(OBO_BASE, ontology_id)),
+            ('is_obsolete', False),
+            ('is_defining_ontology', True),
+            ('has_children', False),
+            ('is_root', True),
+            ('short_form', short_form),
+            ('obo_id', short_form.replace('_', ':')),
+        ])
+        self.items[kind][ontology_id][iri] = item
+        return item
+
+    def children(self, ontology_id, iri):
+        return [term for term in self.items['terms'][ontology_id].values()
+                if iri in self.parents.get(term['iri'], []) and term['is_defining_ontology']]
+
+    def relation(self, ontology_id, iri, relation):
+        terms = self.items['terms'][ontology_id]
+        relation = relation.replace('hierarchical', '').lower()
+        if relation == 'parents':
+            return [terms[p] for p in self.parents.get(iri, []) if p in terms]
+        elif relation == 'ancestors':
+            found, current = [], self.parents.get(iri, [])
+            while current:
+                found.extend(terms[p] for p in current if p in terms)
+                current = [pp for p in current for pp in self.parents.get(p, [])]
+            return found
+        elif relation == 'children':
+            return self.children(ontology_id, iri)
+        elif relation == 'descendants':
+            found, current = [], self.children(ontology_id, iri)
+            while current:
+                found.extend(current)
+                current = [c for t in current for c in self.children(ontology_id, t['iri'])]
+            return found
+        return []
+
+    def search_docs(self):
+        """ Yield (type, document source) for every searchable item """
+        type_names = {'terms': 'class', 'properties': 'property', 'individuals': 'individual'}
+        for ontology_id, ontology in self.ontologies.items():
+            yield 'ontology', ontology_id, OrderedDict([
+                ('iri', ontology['config']['fileLocation']), ('label', ontology['config']['title']),
+                ('short_form', ontology_id), ('obo_id', None), ('ontology_name', ontology_id),
+                ('ontology_prefix', ontology_id.upper()), ('is_defining_ontology', True), ('synonyms', []),
+                ('description', [ontology['config']['description']])])
+            for kind in KINDS:
+                for item in self.items[kind][ontology_id].values():
+                    yield type_names[kind], ontology_id, item
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'OlsStub/1.0'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def do_GET(self):
+        stub = self.server.stub
+        if stub.stopped:
+            # keep-alive connections opened before `stop` are dropped, as a server gone down would
+            self.close_connection = True
+            return
+        stub.record_request(self.path)
+        delay = stub.latency + stub.slowness(self.path)
+        if delay:
+            time.sleep(delay)
+        failure = stub.failure(self.path)
+        if failure:
+            status, body, content_type = failure, json.dumps({'status': failure, 'error': 'Injected'}).encode(), \
+                'application/json'
+        else:
+            status, body, content_type = stub.respond(self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        # counted before sending, client may read response before this thread goes on
+        stub.record_sent(len(body))
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # clients closing a connection before reading whole response (stopped streamed iterations) are expected
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            logger.debug('Connection closed by %s', client_address)
+        else:
+            super().handle_error(request, client_address)
+
+
+class OlsStubServer(object):
+    """
+    Threaded local HTTP server answering like OLS ``/api`` endpoints.
+
+    :param ontologies: number of synthetic ontologies
+    :param terms: number of terms per synthetic ontology
+    :param latency: seconds slept before answering each request
+    :param recorded: mapping (or json file path) of ``path?query`` -> body (or ``{"status": .., "body": ..}``),
+        served before synthetic content. Urls starting with ``recorded_base`` are rewritten to this server url.
+    """
+
+    def __init__(self, ontologies=3, terms=250, properties=5, individuals=5, latency=0.0, annotation_size=0,
+                 recorded=None, recorded_base='https://www.ebi.ac.uk/ols/api', host='127.0.0.1', port=0):
+        self.dataset = SyntheticDataset(ontologies, terms, properties, individuals, annotation_size)
+        self.latency = latency
+        if isinstance(recorded, str):
+            with open(recorded, 'r', encoding='utf-8') as f:
+                recorded = json.load(f)
+        self.recorded = recorded or {}
+        self.recorded_base = recorded_base
+        self.requests = []
+        #: response bodies bytes sent since start / last reset
+        self.sent = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._failures = []
+        self._slow = []
+        self._httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.stub = self
+        #: api documents rendering, links to this server
+        self.documents = HalDocuments(self.url)
+        self._thread = None
+        self.stopped = False
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}/api'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='ols-stub', daemon=True)
+        self._thread.start()
+        logger.debug('Stub OLS started at %s', self.url)
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def record_request(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+    def record_sent(self, size):
+        with self._lock:
+            self.sent += size
+
+    def reset(self):
+        """ Clear request log and rendered responses cache (call after altering dataset) """
+        with self._lock:
+            self.requests = []
+            self.sent = 0
+            self._cache = {}
+
+    def fail(self, fragment, status=500, times=1):
+        """ Answer `status` error to the next `times` requests whose path contains fragment """
+        with self._lock:
+            self._failures.append([fragment, status, times])
+
+    def failure(self, path):
+        with self._lock:
+            for failure in self._failures:
+                if failure[0] in path and failure[2] > 0:
+                    failure[2] -= 1
+                    return failure[1]
+        return None
+
+    def slow(self, fragment, seconds, times=1):
+        """ Answer the next `times` requests whose path contains fragment `seconds` later """
+        with self._lock:
+            self._slow.append([fragment, seconds, times])
+
+    def slowness(self, path):
+        with self._lock:
+            for slow in self._slow:
+                if slow[0] in path and slow[2] > 0:
+                    slow[2] -= 1
+                    return slow[1]
+        return 0
+
+    def count(self, fragment=''):
+        """ Number of requests received whose path contains fragment """
+        with self._lock:
+            return len([path for path in self.requests if fragment in path])
+
+    def respond(self, raw_path):
+        cached = self._cache.get(raw_path)
+        if cached is None:
+            status, document = self.route(raw_path)
+            if status < 400:
+                content_type = 'application/json' if raw_path.startswith('/api/search') else 'application/hal+json'
+            else:
+                content_type = 'application/json'
+            if isinstance(document, (bytes, str)):
+                body = document.encode('utf-8') if isinstance(document, str) else document
+            else:
+                body = json.dumps(document, separators=(',', ':')).encode('utf-8')
+            cached = (status, body, content_type)
+            if status < 500:
+                self._cache[raw_path] = cached
+        return cached
+
+    # Routing
+
+    def route(self, raw_path):
+        parsed = urllib.parse.urlsplit(raw_path)
+        recorded = self.recorded.get(raw_path, self.recorded.get(parsed.path))
+        if recorded is not None:
+            return self._recorded(recorded)
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        segments = [s for s in parsed.path.split('/') if s]
+        if not segments or segments[0] != 'api':
+            return self.documents.error(404, parsed.path)
+        segments = segments[1:]
+        try:
+            if not segments:
+                return 200, self.documents.root()
+            if segments[0] == 'search':
+                return 200, self.search(params)
+            if segments[0] == 'ontologies':
+                if len(segments) == 1:
+                    return self.paged(parsed.path, 'ontologies',
+                                      [self.ontology_document(o) for o in self.dataset.ontologies], params)
+                ontology_id = segments[1]
+                if ontology_id not in self.dataset.ontologies:
+                    return self.documents.error(404, parsed.path)
+                if len(segments) == 2:
+                    return 200, self.ontology_document(ontology_id)
+                kind = segments[2]
+                items = self.dataset.items[kind][ontology_id]
+                if len(segments) == 3:
+                    return self.paged(parsed.path, kind,
+                                      [self.item_document(kind, i) for i in self.filtered(items.values(), params)],
+                                      params)
+                iri = urllib.parse.unquote(urllib.parse.unquote(segments[3]))
+                if iri not in items:
+                    return self.documents.error(404, parsed.path)
+                if len(segments) == 4:
+                    return 200, self.item_document(kind, items[iri])
+                related = self.dataset.relation(ontology_id, iri, segments[4])
+                return self.paged(parsed.path, kind, [self.item_document(kind, i) for i in related], params)
+            if segments[0] in KINDS:
+                kind = segments[0]
+                every = [i for items in self.dataset.items[kind].values() for i in items.values()]
+                if len(segments) > 1:
+                    params = {'iri': urllib.parse.unquote(urllib.parse.unquote(segments[1]))}
+                    every = list(self.filtered(every, params))
+                    if not every:
+                        return self.documents.error(404, parsed.path)
+                    return self.paged(parsed.path, kind, [self.item_document(kind, i) for i in every], params)
+                return self.paged(parsed.path, kind,
+                                  [self.item_document(kind, i) for i in self.filtered(every, params)], params)
+        except KeyError:
+            pass
+        return self.documents.error(404, parsed.path)
+
+    def _recorded(self, recorded):
+        status = 200
+        if isinstance(recorded, dict) and 'body' in recorded and 'status' in recorded:
+            status, recorded = recorded['status'], recorded['body']
+        body = recorded if isinstance(recorded, str) else json.dumps(recorded)
+        if self.recorded_base:
+            body = body.replace(self.recorded_base, self.url)
+        return status, body
+
+    @staticmethod
+    def filtered(items, params):
+        for key in ('iri', 'short_form', 'obo_id'):
+            if key in params:
+                return [item for item in items if item.get(key) == params[key]]
+        return items
+
+    def ontology_document(self, ontology_id):
+        return self.documents.ontology_document(self.dataset.ontologies[ontology_id])
+
+    def item_document(self, kind, item):
+        return self.documents.item_document(kind, item)
+
+    def paged(self, path, name, documents, params):
+        size, page = int(params.get('size', 20)), int(params.get('page', 0))
+        return self.documents.paged([s for s in path.split('/') if s][1:], name,
+                                    documents[page * size:(page + 1) * size], len(documents), params)
+
+    def search(self, params):
+        query = params.get('q', '').lower()
+        exact = params.get('exact') == 'true'
+        types = set(params.get('type', 'class,property,individual,ontology').split(','))
+        ontologies = set(params['ontology'].split(',')) if 'ontology' in params else None
+        obsoletes = params.get('obsoletes') == 'true'
+        fields = params['fieldList'].split(',') if 'fieldList' in params else None
+        slims = set(params['slim'].split(',')) if 'slim' in params else None
+        children_of = set(params['childrenOf'].split(',')) if 'childrenOf' in params else None
+        ranked = []
+        for doc_type, ontology_id, item in self.dataset.search_docs():
+            if doc_type not in types or (ontologies and ontology_id not in ontologies):
+                continue
+            if item.get('is_obsolete') and not obsoletes:
+                continue
+            if slims and not slims.intersection(item.get('in_subset') or []):
+                continue
+            if children_of and not children_of.intersection(
+                    a['iri'] for a in self.dataset.relation(ontology_id, item['iri'], 'ancestors')):
+                continue
+            names = [item['label'] or ''] + list(item.get('synonyms') or [])
+            values = [n.lower() for n in names] + [(item.get(k) or '').lower() for k in ('short_form', 'obo_id')]
+            if query == '*':
+                # solr match all
+                score = 1
+            elif exact:
+                score = 0 if query in values else None
+            elif query in values:
+                score = 0
+            elif any(v.startswith(query) for v in values):
+                score = 1
+            elif any(query in v for v in values):
+                score = 2
+            else:
+                score = None
+            if score is not None:
+                ranked.append((score, len(ranked), doc_type, ontology_id, item))
+        ranked.sort(key=lambda r: (r[0], r[1]))
+        rows = int(params.get('rows', 10))
+        start = int(params.get('start', 0))
+        docs = []
+        for _score, _rank, doc_type, ontology_id, item in ranked[start:start + rows]:
+            doc = OrderedDict([
+                ('id', '{}:{}:{}'.format(ontology_id, doc_type, item['iri'])),
+                ('iri', item['iri']),
+                ('short_form', item['short_form']),
+                ('obo_id', item['obo_id']),
+                ('label', item['label']),
+                ('description', item.get('description') or []),
+                ('ontology_name', ontology_id),
+                ('ontology_prefix', ontology_id.upper()),
+                ('type', doc_type),
+                ('is_defining_ontology', item.get('is_defining_ontology', True)),
+            ])
+            if fields:
+                doc = OrderedDict((k, v) for k, v in doc.items() if k in fields)
+            docs.append(doc)
+        return self.documents.search(docs, len(ranked), params)
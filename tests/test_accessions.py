@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api.accessions import AccessionIndex, accession_key
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.harvest import Harvester, JsonLinesSink
+from tests.ols_stub import OlsStubServer
+
+
+class AccessionIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=100).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OlsClient(base_site=self.server.url, page_size=25)
+
+    def test_lookups(self):
+        index = AccessionIndex.from_ontology(self.client.ontology('ont1'))
+        # imported ont0 root term is indexed too
+        self.assertEqual(len(index), 101)
+        self.server.reset()
+        iri = 'http://purl.obolibrary.org/obo/ONT1_0000012'
+        for identifier in (iri, 'ONT1:0000012', 'ONT1_0000012', ' ont1:0000012 '):
+            self.assertEqual(index[identifier].iri, iri)
+        record = index['ONT1:0000012']
+        self.assertEqual((record.label, record.ontology_name), (self.server.dataset.label(12), 'ont1'))
+        self.assertEqual(index['ONT1:ALT0000010'].obo_id, 'ONT1:0000010')
+        self.assertTrue(index.is_alternative('ONT1:ALT0000010'))
+        self.assertFalse(index.is_alternative('ONT1:0000010'))
+        self.assertTrue(index['ONT1:0000096'].is_obsolete)
+        self.assertEqual(index['ONT1:0000096'].term_replaced_by, 'http://purl.obolibrary.org/obo/ONT1_0000097')
+        self.assertIsNone(index.get('ONT1:9999999'))
+        self.assertNotIn('http://purl.obolibrary.org/obo/ont1_0000012', index)
+        with self.assertRaises(KeyError):
+            index['ONT2:0000001']
+        self.assertEqual(self.server.count(), 0)
+
+    def test_defining_ontology_preferred(self):
+        index = AccessionIndex()
+        imported = self.client.ontology('ont1').terms(filters={'obo_id': 'ONT0:0000000'})
+        for term in index.collect(imported):
+            self.assertFalse(term.is_defining_ontology)
+        self.assertEqual(index['ONT0:0000000'].ontology_name, 'ont1')
+        index.update(self.client.ontology('ont0').terms())
+        self.assertEqual(index['ONT0:0000000'].ontology_name, 'ont0')
+        index.update(imported)
+        self.assertEqual(index['ONT0:0000000'].ontology_name, 'ont0')
+        self.assertEqual(len(index), 100)
+
+    def test_replaced_record_keys(self):
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+        index = AccessionIndex([{'iri': iri, 'obo_id': 'OLD:0000000', 'short_form': 'OLD_0000000',
+                                 'ontology_name': 'ont1', 'is_defining_ontology': False}])
+        self.assertEqual(index['old_0000000'].ontology_name, 'ont1')
+        index.add({'iri': iri, 'obo_id': 'ONT0:0000000', 'short_form': 'ONT0_0000000', 'ontology_name': 'ont0',
+                   'is_defining_ontology': True})
+        index.add({'iri': iri, 'obo_id': 'OTHER:0000000', 'short_form': 'OTHER_0000000', 'ontology_name': 'ont2',
+                   'is_defining_ontology': False})
+        self.assertEqual(index['ONT0_0000000'].ontology_name, 'ont0')
+        self.assertEqual(index[iri].ontology_name, 'ont0')
+        for identifier in ('OLD:0000000', 'OLD_0000000', 'OTHER:0000000'):
+            self.assertIsNone(index.get(identifier))
+        self.assertEqual(len(index), 1)
+
+    def test_serialization(self):
+        index = AccessionIndex.from_ontology(self.client.ontology('ont0'))
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('index.json', 'index.json.gz'):
+                path = os.path.join(directory, name)
+                index.save(path)
+                loaded = AccessionIndex.load(path)
+                self.assertEqual(list(loaded), list(index))
+                self.assertEqual(loaded['ont0:alt0000005'], index['ONT0:0000005'])
+            harvest = os.path.join(directory, 'terms.jsonl')
+            with JsonLinesSink(harvest) as sink:
+                Harvester(base_site=self.server.url, page_size=25, processes=1).harvest(['ont0'], sink=sink)
+            self.assertEqual(list(AccessionIndex.from_harvest(harvest)), list(index))
+
+    def test_accession(self):
+        self.assertEqual(accession_key('GO:0008150'), accession_key('go_0008150'))
+        term = helpers.Term(iri='http://www.yeastgenome.org/cgi-bin/locus_S000001596', short_form=None)
+        self.assertEqual(term.accession, 'locus:S000001596')
+        self.assertIsNone(helpers.Term(iri='http://www.w3.org/2002/07/owl#Thing', short_form='Thing').accession)
+        self.assertEqual(helpers.Term(obo_id='GO:0008150').accession, 'GO:0008150')
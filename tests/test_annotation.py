@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.annotation import Annotator, SEARCHED
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.search_index import EXACT, PREFIX
+from tests.ols_stub import OlsStubServer, SyntheticDataset
+
+label = SyntheticDataset.label
+
+
+class AnnotatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=60).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.client = OlsClient(base_site=self.server.url, max_retry=1, retry_delay=0)
+
+    def test_annotate(self):
+        annotator = Annotator(self.client, workers=2, rows=5, ontology='ont1', type='class')
+        values = [label(12), ' %s! ' % label(12).upper(), label(7), 'unknown thing', '', None]
+        values += [label(index) for index in range(20, 50)]
+        annotations = list(annotator.annotate(values))
+        self.assertEqual(sorted(map(str, (a.input for a in annotations))), sorted(map(str, values)))
+        by_input = {a.input: a for a in annotations}
+        for value in values[:3]:
+            self.assertEqual(by_input[value].score, EXACT)
+            self.assertEqual(by_input[value].match.label, label(12 if value != label(7) else 7))
+            self.assertEqual(by_input[value].match.ontology_name, 'ont1')
+        self.assertIsNone(by_input['unknown thing'].match)
+        self.assertIsNone(by_input[''].match)
+        stats = annotator.stats
+        # the two spellings of label 12 share one search, empty values are not searched
+        self.assertEqual((stats.inputs, stats.queries, stats.cached, stats.errors), (36, 33, 1, 0))
+        self.assertEqual(self.server.count('/search'), 33)
+        self.assertEqual(stats.matched, 33)
+        self.assertGreater(stats.throughput, 0)
+        # cached across calls
+        self.assertEqual(list(annotator.annotate([label(7)]))[0].match.label, label(7))
+        self.assertEqual(self.server.count('/search'), 33)
+
+    def test_ranking(self):
+        annotator = Annotator(self.client, rows=10, ontology='ont0')
+        values = ['%s %s' % tuple(label(3).split()[:2]), label(3) + ' synonym']
+        prefix, synonym = sorted(annotator.annotate(values), key=lambda annotation: values.index(annotation.input))
+        self.assertEqual(prefix.score, PREFIX)
+        # search documents do not carry synonyms: the hit is OLS one
+        self.assertEqual((synonym.match.label, synonym.score), (label(3), SEARCHED))
+
+    def test_shared(self):
+        annotator = Annotator(self.client, workers=2, ontology='ont0')
+        values = [label(index % 20) for index in range(200)]
+        list(annotator.annotate(values[:20]))
+        # one annotator used by several threads, each one annotating its own values
+        with ThreadPoolExecutor(4) as executor:
+            annotated = list(executor.map(lambda start: list(annotator.annotate(values[start:start + 50])),
+                                          range(0, 200, 50)))
+        self.assertEqual(sum(len(annotations) for annotations in annotated), 200)
+        stats = annotator.stats
+        self.assertEqual((stats.inputs, stats.queries, stats.cached, stats.matched), (220, 20, 200, 220))
+
+    def test_errors(self):
+        annotator = Annotator(self.client)
+        self.server.fail('/search', status=500, times=1)
+        annotation, = annotator.annotate([label(3)])
+        self.assertIsNone(annotation.match)
+        self.assertIsNotNone(annotation.error)
+        self.assertEqual(annotator.stats.errors, 1)
+        # failed searches are not cached
+        annotation, = annotator.annotate([label(3)])
+        self.assertEqual(annotation.match.label, label(3))
+        with self.assertRaises(exceptions.BadFilters):
+            Annotator(self.client, rows=10, unknown='x')
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.backends import Backend, RestBackend, SqliteBackend
+from ebi.ols.api.transports import CassetteTransport
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.helpers import Term
+from tests.ols_stub import OlsStubServer, SyntheticDataset
+
+IRI = SyntheticDataset.iri
+
+
+class SqliteBackendTest(unittest.TestCase):
+    """ Same calls answered online (stub) and offline (snapshot of the stub, server stopped) """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'ols.sqlite')
+        with OlsStubServer(ontologies=2, terms=60) as server:
+            SqliteBackend.create(cls.path, RestBackend(server.url), page_size=25)
+            client = OlsClient(base_site=server.url, page_size=25)
+            cls.online = cls.calls(client)
+        cls.client = OlsClient(backend=SqliteBackend(cls.path), page_size=25)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    @staticmethod
+    def calls(client):
+        term = client.detail(ontology_name='ont0', iri=IRI('ont0', 9), type=Term)
+        return {
+            'ontologies': [o.ontology_id for o in client.ontologies()],
+            'terms': list(client.ontology('ont1').terms()),
+            'properties': [p.iri for p in client.ontology('ont0').properties()],
+            'global': len(client.terms()),
+            'detail': term,
+            'defining': client.term(IRI('ont0', 0)).ontology_name,
+            'parents': [t.iri for t in term.load_relation('parents')],
+            'ancestors': sorted(t.iri for t in term.load_relation('ancestors')),
+            'children': [t.iri for t in term.load_relation('children')],
+            'descendants': sorted(t.iri for t in term.load_relation('hierarchicalDescendants')),
+            'search': [h.iri for h in client.search('cell', filters={'ontology': 'ont0', 'type': 'class'})],
+            'exact': [h.iri for h in client.search('positive cell 1', filters={'exact': 'true'})],
+            'obsoletes': len(client.search('96', filters={'obsoletes': 'true', 'ontology': 'ont1'})),
+            'slim': len(client.search('cell', filters={'slim': 'slim_a'})),
+            'children_of': sorted(h.iri for h in client.search('*', filters={'childrenOf': IRI('ont0', 1)})),
+        }
+
+    def test_offline(self):
+        offline = self.calls(self.client)
+        for name, value in self.online.items():
+            self.assertEqual(offline[name], value, name)
+        self.assertEqual(self.online['global'], 121)
+        self.assertEqual(len(self.online['descendants']), 6)
+        self.assertEqual(self.online['exact'], [IRI('ont0', 1), IRI('ont1', 1)])
+
+    def test_not_found(self):
+        with self.assertRaises(exceptions.NotFoundException):
+            self.client.ontology('unknown')
+        with self.assertRaises(exceptions.NotFoundException):
+            self.client.detail(ontology_name='ont0', iri=IRI('ont0', 1000), type=Term)
+        backend = self.client.config.backend
+        self.assertIsNone(backend.related('ont0', IRI('ont0', 1000), 'parents'))
+        self.assertIsNone(backend.related('ont0', IRI('ont0', 1), 'unknown'))
+
+    def test_stream(self):
+        client = OlsClient(backend=SqliteBackend(self.path), page_size=25, stream=True)
+        self.assertEqual(list(client.ontology('ont1').terms()), self.online['terms'])
+
+    def test_no_relations(self):
+        path = os.path.join(self.directory.name, 'terms.sqlite')
+        with OlsStubServer(ontologies=1, terms=30) as server:
+            backend = SqliteBackend.create(path, RestBackend(server.url), ontologies=['ont0'], kinds=('terms',),
+                                           relations=())
+            # ontology, then one terms page, no call per term
+            self.assertEqual(server.count(), 2)
+        self.assertEqual(backend.relations, [])
+        self.assertIsNone(backend.related('ont0', IRI('ont0', 1), 'parents'))
+        self.assertEqual(backend.items('properties', 'ont0'), ([], 0))
+        with self.assertRaises(exceptions.BadParameter):
+            SqliteBackend.create(path, RestBackend(server.url), relations=('children',))
+
+    def test_settings(self):
+        with self.assertRaises(exceptions.BadParameter):
+            OlsClient(backend=SqliteBackend(self.path), transport=CassetteTransport(self.path + '.json'))
+        # snapshot answers whatever the site, nothing outside it
+        client = OlsClient(backend=SqliteBackend(self.path), base_site='http://offline.local/ols/api')
+        self.assertEqual(client.ontology('ont0').ontology_id, 'ont0')
+        self.assertIsNone(client.transport)
+        with self.assertRaises(exceptions.NotFoundException):
+            client.config.backend.detail('http://elsewhere.local/api/ontologies')
+        # backends implement every primitive
+        with self.assertRaises(TypeError):
+            type('PartialBackend', (Backend,), {'ontologies': lambda self, page=0, size=20: ([], 0)})()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -484,10 +484,16 @@ class OntologyTestBasic(unittest.TestCase):
                 BfoClientMixin.count_call = BfoClientMixin.count_call + 1
                 return super().fetch_document(path, params, filters, base_document)
 
+            def fetch_page(self, page):
+                BfoClientMixin.count_call = BfoClientMixin.count_call + 1
+                return super().fetch_page(page)
+
         terms_list_client = BfoClientMixin('/'.join(['https://www.ebi.ac.uk/ols/api', 'ontologies', 'pr']),
                                            helpers.Term,
                                            page_size=100)
         terms = terms_list_client()
         for term in terms[220:520]:
             logger.info("Current term: %s", term)
-        self.assertEqual(terms_list_client.count_call, 4)
+        # one request per page, as before: list first page, then slice pages 2 to 5 (page 2 used to be fetched
+        # through fetch_page, uncounted, and pages 3 to 5 by following next links with fetch_document)
+        self.assertEqual(terms_list_client.count_call, 5)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api.client import OlsClient
+from tests.ols_stub import OlsStubServer
+
+
+class OntologyCatalogueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OlsStubServer(ontologies=5, terms=10).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_served_from_catalogue(self):
+        client = OlsClient(base_site=self.server.url, page_size=2, catalogue=True)
+        self.assertEqual(self.server.count(), 0)
+        ontology = client.ontology('ont3')
+        self.assertIsInstance(ontology.config, helpers.OntologyConfig)
+        self.assertEqual((ontology.ontology_id, ontology.title), ('ont3', 'Synthetic ontology ont3'))
+        calls = self.server.count()
+        # api root and 3 catalogue pages
+        self.assertEqual(calls, 4)
+        for ontology_id in ['ont0', 'ont1', 'ont2', 'ont3', 'ont4'] * 100:
+            self.assertEqual(client.ontology(ontology_id).ontology_id, ontology_id)
+        self.assertIs(client.ontology('ont3'), ontology)
+        self.assertEqual(self.server.count(), calls)
+        with self.assertRaises(exceptions.NotFoundException):
+            client.ontology('unknown')
+        self.assertEqual(len(client.catalogue), 5)
+        # projections are built from catalogue entries too
+        projected = client.ontology('ont3', fields=['ontology_id', 'config'])
+        self.assertEqual((projected.ontology_id, projected.config.title), ('ont3', ontology.config.title))
+        self.assertNotIn('updated', vars(projected))
+        self.assertIs(client.ontology('ont3'), ontology)
+        self.assertEqual(self.server.count(), calls)
+        # helpers still query their own items
+        self.assertEqual(len(ontology.terms()), 11)
+
+    def test_version_refresh(self):
+        client = OlsClient(base_site=self.server.url, page_size=10, catalogue=True)
+        ont0, ont1 = client.ontology('ont0'), client.ontology('ont1')
+        self.assertIsNone(client.catalogue.refresh())
+        self.assertEqual(client.catalogue.refresh(force=True), [])
+        self.server.dataset.ontologies['ont1']['updated'] = '2021-01-01T00:00:00.000+0000'
+        self.server.dataset.ontologies['ont1']['config']['version'] = '2.0.0'
+        del self.server.dataset.ontologies['ont4']
+        self.server.reset()
+        client.catalogue.max_age = 0
+        self.assertEqual(client.ontology('ont1').version, '2.0.0')
+        self.assertIs(client.ontology('ont0'), ont0)
+        self.assertIsNot(client.ontology('ont1'), ont1)
+        client.catalogue.max_age = None
+        self.assertNotIn('ont4', client.catalogue)
+        self.assertEqual([o.ontology_id for o in client.catalogue.ontologies()], ['ont0', 'ont1', 'ont2', 'ont3'])
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalogue.json')
+            first = OlsClient(base_site=self.server.url, catalogue=path).ontology('ont2')
+            self.assertTrue(os.path.exists(path))
+            self.server.reset()
+            second = OlsClient(base_site=self.server.url, catalogue=path).ontology('ont2')
+            self.assertEqual(self.server.count(), 0)
+            self.assertEqual(second, first)
+            # catalogues are bound to their site
+            OlsClient(base_site=self.server.url + '/', catalogue=path).ontology('ont2')
+            self.assertGreater(self.server.count(), 0)
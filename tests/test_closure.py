@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.closure import Closure, numpy
+from tests.ols_stub import OlsStubServer, SyntheticDataset
+
+IRI = SyntheticDataset.iri
+
+
+def _check(closure, pairs):
+    return [bool(value) for value in closure.is_a(*zip(*pairs))]
+
+
+class ClosureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=63).start()
+        client = OlsClient(base_site=cls.server.url, page_size=20)
+        cls.closure = Closure.from_ontology(client.ontology('ont1'), workers=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def ids(self, *indexes):
+        return [self.closure.id(IRI('ont1', index)) for index in indexes]
+
+    def test_is_a(self):
+        # binary tree: 62 -> 30 -> 14 -> 6 -> 2 -> 0
+        self.assertEqual(len(self.closure), 64)
+        terms = self.ids(62, 62, 62, 30, 2, 0, 7)
+        ancestors = self.ids(30, 2, 62, 62, 1, 0, 2)
+        self.assertEqual([bool(value) for value in self.closure.is_a(terms, ancestors)],
+                         [True, True, True, False, False, True, False])
+        self.assertTrue(self.closure.is_a(self.ids(62)[0], self.ids(0)[0]))
+        unknown = self.closure.ids(['http://unknown.org/term'])[0]
+        self.assertFalse(self.closure.is_a(unknown, self.ids(0)[0]))
+        # imported ont0 root is a root of its own
+        self.assertFalse(self.closure.is_a(self.closure.id(IRI('ont0', 0)), self.ids(0)[0]))
+
+    def test_ancestors_lca(self):
+        term, = self.ids(62)
+        self.assertEqual(sorted(self.closure.iri(int(ancestor)) for ancestor in self.closure.ancestors(term)),
+                         sorted(IRI('ont1', index) for index in (30, 14, 6, 2, 0)))
+        self.assertEqual(len(self.closure.ancestors(term, include_self=True)), 6)
+        self.assertEqual([int(term) for term in self.closure.lca(self.ids(61, 62, 62, 33), self.ids(62, 45, 30, 33))],
+                         self.ids(30, 0, 30, 33))
+        self.assertEqual(self.closure.lca(self.ids(1)[0], self.closure.id(IRI('ont0', 0))), -1)
+
+    def test_persistence(self):
+        path = os.path.join(self.directory.name, 'ont1.closure')
+        self.closure.save(path)
+        loaded = Closure.load(path)
+        self.assertEqual(loaded.iris, self.closure.iris)
+        pairs = [(a, b) for a in range(0, 64, 3) for b in range(0, 64, 5)]
+        self.assertEqual(_check(loaded, pairs), _check(self.closure, pairs))
+        # worker processes map the same file
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            self.assertEqual(pool.apply(_check, (loaded, pairs)), _check(self.closure, pairs))
+        with open(path, 'r+b') as f:
+            f.write(b'XXXX')
+        with self.assertRaises(exceptions.BadParameter):
+            Closure.load(path)
+
+    def test_build(self):
+        closure = Closure.build({'c': ['a', 'b'], 'd': ['c'], 'b': ['a']})
+        self.assertEqual(closure.iris, ['a', 'b', 'c', 'd'])
+        self.assertEqual(closure.lca(3, 1), 1)
+        self.assertEqual(list(closure.depths), [0, 1, 2, 3])
+        with self.assertRaises(exceptions.BadParameter):
+            Closure.build([('a', ['b']), ('b', ['a'])])
+
+    @unittest.skipIf(numpy() is None, 'numpy is not installed')
+    def test_vectorized(self):
+        np = numpy()
+        result = self.closure.is_a(np.array(self.ids(62, 30)), np.array(self.ids(0, 62)))
+        self.assertIsInstance(result, np.ndarray)
+        self.assertEqual(result.tolist(), [True, False])
+        # every pair at once, unknown terms included, as computed pair by pair
+        terms = list(range(-1, len(self.closure)))
+        first, second = [a for a in terms for _ in terms], [b for _ in terms for b in terms]
+        lowest = self.closure.lca(np.array(first), np.array(second))
+        self.assertIsInstance(lowest, np.ndarray)
+        with mock.patch('ebi.ols.api.closure.numpy', lambda: None):
+            self.assertEqual(lowest.tolist(), self.closure.lca(first, second))
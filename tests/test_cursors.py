@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import ebi.ols.api.exceptions as exceptions
+from ebi.ols.api.base import Cursor, ListClientMixin, Shard
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.helpers import Term
+from tests.ols_stub import OlsStubServer
+
+
+def shard_iris(shard):
+    return [item.iri for item in shard]
+
+
+class CursorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=250).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OlsClient(base_site=self.server.url, page_size=20, max_retry=1, retry_delay=0)
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, 'cursor.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_list_resume(self):
+        terms = self.client.ontology('ont1').terms()
+        expected = [t.iri for t in terms]
+        iterator = iter(terms)
+        first = [next(iterator).iri for _ in range(127)]
+        cursor = iterator.cursor()
+        self.assertEqual((cursor.index, cursor.page, cursor.offset), (127, 6, 7))
+        restored = Cursor.from_dict(pickle.loads(pickle.dumps(cursor)).to_dict())
+        self.assertEqual(restored, cursor)
+        self.server.reset()
+        resumed = OlsClient(base_site=self.server.url).resume(restored)
+        self.assertEqual(first + [t.iri for t in resumed], expected)
+        # no page before cursor one was fetched again
+        self.assertEqual(self.server.count('page=0'), 0)
+        self.assertEqual(self.server.count('/terms?'), 13 - 6)
+
+    def test_checkpoint_on_error(self):
+        terms = self.client.ontology('ont0').terms()
+        self.server.fail('page=5', status=503)
+        harvested = []
+        with self.assertRaises(exceptions.ObjectNotRetrievedError):
+            for term in terms.iterate(checkpoint=self.checkpoint):
+                harvested.append(term.iri)
+        self.assertEqual(len(harvested), 100)
+        cursor = Cursor.load(self.checkpoint)
+        self.assertEqual(cursor.index, 100)
+        harvested += [term.iri for term in self.client.resume(self.checkpoint).iterate(checkpoint=self.checkpoint)]
+        self.assertEqual(harvested, [t.iri for t in terms])
+        self.assertEqual(Cursor.load(self.checkpoint).index, len(terms))
+
+    def test_relation_resume(self):
+        root = self.client.detail(ontology_name='ont0', iri='http://purl.obolibrary.org/obo/ONT0_0000000',
+                                  type=Term)
+        descendants = root.load_relation('descendants')
+        expected = [t.iri for t in descendants]
+        self.server.fail('/descendants?page=5', status=503)
+        harvested = []
+        with self.assertRaises(exceptions.ObjectNotRetrievedError):
+            for term in descendants.iterate(checkpoint=self.checkpoint):
+                harvested.append(term.iri)
+        self.assertEqual(len(harvested), 100)
+        cursor = Cursor.load(self.checkpoint)
+        self.assertEqual(cursor.href, '{}/ontologies/ont0/terms/{}/descendants'.format(
+            self.server.url, ListClientMixin.make_uri(root.iri)))
+        # resumed on the relation pages, from another client
+        self.server.reset()
+        harvested += [t.iri for t in OlsClient(base_site=self.server.url).resume(self.checkpoint)]
+        self.assertEqual(harvested, expected)
+        self.assertEqual(self.server.count('/descendants?'), 13 - 5)
+        self.assertEqual(self.server.count('/terms?'), 0)
+
+    def test_filtered_search_resume(self):
+        results = self.client.search(query='cell', type={'class'}, ontology='ont0')
+        expected = [r.iri for r in results]
+        self.assertGreater(len(expected), 45)
+        iterator = iter(results)
+        for _ in range(45):
+            next(iterator)
+        self.client.resume(iterator.cursor()).cursor().save(self.checkpoint)
+        cursor = Cursor.load(self.checkpoint)
+        self.assertEqual((cursor.kind, cursor.query, cursor.filters['type']), ('search', 'cell', {'class'}))
+        self.server.reset()
+        self.assertEqual([r.iri for r in self.client.resume(cursor)], expected[45:])
+        self.assertEqual(self.server.count('start=0'), 0)
+
+
+class ShardTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=250).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OlsClient(base_site=self.server.url, page_size=20)
+
+    def test_list_shards(self):
+        terms = self.client.ontology('ont1').terms()
+        shards = [terms.shard(i, 4) for i in range(4)]
+        self.assertEqual([(s.first_page, s.last_page) for s in shards], [(0, 3), (3, 6), (6, 9), (9, 13)])
+        self.assertEqual(sum(len(s) for s in shards), len(terms))
+        self.server.reset()
+        self.assertEqual(len(list(shards[1])), 60)
+        self.assertEqual(self.server.count('/terms?'), 3)
+        # shipped to other processes, each one fetching its own pages
+        with ProcessPoolExecutor(2) as executor:
+            sharded = list(executor.map(shard_iris, [pickle.loads(pickle.dumps(s)) for s in shards]))
+        self.assertEqual([iri for iris in sharded for iri in iris], [t.iri for t in terms])
+        with self.assertRaises(exceptions.BadParameter):
+            terms.shard(4, 4)
+
+    def test_relation_shards(self):
+        root = self.client.detail(ontology_name='ont1', iri='http://purl.obolibrary.org/obo/ONT1_0000000',
+                                  type=Term)
+        descendants = root.load_relation('descendants')
+        expected = [t.iri for t in descendants]
+        shards = [pickle.loads(pickle.dumps(descendants.shard(i, 3))) for i in range(3)]
+        self.assertEqual([len(s) for s in shards], [80, 80, 89])
+        self.server.reset()
+        with ProcessPoolExecutor(2) as executor:
+            sharded = list(executor.map(shard_iris, shards))
+        self.assertEqual([iri for iris in sharded for iri in iris], expected)
+        self.assertEqual(self.server.count('/descendants?'), 13)
+        self.assertEqual(self.server.count('/terms?'), 0)
+
+    def test_search_shards(self):
+        results = self.client.search(query='cell', ontology='ont0,ont1')
+        shards = [pickle.loads(pickle.dumps(results.shard(i, 3))) for i in range(3)]
+        self.assertIsInstance(shards[0], Shard)
+        self.assertEqual([r.iri for s in shards for r in s], [r.iri for r in results])
+        # more shards than pages: extra ones are empty
+        properties = self.client.ontology('ont0').properties()
+        empty, full = properties.shard(0, 2), properties.shard(1, 2)
+        self.assertEqual((len(empty), list(empty)), (0, []))
+        self.assertEqual(list(full), list(properties))
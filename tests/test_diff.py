@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.diff import Snapshot, diff_ontology, fingerprint, ADDED, CHANGED, OBSOLETED, RELABELLED, REMOVED
+from ebi.ols.api.helpers import as_record
+from tests.ols_stub import OlsStubServer, SyntheticDataset
+
+IRI = SyntheticDataset.iri
+
+
+class DiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OlsStubServer(ontologies=1, terms=60).start()
+        self.client = OlsClient(base_site=self.server.url, page_size=25)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ont0.snapshot.json.gz')
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def changes(self, **kwargs):
+        return sorted((change.kind, change.iri) for change in
+                      diff_ontology(self.client.ontology('ont0'), self.path, **kwargs))
+
+    def new_version(self):
+        dataset = self.server.dataset
+        terms = dataset.items['terms']['ont0']
+        terms[IRI('ont0', 5)]['label'] = 'renamed 5'
+        terms[IRI('ont0', 7)].update(is_obsolete=True, term_replaced_by=IRI('ont0', 8))
+        terms[IRI('ont0', 9)]['description'] = ['New definition']
+        del terms[IRI('ont0', 59)]
+        dataset.add_term('ont0', 60)
+        dataset.ontologies['ont0']['config']['version'] = '2.0.0'
+        self.server.reset()
+
+    def test_versions(self):
+        self.assertEqual(len(self.changes()), 60)
+        self.assertTrue(os.path.exists(self.path))
+        # same version: terms are not even listed
+        self.server.reset()
+        self.assertEqual(self.changes(), [])
+        self.assertEqual(self.server.count('/terms'), 0)
+        self.new_version()
+        self.assertEqual(self.changes(), sorted([
+            (RELABELLED, IRI('ont0', 5)), (OBSOLETED, IRI('ont0', 7)), (CHANGED, IRI('ont0', 9)),
+            (REMOVED, IRI('ont0', 59)), (ADDED, IRI('ont0', 60))]))
+        snapshot = Snapshot.load(self.path)
+        self.assertEqual((snapshot.ontology_version, len(snapshot)), ('2.0.0', 60))
+        self.assertEqual(snapshot.terms[IRI('ont0', 7)].term_replaced_by, IRI('ont0', 8))
+        self.assertEqual(self.changes(force=True), [])
+
+    def test_changes_values(self):
+        terms = list(self.client.ontology('ont0').terms())
+        snapshot = Snapshot.from_terms(terms)
+        self.new_version()
+        changes = {change.iri: change for change in snapshot.diff(self.client.ontology('ont0').terms())}
+        relabelled = changes[IRI('ont0', 5)]
+        self.assertEqual((relabelled.old.label, relabelled.new.label),
+                         (self.server.dataset.label(5), 'renamed 5'))
+        self.assertIsNone(changes[IRI('ont0', 59)].new)
+        self.assertIsNone(changes[IRI('ont0', 60)].old)
+
+    def test_fingerprint(self):
+        term = next(iter(self.client.ontology('ont0').terms()))
+        expected = fingerprint(term)
+        term.accession
+        # helpers and harvest records give the same fingerprint, lazily cached values are ignored
+        self.assertEqual(fingerprint(term), expected)
+        self.assertEqual(fingerprint(as_record(term)), expected)
+        record = as_record(term)
+        record['synonyms'] = ['other']
+        self.assertNotEqual(fingerprint(record).digest, expected.digest)
+        with self.assertRaises(exceptions.BadParameter):
+            Snapshot.from_dict({'version': 0})
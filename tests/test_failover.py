@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.transports import CassetteTransport, FailoverTransport
+from tests.ols_stub import OlsStubServer
+
+
+class FailoverTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = OlsStubServer(ontologies=2, terms=60).start()
+        self.mirror = OlsStubServer(ontologies=2, terms=60, latency=0.02).start()
+        self.stopped = []
+
+    def tearDown(self):
+        for server in (self.primary, self.mirror):
+            if server not in self.stopped:
+                server.stop()
+
+    def stop(self, server):
+        server.stop()
+        self.stopped.append(server)
+
+    def new_client(self, **kwargs):
+        return OlsClient(base_site=[self.primary.url, self.mirror.url], page_size=10, retry_delay=0, **kwargs)
+
+    def test_fastest_endpoint(self):
+        client = self.new_client()
+        self.assertIsInstance(client.transport, FailoverTransport)
+        self.assertEqual(client.site, self.primary.url)
+        for index in range(20):
+            client.term('http://purl.obolibrary.org/obo/ONT0_%07d' % index)
+        primary, mirror = client.transport.stats()
+        self.assertEqual((primary.site, mirror.site), (self.primary.url, self.mirror.url))
+        # mirror is measured once, then left aside as slower
+        self.assertEqual(mirror.requests, 1)
+        self.assertEqual(primary.requests, 19)
+        self.assertLess(primary.latency, mirror.latency)
+        self.assertTrue(primary.healthy and mirror.healthy)
+
+    def test_failover_while_iterating(self):
+        client = self.new_client()
+        expected = [term.iri for term in self.new_client().ontology('ont1').terms()]
+        terms = []
+        for terms_count, term in enumerate(client.ontology('ont1').terms(), 1):
+            terms.append(term.iri)
+            if terms_count == 25:
+                # next pages links point to primary, which is gone
+                self.stop(self.primary)
+        self.assertEqual(terms, expected)
+        primary, mirror = client.transport.stats()
+        self.assertFalse(primary.healthy)
+        self.assertEqual(primary.failures, 1)
+        self.assertIsNotNone(primary.last_error)
+        self.assertGreater(self.mirror.count('/terms'), 2)
+
+    def test_server_errors(self):
+        client = self.new_client()
+        self.primary.fail('ONT0_0000002', status=503)
+        self.assertEqual(client.term('http://purl.obolibrary.org/obo/ONT0_0000002').label,
+                         self.primary.dataset.label(2))
+        primary, mirror = client.transport.stats()
+        self.assertEqual((primary.failures, primary.last_error, primary.healthy), (1, 'HTTP 503', False))
+        self.assertEqual((mirror.requests, mirror.failures), (1, 0))
+        # primary is back after a successful health check
+        self.assertTrue(client.transport.check()[0].healthy)
+        # not found is an answer, not a failure
+        with self.assertRaises(exceptions.NotFoundException):
+            client.term('http://purl.obolibrary.org/obo/ONT0_9999999')
+        self.assertEqual(sum(stats.failures for stats in client.transport.stats()), 1)
+
+    def test_all_down(self):
+        client = self.new_client(max_retry=2)
+        self.stop(self.primary)
+        self.stop(self.mirror)
+        with self.assertRaises(exceptions.ObjectNotRetrievedError):
+            client.term('http://purl.obolibrary.org/obo/ONT0_0000001')
+        self.assertEqual([stats.failures for stats in client.transport.stats()], [2, 2])
+
+    def test_all_errors(self):
+        client = self.new_client(max_retry=1)
+        adapter = client.transport._session.get_adapter(self.primary.url)
+        responses = []
+
+        def send(request, **kwargs):
+            responses.append(send.origin(request, **kwargs))
+            return responses[-1]
+
+        send.origin, adapter.adapter.send = adapter.adapter.send, send
+        self.primary.fail('ONT0_0000001', status=500)
+        self.mirror.fail('ONT0_0000001', status=503)
+        with self.assertRaises(exceptions.ObjectNotRetrievedError):
+            client.term('http://purl.obolibrary.org/obo/ONT0_0000001')
+        self.assertEqual([r.status_code for r in responses], [500, 503])
+        # first error answer connection is released, last one is returned (and read) to the client
+        self.assertTrue(responses[0].raw.closed)
+        self.assertTrue(responses[1]._content_consumed)
+        self.assertEqual([stats.failures for stats in client.transport.stats()], [1, 1])
+
+    def test_health_check(self):
+        transport = FailoverTransport([self.primary.url, self.mirror.url])
+        self.stop(self.mirror)
+        primary, mirror = transport.check()
+        self.assertTrue(primary.healthy)
+        self.assertIsNotNone(primary.latency)
+        self.assertFalse(mirror.healthy)
+        self.assertIsNone(mirror.latency)
+        self.assertIsNone(transport.match('http://other.org/api/terms'))
+        self.assertEqual(transport.route()[0].site, self.primary.url)
+
+    def test_invalid(self):
+        with self.assertRaises(exceptions.BadParameter):
+            FailoverTransport([])
+        with self.assertRaises(exceptions.BadParameter):
+            OlsClient(base_site=[self.primary.url], transport=CassetteTransport(None, mode='record'))
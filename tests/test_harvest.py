@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.harvest import Harvester, HarvestTask, main
+from tests.ols_stub import OlsStubServer
+
+
+class HarvesterTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=3, terms=230).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def expected(self, kind='terms'):
+        client = OlsClient(base_site=self.server.url, page_size=100)
+        return sorted(item.iri for ontology in client.ontologies() for item in getattr(ontology, kind)())
+
+    def test_tasks(self):
+        harvester = Harvester(base_site=self.server.url, page_size=20, pages_per_task=5, processes=1)
+        tasks = harvester.tasks(['ont1', 'unknown'])
+        self.assertEqual([(t.first_page, t.last_page) for t in tasks], [(0, 5), (5, 10), (10, None)])
+        self.assertTrue(all(t.ontology_id == 'ont1' for t in tasks))
+
+    def test_harvest_process_pool(self):
+        harvester = Harvester(base_site=self.server.url, page_size=20, pages_per_task=3, processes=3,
+                              kinds=('terms', 'properties'))
+        progress = []
+        items = harvester.harvest(progress=progress.append)
+        self.assertEqual(sorted(i.iri for i in items if isinstance(i, helpers.Term)), self.expected())
+        self.assertEqual(sorted(i.iri for i in items if isinstance(i, helpers.Property)), self.expected('properties'))
+        self.assertEqual([p.done for p in progress], list(range(1, progress[-1].total + 1)))
+        self.assertEqual(progress[-1].items, len(items))
+        self.assertIsInstance(progress[0].task, HarvestTask)
+        # helpers built in workers are still usable for further calls
+        term = next(i for i in items if isinstance(i, helpers.Term) and i.obo_id == 'ONT0:0000005')
+        self.assertEqual(len(term.load_relation('parents')), 1)
+
+    def test_console(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'terms.jsonl')
+            self.assertEqual(main(['ont0', 'ont2', '--site', self.server.url, '--processes', '2', '--page-size', '50',
+                                   '--pages-per-task', '1', '--output', output, '--quiet']), 0)
+            with open(output, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), len(set((r['ontology_name'], r['iri']) for r in records)))
+        self.assertEqual({r['ontology_name'] for r in records}, {'ont0', 'ont2'})
+        self.assertEqual(len(records), 230 + 231)
+        self.assertIn('annotation', records[0])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import time
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.transports import HedgingTransport
+from tests.ols_stub import OlsStubServer
+
+IRI = 'http://purl.obolibrary.org/obo/ONT0_%07d'
+
+
+class HedgingTransportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=1, terms=100).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+
+    def new_client(self, **kwargs):
+        kwargs.setdefault('min_samples', 10)
+        # stand-in server answers in a few ms, injected slow answers take far longer than this delay: only those
+        # are hedged, even on a loaded machine
+        kwargs.setdefault('min_delay', 0.25)
+        return OlsClient(base_site=self.server.url, page_size=20, transport=HedgingTransport(**kwargs))
+
+    def warm_up(self, client):
+        for index in range(20):
+            client.term(IRI % index)
+
+    def test_hedge_wins(self):
+        client = self.new_client(budget=0.5)
+        self.warm_up(client)
+        self.assertIsNotNone(client.transport.stats().delay)
+        self.server.slow('ONT0_0000050', 2)
+        start = time.perf_counter()
+        self.assertEqual(client.term(IRI % 50).label, self.server.dataset.label(50))
+        self.assertLess(time.perf_counter() - start, 1)
+        stats = client.transport.stats()
+        self.assertEqual((stats.hedged, stats.won, stats.denied), (1, 1, 0))
+        self.assertEqual(stats.requests, 21)
+        self.assertEqual(self.server.count('ONT0_0000050'), 2)
+
+    def test_list_pages(self):
+        client = self.new_client(budget=0.5)
+        self.warm_up(client)
+        self.server.slow('page=2', 2)
+        start = time.perf_counter()
+        terms = list(client.ontology('ont0').terms())
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertEqual(len(terms), 100)
+        stats = client.transport.stats()
+        self.assertEqual((stats.hedged, stats.won, stats.denied), (1, 1, 0))
+        self.assertEqual(self.server.count('page=2'), 2)
+
+    def test_budget(self):
+        # no hedge credit earned yet
+        client = self.new_client(budget=0.01)
+        self.warm_up(client)
+        self.server.slow('ONT0_0000050', 0.6)
+        client.term(IRI % 50)
+        stats = client.transport.stats()
+        self.assertEqual((stats.hedged, stats.won, stats.denied), (0, 0, 1))
+        self.assertEqual(self.server.count('ONT0_0000050'), 1)
+
+    def test_no_hedge_before_samples(self):
+        client = self.new_client(min_samples=100)
+        self.server.slow('ONT0_0000001', 0.5)
+        client.term(IRI % 1)
+        self.assertIsNone(client.transport.stats().delay)
+        self.assertEqual(client.transport.stats().hedged, 0)
+        with self.assertRaises(exceptions.NotFoundException):
+            client.term(IRI % 999)
+
+    def test_invalid(self):
+        with self.assertRaises(exceptions.BadParameter):
+            HedgingTransport(percentile=1.5)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import gc
+import multiprocessing
+import tracemalloc
+import unittest
+import urllib.parse
+
+from ebi.ols.api.client import OlsClient
+from tests.ols_stub import OlsStubServer
+
+PAGE_SIZE = 20
+PAGES = 100
+
+
+def peaks(url, **kwargs):
+    """
+    Traced memory (current, peak) after the first pages, then at the end of the iteration. Interpreter caches are
+    emptied page after page, they are not client memory: urllib keeps the last 128 parsed urls, and up to 2000 freed
+    tuples per size stay allocated until a full collection
+    """
+    terms = OlsClient(base_site=url, page_size=PAGE_SIZE, **kwargs).ontology('ont0').terms()
+    assert terms.pages == PAGES
+    gc.collect()
+    tracemalloc.start()
+    try:
+        early, count = None, 0
+        for count, term in enumerate(terms, 1):
+            if count % PAGE_SIZE == 0:
+                urllib.parse.clear_cache()
+                gc.collect()
+            if count == PAGE_SIZE * 10:
+                early = tracemalloc.get_traced_memory()
+        final = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count == PAGE_SIZE * PAGES
+    return early, final
+
+
+class MemoryTest(unittest.TestCase):
+    """
+    Iteration memory use. Lists are walked in a new process, where only client allocations are traced (not the
+    stand-in server ones, nor background threads left by other tests)
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=1, terms=PAGE_SIZE * PAGES, annotation_size=5).start()
+        cls.pool = multiprocessing.get_context('spawn').Pool(1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.terminate()
+        cls.pool.join()
+        cls.server.stop()
+
+    def peaks(self, **kwargs):
+        return self.pool.apply(peaks, (self.server.url,), kwargs)
+
+    def assertFlat(self, early, final):
+        (early_current, early_peak), (final_current, final_peak) = early, final
+        # neither retained memory nor peak usage grow with the 90 more pages walked (retaining pages would add megabytes)
+        self.assertLess(final_current - early_current, 128 * 1024)
+        self.assertLess(final_peak, early_peak * 1.5)
+
+    def test_pages_released(self):
+        self.assertFlat(*self.peaks())
+
+    def test_streamed_pages_released(self):
+        self.assertFlat(*self.peaks(stream=True))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import time
+import unittest
+
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.resolver import CurieResolver, ERROR, FOUND, INVALID, NOT_FOUND
+from tests.ols_stub import OlsStubServer
+
+ROOT = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+
+
+class CurieResolverTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=3, terms=50).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OlsClient(base_site=self.server.url, page_size=20, max_retry=1, retry_delay=0)
+        self.server.reset()
+
+    def test_resolve(self):
+        identifiers = ['ONT1:0000003', ' ONT1:0000003', 'ONT1_0000003', 'http://purl.obolibrary.org/obo/ONT2_0000007',
+                       'ONT0:0000000', 'ONT1:9999999', '', 'Thing', None] + ['ONT2:{:07d}'.format(i) for i in range(40)]
+        resolutions = list(CurieResolver(self.client, workers=4).resolve(identifiers))
+        self.assertEqual([r.identifier for r in resolutions], identifiers)
+        self.assertEqual([r.status for r in resolutions[:9]], [FOUND] * 5 + [NOT_FOUND] + [INVALID] * 3)
+        self.assertTrue(all(r.status == FOUND for r in resolutions[9:]))
+        self.assertEqual({r.term.iri for r in resolutions[:3]}, {'http://purl.obolibrary.org/obo/ONT1_0000003'})
+        self.assertEqual(resolutions[3].term.obo_id, 'ONT2:0000007')
+        # imported in every ontology, defined in ont0
+        root = resolutions[4]
+        self.assertEqual((root.term.ontology_name, len(root.terms)), ('ont0', 3))
+        # the three spellings of ONT1:0000003 share one call
+        self.assertEqual(self.server.count('/api/terms?'), 1 + 1 + 1 + 1 + 40)
+
+    def test_cache(self):
+        resolver = self.client.resolver
+        self.assertIs(resolver, self.client.resolver)
+        self.assertEqual(resolver.resolve_one('ONT0:0000001').status, FOUND)
+        self.assertEqual(resolver.resolve_one('ONT0:7777777').status, NOT_FOUND)
+        calls = self.server.count()
+        self.assertEqual([r.status for r in resolver.resolve(['ONT0_0000001', 'ONT0:7777777'])], [FOUND, NOT_FOUND])
+        self.assertEqual(self.server.count(), calls)
+        # misses are looked up again once expired
+        resolver.negative_ttl = 0.01
+        time.sleep(0.02)
+        self.assertEqual(resolver.resolve_one('ONT0:7777777').status, NOT_FOUND)
+        self.assertEqual(self.server.count(), calls + 1)
+
+    def test_errors(self):
+        resolver = CurieResolver(self.client, workers=2, fields=['iri', 'label'])
+        self.server.fail('obo_id=ONT0%3A0000002', status=500, times=1)
+        first, second = resolver.resolve(['ONT0:0000002', 'ONT0:0000004'])
+        self.assertEqual(first.status, ERROR)
+        self.assertEqual((second.status, second.term.label), (FOUND, self.server.dataset.label(4)))
+        self.assertIsNone(second.term.synonyms)
+        # failures are not cached
+        self.assertEqual(resolver.resolve_one('ONT0:0000002').status, FOUND)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import time
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.search_index import SearchIndex, normalize
+from tests.ols_stub import OlsStubServer
+
+
+def term(number, label, ontology='ont', **kwargs):
+    return dict(iri='http://example.org/T_{}'.format(number), obo_id='T:{}'.format(number), label=label,
+                ontology_name=ontology, is_defining_ontology=True, **kwargs)
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex([
+            term(1, 'cell membrane', synonyms=['plasma membrane']),
+            term(2, 'membrane', obo_synonym=[{'name': 'biological membrane', 'scope': 'hasExactSynonym'}]),
+            term(3, 'membrane protein complex'),
+            term(4, 'outer membrane', annotation={'alternative_term': ['membrane, outer']}),
+            term(5, 'membrane raft', ontology='other', is_obsolete=True),
+            term(6, 'membrane', ontology='imported', type='property'),
+            term(7, 'Signal-Transduction', synonyms=['signalling']),
+        ])
+
+    def labels(self, query, **kwargs):
+        return [(hit.label, hit.ontology_name) for hit in self.index.search(query, **kwargs)]
+
+    def test_ranking(self):
+        hits = self.index.search('membrane')
+        self.assertEqual([(hit.obo_id, hit.score) for hit in hits],
+                         [('T:2', 100), ('T:6', 100), ('T:3', 80), ('T:4', 70), ('T:1', 60)])
+        self.assertEqual(self.labels('memb prot'), [('membrane protein complex', 'ont')])
+        # synonyms and alternative terms
+        hit = self.index.search('plasma mem')[0]
+        self.assertEqual((hit.label, hit.matched, hit.score), ('cell membrane', 'plasma membrane', 70))
+        self.assertEqual(self.labels('biological'), [('membrane', 'ont')])
+        self.assertEqual(self.labels('membrane outer')[0], ('outer membrane', 'ont'))
+        self.assertEqual(self.labels('signal transduction'), [('Signal-Transduction', 'ont')])
+        self.assertEqual(len(self.index.search('membrane', rows=2)), 2)
+        self.assertEqual(self.index.search('nothing'), [])
+
+    def test_fuzzy(self):
+        hits = self.index.search('membrnae')
+        self.assertEqual(hits[0].label, 'membrane')
+        self.assertLess(hits[0].score, 100)
+        self.assertEqual(self.index.search('membrnae', fuzzy=False), [])
+        self.assertEqual(self.labels('signaling'), [('Signal-Transduction', 'ont')])
+        # short tokens are only prefix matched
+        self.assertEqual(self.index.search('cel'), self.index.search('cell'))
+        self.assertEqual(self.index.search('cwl'), [])
+        self.assertEqual(self.labels('cwll'), [('cell membrane', 'ont')])
+
+    def test_filters(self):
+        self.assertEqual(self.labels('membrane', ontology='imported'), [('membrane', 'imported')])
+        self.assertEqual(self.labels('membrane', filters={'type': 'property'}), [('membrane', 'imported')])
+        self.assertNotIn('imported', [o for _, o in self.labels('membrane', type={'term'})])
+        self.assertEqual(self.labels('raft'), [])
+        self.assertEqual(self.labels('raft', obsoletes='true'), [('membrane raft', 'other')])
+        self.assertEqual(self.labels('membrane', exact='true'), [('membrane', 'ont'), ('membrane', 'imported')])
+        self.assertEqual(self.labels('plasma', queryFields='label'), [])
+        self.assertEqual(self.labels('plasma', queryFields='synonym'), [('cell membrane', 'ont')])
+        with self.assertRaises(exceptions.BadFilters):
+            self.index.search('membrane', filters={'unknown': 1})
+        with self.assertRaises(exceptions.BadFilters):
+            self.index.search('membrane', childrenOf='http://example.org/T_1')
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.json')
+            self.index.save(path)
+            loaded = SearchIndex.load(path)
+        for query in ('membrane', 'plasma mem', 'membrnae', 'signal'):
+            self.assertEqual(loaded.search(query), self.index.search(query))
+        self.assertEqual(normalize('  Signal-Transduction,  (GO) '), 'signal transduction go')
+
+    def test_from_ontology(self):
+        with OlsStubServer(ontologies=2, terms=2000) as server:
+            client = OlsClient(base_site=server.url, page_size=500)
+            index = SearchIndex.from_ontology(client.ontology('ont0'), kinds=('terms', 'properties'))
+            self.assertEqual(len(index), 2005)
+            label = server.dataset.label(1234)
+            remote = client.search(query=label, exact='true', ontology='ont0')
+            self.assertEqual([hit.iri for hit in index.search(label, exact='true')], [r.iri for r in remote])
+            self.assertEqual(index.search('{} synonym'.format(label))[0].label, label)
+            index.search('warm up')
+            start = time.perf_counter()
+            for query in ('c', 'cel', 'cellular memb', 'membrnae', label):
+                index.search(query)
+            # sub millisecond queries, with a lot of slack for slow machines
+            self.assertLess((time.perf_counter() - start) / 5, 0.01)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import pickle
+import unittest
+
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api import exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.serialization import dumps, loads
+from tests.ols_stub import OlsStubServer
+
+
+class SerializationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=100).start()
+        client = OlsClient(base_site=cls.server.url, page_size=50)
+        cls.ontology = client.ontology('ont1')
+        cls.terms = list(cls.ontology.terms())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_helpers_round_trip(self):
+        terms = loads(dumps(self.terms))
+        self.assertEqual(terms, self.terms)
+        self.assertTrue(all(type(term) is helpers.Term for term in terms))
+        self.assertEqual(terms[12].accession, self.terms[12].accession)
+        self.assertIsNone(terms[0].client_config)
+        self.assertEqual(loads(dumps(self.ontology)), self.ontology)
+        # nested in plain values, zero-copy read from a memoryview
+        value = {'ontology': self.ontology, 'terms': self.terms[:3], 'count': -70000, 'ratio': 0.5,
+                 'flags': (True, False, None), 'raw': b'\x00\x01'}
+        data = dumps(value)
+        self.assertEqual(loads(memoryview(bytearray(data))),
+                         dict(value, flags=[True, False, None]))
+
+    def test_scalars(self):
+        for value in (0, 127, 128, 255, 65536, 2 ** 40, -1, -32, -33, -200, -40000, -2 ** 40, 1.25, '', 'é' * 40,
+                      'x' * 300, 'y' * 70000, [None] * 20, {str(i): i for i in range(20)}):
+            self.assertEqual(loads(dumps(value)), value)
+
+    def test_compact(self):
+        data = dumps(self.terms)
+        # attributes names and repeated strings are written once
+        self.assertLess(len(data), len(pickle.dumps(self.terms, protocol=pickle.HIGHEST_PROTOCOL)) / 2)
+
+    def test_invalid(self):
+        data = dumps(self.terms[0])
+        with self.assertRaises(exceptions.BadParameter):
+            loads(b'XXXX' + data[4:])
+        with self.assertRaises(exceptions.BadParameter):
+            loads(data[:4] + b'\x02' + data[5:])
+        with self.assertRaises(exceptions.BadParameter):
+            loads(data.replace(b'Term', b'Evil'))
+        with self.assertRaises(TypeError):
+            dumps(object())
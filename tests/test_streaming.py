@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.helpers import Term
+from ebi.ols.api.streaming import iter_elements
+from ebi.ols.api.transports import CassetteTransport
+from tests.ols_stub import OlsStubServer
+
+
+class IterElementsTest(unittest.TestCase):
+
+    def test_chunks_boundaries(self):
+        terms = [{'iri': 'http://x/{}'.format(i), 'label': 'é' * i, 'score': i * 1.5, 'synonyms': [None, {'a': i}],
+                  '_links': {'self': {'href': 'x'}}} for i in range(30)]
+        body = json.dumps({'_links': {'next': {'href': 'y'}}, '_embedded': {'other': [1], 'terms': terms},
+                           'page': {'totalElements': 30}}, ensure_ascii=False).encode('utf-8')
+        expected = [{k: v for k, v in t.items() if k != '_links'} for t in terms]
+        for size in (1, 3, 64, len(body)):
+            chunks = [body[i:i + size] for i in range(0, len(body), size)]
+            self.assertEqual([dict(e) for e in iter_elements(chunks, ('_embedded', 'terms'))], expected, size)
+
+    def test_missing_and_truncated(self):
+        self.assertEqual(list(iter_elements([b'{"page": {"number": 0}}'], ('_embedded', 'terms'))), [])
+        elements = iter_elements([b'{"response": {"numFound": 2, "docs": [12, {"a":'], ('response', 'docs'))
+        self.assertEqual(next(elements), 12)
+        with self.assertRaises(ValueError):
+            next(elements)
+
+
+class StreamedClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=2, terms=230, annotation_size=3).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_lists_and_search(self):
+        client = OlsClient(base_site=self.server.url, page_size=50)
+        streamed = OlsClient(base_site=self.server.url, page_size=50, stream=True)
+        terms, streamed_terms = client.ontology('ont1').terms(), streamed.ontology('ont1').terms()
+        self.assertEqual(list(streamed_terms), list(terms))
+        self.assertEqual(list(streamed_terms.shard(1, 2)), list(terms)[100:])
+        results = [r.iri for r in client.search(query='cell')]
+        self.assertEqual([r.iri for r in streamed.search(query='cell')], results)
+        projected = streamed.ontology('ont0').terms(fields=['iri', 'label'])
+        self.assertEqual([(t.iri, t.label, t.synonyms) for t in projected],
+                         [(t.iri, t.label, None) for t in client.ontology('ont0').terms()])
+
+    def test_relations(self):
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+        descendants = OlsClient(base_site=self.server.url, page_size=50).detail(
+            ontology_name='ont0', iri=iri, type=Term).load_relation('descendants')
+        streamed = OlsClient(base_site=self.server.url, page_size=50, stream=True).detail(
+            ontology_name='ont0', iri=iri, type=Term).load_relation('descendants')
+        # pages are the relation ones, not the ontology terms
+        self.assertEqual(len(streamed), 229)
+        self.assertEqual([t.iri for t in streamed], [t.iri for t in descendants])
+        self.assertEqual(len(list(streamed)), len(streamed))
+
+    def test_errors_and_cassette(self):
+        client = OlsClient(base_site=self.server.url, page_size=50, stream=True, max_retry=1, retry_delay=0)
+        terms = client.ontology('ont0').terms()
+        self.server.fail('page=2', status=503)
+        with self.assertRaises(exceptions.ObjectNotRetrievedError):
+            list(terms)
+        with tempfile.TemporaryDirectory() as directory:
+            cassette = os.path.join(directory, 'stream.json')
+            with CassetteTransport(cassette, mode='record') as transport:
+                recorded = list(OlsClient(base_site=self.server.url, page_size=50, stream=True,
+                                          transport=transport).ontology('ont0').terms())
+            replayed = OlsClient(base_site=self.server.url, page_size=50, stream=True,
+                                 transport=CassetteTransport(cassette)).ontology('ont0').terms()
+            self.assertEqual(list(replayed), recorded)
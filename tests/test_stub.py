@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import os
+import tempfile
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import ebi.ols.api.exceptions as exceptions
+import ebi.ols.api.helpers as helpers
+from benchmarks import runner
+from ebi.ols.api.base import ClientConfig
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.hal import make_uri
+from tests.ols_stub import OlsStubServer
+
+
+class StubServerTest(unittest.TestCase):
+    """ Client behaviour against the local stand-in server """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OlsStubServer(ontologies=3, terms=250).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OlsClient(base_site=self.server.url, page_size=100)
+
+    def test_ontologies(self):
+        ontologies = self.client.ontologies()
+        self.assertEqual(len(ontologies), 3)
+        self.assertEqual([o.ontology_id for o in ontologies], ['ont0', 'ont1', 'ont2'])
+        self.assertIsInstance(ontologies[1].config, helpers.OntologyConfig)
+
+    def test_terms_pagination(self):
+        terms = self.client.ontology('ont1').terms()
+        self.assertEqual(terms.pages, 3)
+        listed = list(terms)
+        self.assertEqual(len(listed), len(terms))
+        self.assertEqual(listed[123], terms[123])
+        self.assertEqual(terms[20:30], listed[20:30])
+
+    def test_slices(self):
+        terms = self.client.ontology('ont2').terms()
+        listed = list(terms)
+        for item in (slice(-30, None), slice(None, None, 50), slice(240, 10, -7), slice(-5, -1), slice(None, 3),
+                     slice(30, 20), slice(5, 5)):
+            expected = listed[20:30][::-1] if item == slice(30, 20) else listed[item]
+            self.assertEqual([t.iri for t in terms[item]], [t.iri for t in expected], item)
+        self.assertEqual(terms[-1], listed[-1])
+        with self.assertRaises(IndexError):
+            terms[-len(listed) - 1]
+        with self.assertRaises(IndexError):
+            terms[1:len(listed) + 1]
+        # only distinct pages touched are fetched
+        self.server.reset()
+        terms[::50]
+        self.assertEqual(self.server.count('/terms?'), 2)
+        self.server.reset()
+        terms[-120:]
+        self.assertEqual(self.server.count('/terms?'), 2)
+
+    def test_projection(self):
+        fields = ['iri', 'obo_id', 'label']
+        terms = self.client.ontology('ont0').terms(fields=fields)
+        full = self.client.ontology('ont0').terms()
+        for term in (terms[7], list(terms)[7], terms[5:10][2]):
+            self.assertEqual((term.iri, term.obo_id, term.label), (full[7].iri, full[7].obo_id, full[7].label))
+            self.assertIsNone(term.synonyms)
+            self.assertNotIn('in_subset', vars(term))
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+        term = self.client.term(iri, fields=['iri', 'label'])
+        self.assertEqual((term.iri, term.label, term.ontology_name), (iri, full[0].label, None))
+        # shared detail client is left untouched
+        self.assertEqual(self.client.term(iri).ontology_name, 'ont0')
+        detailed = self.client.detail(ontology_name='ont0', iri=iri, type=helpers.Term, fields='label')
+        self.assertEqual(vars(detailed).get('iri'), None)
+        # search projection is done server side too
+        self.server.reset()
+        results = self.client.search(query='membrane', fields=fields)
+        projected = self.server.sent
+        self.server.reset()
+        complete = self.client.search(query='membrane')
+        self.assertLess(projected, self.server.sent)
+        self.assertEqual([(r.iri, r.label) for r in results], [(r.iri, r.label) for r in complete])
+        self.client.search(query='cell', fields=fields)
+        self.assertIn('fieldList=iri,label,obo_id,type', self.server.requests[-1])
+
+    def test_detail(self):
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+        term = self.client.term(iri)
+        self.assertTrue(term.is_defining_ontology)
+        self.assertEqual(term.ontology_name, 'ont0')
+        self.assertEqual(len(self.client.term(iri, unique=False)), 3)
+        with self.assertRaises(exceptions.NotFoundException):
+            self.client.ontology('unknown')
+
+    def test_defining_cache(self):
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000000'
+        client = OlsClient(base_site=self.server.url)
+        self.server.reset()
+        term = client.term(iri)
+        self.assertEqual(self.server.requests, ['/api/terms/' + make_uri(iri)])
+        # defining ontology remembered: one request to its own endpoint
+        self.assertEqual(client.term(iri), term)
+        self.assertEqual(client.term(iri, fields=['iri', 'label']).label, term.label)
+        self.assertEqual(self.server.requests[1:], ['/api/ontologies/ont0/terms/' + make_uri(iri)] * 2)
+        self.assertEqual(len(client.term(iri, unique=False)), 3)
+        with OlsStubServer(ontologies=3, terms=5) as server:
+            client = OlsClient(base_site=server.url)
+            self.assertEqual(client.term(iri).ontology_name, 'ont0')
+            # removed from its defining ontology: looked up again
+            del server.dataset.items['terms']['ont0'][iri]
+            server.reset()
+            self.assertEqual(client.term(iri).ontology_name, 'ont1')
+            self.assertEqual(server.count(), 2)
+            self.assertEqual(client.term(iri).ontology_name, 'ont1')
+            self.assertEqual(server.count('/ontologies/ont1/'), 1)
+        # concurrent first lookups, projected or not, all remember into the one client cache
+        client = OlsClient(base_site=self.server.url)
+        with ThreadPoolExecutor(8) as executor:
+            terms = list(executor.map(lambda fields: client.term(iri, fields=fields), [None, ['iri', 'label']] * 8))
+        self.assertEqual({term.ontology_name for term in terms if term.ontology_name}, {'ont0'})
+        self.assertEqual(dict(client.term._defining), {iri: 'ont0'})
+
+    def test_relations(self):
+        term = self.client.detail(ontology_name='ont0', iri='http://purl.obolibrary.org/obo/ONT0_0000005',
+                                  type=helpers.Term)
+        self.assertIn('parents', term.relations_types)
+        self.assertEqual([t.obo_id for t in term.load_relation('ancestors')], ['ONT0:0000002', 'ONT0:0000000'])
+
+    def test_relation_slices(self):
+        root = self.client.detail(ontology_name='ont1', iri='http://purl.obolibrary.org/obo/ONT1_0000000',
+                                  type=helpers.Term)
+        descendants = root.load_relation('descendants')
+        listed = list(descendants)
+        self.assertEqual((len(listed), descendants.pages), (249, 3))
+        self.assertEqual([t.iri for t in descendants[0:50]], [t.iri for t in listed[0:50]])
+        self.assertEqual([t.iri for t in descendants[90:210:3]], [t.iri for t in listed[90:210:3]])
+        self.assertEqual(descendants[-1].iri, listed[-1].iri)
+        # relation pages, not the ontology terms ones
+        self.server.reset()
+        descendants[150:160]
+        self.assertEqual(self.server.count('/descendants?'), 1)
+        self.assertEqual(self.server.count('/terms?'), 0)
+
+    def test_search(self):
+        results = self.client.search(query='membrane', ontology='ont0')
+        self.assertGreater(len(results), 0)
+        for result in results:
+            self.assertIn('membrane', result.label)
+        self.assertEqual(self.server.dataset.label(3), self.client.search(query='cellular membrane 3', exact='true')[0].label)
+
+    def test_recorded(self):
+        recorded = {'/api/ontologies/recorded': {'ontologyId': 'recorded', 'config': {'title': 'Recorded'},
+                                                 '_links': {'self': {'href': 'https://www.ebi.ac.uk/ols/api/x'}}}}
+        with OlsStubServer(ontologies=1, terms=1, recorded=recorded) as server:
+            client = OlsClient(base_site=server.url)
+            self.assertEqual(client.ontology('recorded').title, 'Recorded')
+
+
+class LazyStartupTest(unittest.TestCase):
+
+    def test_no_request_before_use(self):
+        with OlsStubServer(ontologies=1, terms=10) as server:
+            client = OlsClient(base_site=server.url)
+            self.assertEqual(server.count(), 0)
+            client.term('http://purl.obolibrary.org/obo/ONT0_0000001')
+            # root document is not needed for detail calls
+            self.assertEqual(server.count(), 1)
+            client.ontologies()
+            client.search(query='cell')
+            self.assertEqual(server.requests.count('/api'), 1)
+
+    def test_unreachable_site(self):
+        # nothing is requested at construction, so no retries either
+        client = OlsClient(base_site='http://127.0.0.1:9/api')
+        self.assertIsNone(client._document)
+
+
+class ClientConfigTest(unittest.TestCase):
+    """ Several clients, several threads, one process """
+
+    def test_clients_isolation(self):
+        with OlsStubServer(ontologies=1, terms=30) as public, OlsStubServer(ontologies=2, terms=50) as mirror:
+            public_client = OlsClient(base_site=public.url, page_size=10)
+            public_ontology = public_client.ontology('ont0')
+            mirror_client = OlsClient(base_site=mirror.url, page_size=25)
+            mirror_ontology = mirror_client.ontology('ont0')
+            public_terms = public_ontology.terms()
+            mirror_terms = mirror_ontology.terms()
+            self.assertEqual((public_terms.page_size, len(public_terms)), (10, 30))
+            self.assertEqual((mirror_terms.page_size, len(mirror_terms)), (25, 50))
+            term = public_terms[3]
+            self.assertEqual(len(term.load_relation('ancestors')), 2)
+            self.assertEqual(public.count('/ancestors'), 1)
+            self.assertEqual(mirror.count('/ancestors'), 0)
+            self.assertEqual(public_client.site, public.url)
+
+    def test_default(self):
+        default = ClientConfig.default
+        iri = 'http://purl.obolibrary.org/obo/ONT0_0000005'
+        try:
+            with OlsStubServer(ontologies=1, terms=10) as first, OlsStubServer(ontologies=1, terms=10) as other:
+                OlsClient._default_set = OlsClient._default_warned = False
+                client = OlsClient(base_site=first.url)
+                # first client settings are used by helpers created on their own
+                self.assertIs(ClientConfig.default, client.config)
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always')
+                    other_client = OlsClient(base_site=other.url)
+                    OlsClient(base_site=other.url)
+                self.assertEqual([w.category for w in caught], [DeprecationWarning])
+                self.assertIs(ClientConfig.default, client.config)
+                self.assertIs(other_client.set_default(), other_client)
+                term = helpers.Term(ontology_name='ont0', iri=iri)
+                self.assertEqual(len(term.load_relation('ancestors')), 2)
+                self.assertEqual((first.count('/ancestors'), other.count('/ancestors')), (0, 1))
+        finally:
+            ClientConfig.default = default
+
+    def test_concurrent_search_iteration(self):
+        with OlsStubServer(ontologies=2, terms=300) as server:
+            client = OlsClient(base_site=server.url, page_size=7)
+            results = client.search(query='cell')
+            expected = [r.iri for r in results]
+            self.assertGreater(len(expected), 14)
+            self.assertEqual(results.page, 0)
+            with ThreadPoolExecutor(4) as executor:
+                iterated = list(executor.map(lambda _: [r.iri for r in results], range(8)))
+                queried = list(executor.map(lambda q: len(client.search(query=q)), ['cell', 'membrane'] * 4))
+            self.assertTrue(all(found == expected for found in iterated))
+            self.assertEqual(queried, [len(expected), len(client.search(query='membrane'))] * 4)
+
+
+class BenchmarkRunnerTest(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            self.assertEqual(runner.main(['run', '--terms', '120', '--repeat', '1', '--output', output]), 0)
+            with open(output, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            self.assertIn('ontology_iteration', results['results'])
+            self.assertEqual(results['results']['ontology_iteration']['operations'], 120)
+            self.assertIn('latency', results['results']['detail_lookup'])
+            slower = json.loads(json.dumps(results))
+            slower['results']['ontology_iteration']['duration']['median'] *= 2
+            regressed = [row[0] for row in runner.compare(results, slower) if row[-1]]
+            self.assertEqual(regressed, ['ontology_iteration'])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import pickle
+import unittest
+
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api.client import OlsClient
+from tests.ols_stub import OlsStubServer
+
+OBO = 'http://purl.obolibrary.org/obo/'
+
+
+class SubsetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OlsStubServer(ontologies=2, terms=120).start()
+        self.client = OlsClient(base_site=self.server.url, page_size=50)
+        self.ontology = self.client.ontology('ont1')
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_subsets(self):
+        subsets = self.ontology.subsets()
+        self.assertEqual(sorted(subsets), ['slim_a', 'slim_b'])
+        slim_a = subsets['slim_a']
+        # every 10th term, plus ont0 root imported in ont1
+        self.assertEqual(len(slim_a.terms), 13)
+        self.assertEqual((slim_a.name, slim_a.ontology_name), ('slim_a', 'ont1'))
+        self.assertIn(OBO + 'ONT1_0000030', slim_a)
+        self.assertIn(slim_a.terms[OBO + 'ONT1_0000030'], slim_a)
+        self.assertNotIn(OBO + 'ONT1_0000031', slim_a)
+        self.assertEqual(slim_a.terms[OBO + 'ONT1_0000030'].label, self.server.dataset.label(30))
+        # built once per ontology version, one pass over terms
+        self.server.reset()
+        self.assertIs(self.client.ontology('ont1').subset('slim_b'), subsets['slim_b'])
+        self.assertEqual(self.server.count(), 1)
+        self.assertEqual(len(self.ontology.subset('unknown').terms), 0)
+        self.assertEqual(helpers.Subset({}).name, None)
+        self.assertEqual(pickle.loads(pickle.dumps(helpers.Subset({'a': 1}, 'n'))), ({'a': 1}, 'n', None))
+
+    def test_search(self):
+        ontology = self.client.ontology('ont0')
+        slim_b = ontology.subset('slim_b', search=True)
+        self.assertEqual(list(slim_b.terms), [OBO + 'ONT0_{:07d}'.format(i) for i in (0, 25, 50, 75, 100)])
+        self.assertEqual(self.server.count('slim=slim_b'), 1)
+        self.assertIs(ontology.subset('slim_b', search=True), slim_b)
+        self.assertEqual(self.server.count('/terms?'), 0)
+
+    def test_map(self):
+        slim_a = self.ontology.subset('slim_a')
+        # 93 -> 46 -> 22 -> 10 -> 4 -> 1 -> 0
+        mapped = slim_a.map(OBO + 'ONT1_0000093')
+        self.assertEqual([term.iri for term in mapped], [OBO + 'ONT1_0000010', OBO + 'ONT1_0000000'])
+        self.assertEqual([term.iri for term in slim_a.map(OBO + 'ONT1_0000093', closest=True)],
+                         [OBO + 'ONT1_0000010'])
+        term = self.ontology.terms()[20]
+        self.assertEqual([t.iri for t in slim_a.map(term, closest=True)], [OBO + 'ONT1_0000020'])
+        self.assertEqual([t.iri for t in slim_a.map(OBO + 'ONT1_0000000')], [OBO + 'ONT1_0000000'])
+        # ancestors are cached per site, whatever the client
+        calls = self.server.count()
+        slim_a.map(OBO + 'ONT1_0000093', closest=True)
+        OlsClient(base_site=self.server.url, page_size=20).ontology('ont1').subset('slim_a').map(OBO + 'ONT1_0000093')
+        self.assertEqual(self.server.count(), calls + 1)
+        self.assertTrue(all(isinstance(key[0], str) for key in helpers._ancestors))
+
+    def test_map_ancestors_order(self):
+        relation = self.server.dataset.relation
+        # ancestors listed root first
+        self.server.dataset.relation = lambda ontology_id, iri, name: relation(ontology_id, iri, name)[::-1]
+        slim_a = self.ontology.subset('slim_a')
+        iri = OBO + 'ONT1_0000087'
+        # 87 -> 43 -> 21 -> 10 -> 4 -> 1 -> 0
+        self.assertEqual([term.iri for term in slim_a.map(iri)], [OBO + 'ONT1_0000010', OBO + 'ONT1_0000000'])
+        self.assertEqual([term.iri for term in slim_a.map(iri, closest=True)], [OBO + 'ONT1_0000010'])
+
+    def test_cache_size(self):
+        size, helpers.SUBSETS_CACHE_SIZE = helpers.SUBSETS_CACHE_SIZE, 1
+        try:
+            ont0, ont1 = self.client.ontology('ont0'), self.ontology
+            subsets = ont1.subsets()
+            self.assertIs(ont1.subsets(), subsets)
+            ont0.subsets()
+            # least recently used ontology subsets dropped
+            self.assertEqual(len(helpers._subsets), 1)
+            self.assertIsNot(ont1.subsets(), subsets)
+        finally:
+            helpers.SUBSETS_CACHE_SIZE = size
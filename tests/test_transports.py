@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+
+import ebi.ols.api.exceptions as exceptions
+import ebi.ols.api.helpers as helpers
+from ebi.ols.api.base import DetailClientMixin
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.transports import CassetteTransport, interaction_key
+from tests.ols_stub import OlsStubServer
+
+
+class CassetteTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cassette = os.path.join(self.directory.name, 'ols.json.gz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def exercise(self, client):
+        ontology = client.ontology('ont1')
+        terms = [t.obo_id for t in ontology.terms()]
+        term = client.term('http://purl.obolibrary.org/obo/ONT0_0000005')
+        ancestors = [t.obo_id for t in term.load_relation('ancestors')]
+        found = [r.iri for r in client.search(query='cellular membrane', ontology='ont0')]
+        detailed = client.detail(ontology_name='ont1', iri='http://purl.obolibrary.org/obo/ONT1_0000007',
+                                 type=helpers.Term)
+        return terms, ancestors, found, detailed.label
+
+    def test_record_replay(self):
+        with OlsStubServer(ontologies=2, terms=120) as server:
+            with CassetteTransport(self.cassette, mode='record') as transport:
+                recorded = self.exercise(OlsClient(base_site=server.url, page_size=50, transport=transport))
+            base_site = server.url
+        self.assertTrue(os.path.exists(self.cassette))
+        # server is down, everything comes from the cassette
+        replayed = self.exercise(OlsClient(base_site=base_site, page_size=50,
+                                           transport=CassetteTransport(self.cassette)))
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(len(replayed[0]), 121)
+        self.assertGreater(len(replayed[2]), 0)
+
+    def test_replay_missing(self):
+        with OlsStubServer(ontologies=1, terms=10) as server:
+            with CassetteTransport(self.cassette, mode='record') as transport:
+                OlsClient(base_site=server.url, transport=transport)
+            client = OlsClient(base_site=server.url, transport=CassetteTransport(self.cassette))
+            with self.assertRaises(exceptions.NotRecordedError):
+                client.ontology('ont0')
+
+    def test_auto(self):
+        with OlsStubServer(ontologies=1, terms=10) as server:
+            with CassetteTransport(self.cassette, mode='auto') as transport:
+                client = OlsClient(base_site=server.url, transport=transport)
+                client.ontology('ont0')
+                client.ontology('ont0')
+            self.assertEqual(server.count('/api/ontologies/ont0'), 1)
+            with CassetteTransport(self.cassette, mode='auto') as transport:
+                OlsClient(base_site=server.url, transport=transport).ontology('ont0')
+            self.assertEqual(server.count('/api/ontologies/ont0'), 1)
+
+    def test_interaction_key(self):
+        iri = 'http://purl.obolibrary.org/obo/GO_0008150'
+        double = 'https://www.ebi.ac.uk/ols/api/terms/' + DetailClientMixin.make_uri(iri)
+        single = 'http://localhost/ols/api/terms/http%3A%2F%2Fpurl.obolibrary.org%2Fobo%2FGO_0008150'
+        self.assertEqual(interaction_key('get', double), interaction_key('GET', single))
+        self.assertIn(iri.replace(':', '%3A').replace('/', '%2F'), interaction_key('GET', single))
+        self.assertEqual(interaction_key('GET', '/api/search?q=gene ontology&rows=10&start=0'),
+                         interaction_key('GET', '/api/search?start=0&rows=10&q=gene%20ontology'))
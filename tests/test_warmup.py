@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from ebi.ols.api import exceptions
+from ebi.ols.api.client import OlsClient
+from ebi.ols.api.helpers import Term
+from ebi.ols.api.warmup import DetailCache
+from tests.ols_stub import OlsStubServer, SyntheticDataset
+
+IRI = SyntheticDataset.iri
+
+
+class WarmUpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OlsStubServer(ontologies=2, terms=30).start()
+        self.client = OlsClient(base_site=self.server.url, page_size=25, max_retry=1, retry_delay=0,
+                                cache={'ttl': 100, 'refresh_ahead': 0.2, 'stale': 50, 'workers': 2})
+        self.cache = self.client.cache
+        self.now = [0.0]
+        self.cache.clock = lambda: self.now[0]
+
+    def tearDown(self):
+        self.cache.close()
+        self.server.stop()
+
+    def relabel(self, index, label):
+        self.server.dataset.items['terms']['ont1'][IRI('ont1', index)]['label'] = label
+        self.server.reset()
+
+    def refreshed(self, key):
+        future = self.cache._inflight.get(key)
+        if future is not None:
+            future.exception(timeout=10)
+
+    def test_warm(self):
+        warming = self.cache.warm(ontologies=['ont0', 'unknown'], terms=[IRI('ont1', 1), IRI('ont1', 2)],
+                                  relations=[('ont0', IRI('ont0', 0), 'children'), ('ont0', IRI('ont0', 1), 'parents')])
+        self.assertTrue(warming.wait(10))
+        self.assertEqual((warming.loaded, warming.total), (5, 6))
+        self.assertEqual(warming.failed[0][0], ('ontology', 'unknown'))
+        self.assertIsInstance(warming.failed[0][1], exceptions.NotFoundException)
+        self.server.reset()
+        self.assertEqual(self.client.ontology('ont0').ontology_id, 'ont0')
+        self.assertEqual(self.client.term(IRI('ont1', 2)).label, SyntheticDataset.label(2))
+        self.assertEqual([t.iri for t in self.cache.related('ont0', IRI('ont0', 0), 'children')],
+                         [IRI('ont0', 1), IRI('ont0', 2)])
+        self.assertEqual([t.iri for t in self.cache.related('ont0', IRI('ont0', 1), 'parents')], [IRI('ont0', 0)])
+        self.assertEqual(self.server.count(), 0)
+        stats = self.cache.stats
+        self.assertEqual((stats.entries, stats.hits, stats.misses, stats.refreshes), (5, 4, 0, 0))
+
+    def test_stale_while_revalidate(self):
+        key = ('term', IRI('ont1', 3))
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, SyntheticDataset.label(3))
+        self.relabel(3, 'new label')
+        # fresh
+        self.now[0] = 79
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, SyntheticDataset.label(3))
+        self.assertEqual(self.server.count(), 0)
+        # near expiry: current value served at once, refreshed in the background
+        self.now[0] = 81
+        self.server.slow('ONT1_0000003', 0.5)
+        start = time.perf_counter()
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, SyntheticDataset.label(3))
+        self.assertLess(time.perf_counter() - start, 0.4)
+        # refresh sent once
+        self.client.term(IRI('ont1', 3))
+        self.refreshed(key)
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, 'new label')
+        self.assertEqual(self.cache.stats.refreshes, 1)
+        # expired, within stale window
+        self.relabel(3, 'newer label')
+        self.now[0] = 81 + 120
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, 'new label')
+        self.assertEqual(self.cache.stats.stale, 1)
+        self.refreshed(key)
+        # too old: loaded by caller
+        self.relabel(3, 'newest label')
+        self.now[0] = 81 + 120 + 151
+        self.assertEqual(self.client.term(IRI('ont1', 3)).label, 'newest label')
+        self.assertEqual(self.cache.stats.misses, 2)
+
+    def test_refresh_failure(self):
+        self.client.term(IRI('ont1', 4))
+        self.server.fail('ONT1_0000004', 500, times=2)
+        self.now[0] = 90
+        self.assertEqual(self.client.term(IRI('ont1', 4)).label, SyntheticDataset.label(4))
+        self.refreshed(('term', IRI('ont1', 4)))
+        # stale value kept, refreshed again on next lookup
+        self.assertEqual(self.cache.stats.errors, 1)
+        self.assertEqual(self.client.term(IRI('ont1', 4)).label, SyntheticDataset.label(4))
+        self.assertEqual(self.cache.stats.refreshes, 2)
+
+    def test_uncached(self):
+        self.client.term(IRI('ont1', 5), fields=['iri', 'label'])
+        self.client.term(IRI('ont0', 0), unique=False)
+        self.assertEqual(len(self.cache), 0)
+        # detail clients are cache ones, helpers relations and lists are not altered
+        term = self.client.detail(ontology_name='ont1', iri=IRI('ont1', 5), type=Term)
+        self.assertEqual(len(term.load_relation('children')), 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_inflight(self):
+        self.server.slow('ONT1_0000006', 0.3)
+        warming = self.cache.warm(terms=[IRI('ont1', 6)])
+        time.sleep(0.05)
+        # lookup waits for the warm-up load instead of sending its own
+        self.assertEqual(self.client.term(IRI('ont1', 6)).iri, IRI('ont1', 6))
+        warming.wait(10)
+        self.assertEqual(self.server.count('ONT1_0000006'), 1)
+
+    def test_close(self):
+        cache = DetailCache(self.client, workers=1)
+        self.server.slow('ONT1_0000007', 0.3)
+        refresh = cache.schedule(('term', IRI('ont1', 7)))
+        warming = cache.warm(terms=[IRI('ont1', 8), IRI('ont1', 9)])
+        time.sleep(0.05)
+        cache.close()
+        self.assertTrue(warming.wait(10))
+        refresh.result(timeout=10)
+        # queued warm-up load dropped, remaining keys not scheduled
+        self.assertEqual((warming.loaded, warming.failed), (0, []))
+        self.assertEqual(len(cache._inflight), 0)
+        self.assertEqual((self.server.count('ONT1_0000008'), self.server.count('ONT1_0000009')), (0, 0))
+        self.assertEqual(cache.stats.entries, 1)
+
+    def test_concurrent_stats(self):
+        iris = [IRI('ont1', index) for index in range(10)]
+        for iri in iris:
+            self.client.term(iri)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda i: self.client.term(iris[i % 10]), range(4000)))
+        stats = self.cache.stats
+        # every lookup counted once
+        self.assertEqual((stats.misses, stats.hits), (10, 4000))
+
+    def test_settings(self):
+        client = OlsClient(base_site=self.server.url, cache=True)
+        self.assertIsInstance(client.cache, DetailCache)
+        self.assertEqual(client.cache.stale, client.cache.ttl)
+        self.assertIsNone(OlsClient(base_site=self.server.url).cache)
+
+
+if __name__ == '__main__':
+    unittest.main()